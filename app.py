@@ -1,38 +1,103 @@
+import os
+
 from flask import Flask
 from config import Config
 from extensions import db, mail, login_manager
 
-# ✅ Import all blueprints
-from blueprints.public.routes import public_bp      # <-- ADDED
-from blueprints.auth.routes import auth_bp
-from blueprints.admin.routes import admin_bp
-from blueprints.hr.routes import hr_bp
-from blueprints.ops_manager.routes import ops_manager_bp
-from blueprints.ops_supervisor.routes import ops_supervisor_bp
-from blueprints.fleet.routes import fleet_bp
-from blueprints.finance.routes import finance_bp
+
+def register_blueprints(app):
+    # Imported here so that `import app` stays cheap and blueprints never
+    # import this module back (they only depend on extensions/models).
+    from blueprints.public.routes import public_bp
+    from blueprints.auth.routes import auth_bp
+    from blueprints.admin.routes import admin_bp
+    from blueprints.hr.routes import hr_bp
+    from blueprints.ops_manager.routes import ops_manager_bp
+    from blueprints.ops_supervisor.routes import ops_supervisor_bp
+    from blueprints.fleet.routes import fleet_bp
+    from blueprints.finance.routes import finance_bp
+    from blueprints.analytics.routes import analytics_bp
+    from blueprints.claims.routes import claims_bp
+    from blueprints.api.routes import api_bp
+    from live_events import live_bp
+
+    app.register_blueprint(public_bp)  # handles / and /register
+    app.register_blueprint(auth_bp)
+    app.register_blueprint(admin_bp, url_prefix="/dashboard")
+    app.register_blueprint(hr_bp, url_prefix="/dashboard/hr")
+    app.register_blueprint(ops_manager_bp, url_prefix="/dashboard/ops")
+    app.register_blueprint(ops_supervisor_bp, url_prefix="/dashboard/ops_supervisor")
+    app.register_blueprint(fleet_bp, url_prefix="/dashboard/fleet")
+    app.register_blueprint(finance_bp, url_prefix="/dashboard/finance")
+    app.register_blueprint(analytics_bp, url_prefix="/dashboard/analytics")
+    app.register_blueprint(claims_bp, url_prefix="/dashboard/claims")
+    app.register_blueprint(api_bp, url_prefix="/api")
+    app.register_blueprint(live_bp)  # /dashboard/live/stream (SSE)
+
 
 def create_app():
+    from commands import register_commands
+    from sql_profiler import init_sql_profiler
+    from metrics import init_metrics
+    from db_routing import init_replica_routing
+    from claims import init_claims
+    from change_bus import init_change_bus
+    from template_cache import init_template_cache
+    from assets import init_assets
+    from compression import init_compression
+    from idempotency import init_idempotency
+    from health import init_health
+
     app = Flask(__name__)
     app.config.from_object(Config)
+    os.makedirs(app.config["UPLOAD_FOLDER"], exist_ok=True)
 
     # Initialize extensions
     db.init_app(app)
     mail.init_app(app)
     login_manager.init_app(app)
 
+    # Jinja bytecode cache + {% cache %} fragments for dashboard cards
+    init_template_cache(app)
+
+    # Fingerprinted static bundles: asset_url() + /assets/<hashed name>
+    init_assets(app)
+
+    # idempotency_key() for forms that must not be processed twice
+    init_idempotency(app)
+
     # ✅ Register blueprints
-    app.register_blueprint(public_bp)  # <-- ADDED (handles / and /register)
-    app.register_blueprint(auth_bp)
-    app.register_blueprint(admin_bp, url_prefix="/dashboard")
-    app.register_blueprint(hr_bp, url_prefix="/dashboard/hr")
-    app.register_blueprint(ops_manager_bp, url_prefix="/dashboard/ops")
-    app.register_blueprint(ops_supervisor_bp, url_prefix="/dashboard/ops_supervisor")
-    app.register_blueprint(fleet_bp, url_prefix="/dashboard/fleet")
-    app.register_blueprint(finance_bp, url_prefix="/dashboard/finance")
+    register_blueprints(app)
+
+    # 409 on concurrent (optimistic-lock) conflicts
+    init_claims(app)
+
+    # Driver/offboarding change events: NOTIFY/LISTEN on PostgreSQL, in-process otherwise
+    init_change_bus(app)
+
+    # Send @read_only views to replicas, pin recent writers to the primary
+    init_replica_routing(app)
+
+    # Request/DB/workflow metrics at /metrics
+    init_metrics(app)
+
+    # /healthz and /readyz for the load balancer
+    init_health(app)
+
+    # Opt-in SQL profiler (SQL_PROFILER_ENABLED=1)
+    init_sql_profiler(app)
+
+    # gzip/brotli for text responses (COMPRESS_ENABLED=0 behind a compressing proxy)
+    init_compression(app)
+
+    # CLI commands (flask init-db, flask stage-events ...)
+    register_commands(app)
 
-    with app.app_context():
-        db.create_all()
+    # Schema is managed with `flask init-db`; only auto-create when asked to
+    # (e.g. local development) so workers don't hit the DB on every boot.
+    if app.config.get("AUTO_CREATE_SCHEMA"):
+        with app.app_context():
+            db.create_all()
 
     return app
 
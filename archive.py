@@ -0,0 +1,69 @@
+"""Reads across live and archived drivers/offboardings.
+
+``jobs/archival.py`` moves finished records from ``driver`` / ``offboarding``
+into ``driver_archive`` / ``offboarding_archive``. Anything that needs the
+full history (search, exports, stage analytics) reads through the UNION ALL
+helpers here instead of the hot tables; rows carry an ``archived`` flag.
+"""
+from sqlalchemy import func, literal, or_, select, union_all
+
+from extensions import db
+from models import Driver, Offboarding, driver_archive, offboarding_archive
+
+_TABLES = {
+    "driver": (Driver.__table__, driver_archive),
+    "offboarding": (Offboarding.__table__, offboarding_archive),
+}
+
+SEARCH_COLUMNS = ("id", "full_name", "iqama_number", "city", "platform", "onboarding_stage", "updated_at")
+EXPORT_COLUMNS = (
+    "id", "full_name", "iqama_number", "iqama_expiry_date", "nationality", "mobile_number", "city",
+    "platform", "platform_id", "onboarding_stage", "sponsorship_transfer_status", "transfer_fee_amount",
+    "finance_approved_at", "updated_at",
+)
+
+
+def records(kind, columns=None, include_archived=True, include_deleted=False):
+    """Subquery over live (and archived) rows of ``kind`` with an ``archived`` column."""
+    table, archive = _TABLES[kind]
+    names = columns or [c.name for c in table.columns]
+    live = select(*(table.c[n] for n in names), literal(False).label("archived"))
+    if not include_deleted:
+        live = live.where(table.c.deleted_at.is_(None))
+    if not include_archived:
+        return live.subquery(kind)
+    cold = select(*(archive.c[n] for n in names), literal(True).label("archived"))
+    return union_all(live, cold).subquery(kind)
+
+
+def union_sql(kind, columns):
+    """Raw-SQL twin of ``records`` for hand-written queries: ``(SELECT ... UNION ALL ...)``."""
+    table, archive = _TABLES[kind]
+    cols = ", ".join(columns)
+    return f"(SELECT {cols} FROM {table.name} UNION ALL SELECT {cols} FROM {archive.name})"
+
+
+def search_drivers(term, limit=50, include_archived=True):
+    """Drivers whose name contains ``term`` or whose iqama starts with it, live ones first."""
+    rows = records("driver", SEARCH_COLUMNS, include_archived)
+    term = (term or "").strip()
+    query = (
+        select(rows)
+        .where(or_(
+            func.lower(rows.c.full_name).contains(term.lower(), autoescape=True),
+            rows.c.iqama_number.startswith(term, autoescape=True),
+        ))
+        .order_by(rows.c.archived, rows.c.full_name)
+        .limit(limit)
+    )
+    return db.session.execute(query).mappings().all()
+
+
+def iter_driver_export(include_archived=True, batch_size=1000):
+    """Yield every driver row (``EXPORT_COLUMNS`` + archived), streamed from the database."""
+    rows = records("driver", EXPORT_COLUMNS, include_archived)
+    result = db.session.execute(
+        select(rows).order_by(rows.c.id).execution_options(yield_per=batch_size)
+    )
+    for row in result.mappings():
+        yield row
@@ -0,0 +1,199 @@
+"""Fingerprinted static bundles.
+
+Page CSS/JS lives in ``static/css`` and ``static/js`` (``static/vendor`` for
+third-party files). ``flask assets build`` copies each file to
+``static/dist`` under a content-hash name (``js/dashboard_hr.3f9c2a1b7e.js``),
+writes ``.gz`` (and ``.br`` when the optional ``brotli`` package is
+installed) variants next to it, and records the mapping in
+``static/dist/manifest.json``.
+
+Templates reference assets with ``{{ asset_url('js/dashboard_hr.js') }}``. With a
+manifest this points at ``/assets/<hashed name>``, served with a one-year
+immutable Cache-Control and the best precompressed variant the client
+accepts. Without a manifest (local development) it falls back to the plain
+``/static/`` file, so the build step is only needed for deployments.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import urllib.request
+from base64 import b64encode
+
+import click
+from flask import Blueprint, abort, current_app, request, send_from_directory, url_for
+from flask.cli import AppGroup
+from flask.sessions import SecureCookieSessionInterface
+
+try:
+    import brotli
+except ImportError:  # optional: only gzip variants are produced
+    brotli = None
+
+assets_bp = Blueprint("assets", __name__)
+assets_cli = AppGroup("assets", help="Build fingerprinted static bundles.")
+
+SOURCE_DIRS = ("css", "js", "vendor")
+DIST_DIR = "dist"
+MANIFEST = "manifest.json"
+COMPRESSIBLE = (".css", ".js", ".svg", ".json", ".map")
+ONE_YEAR = 365 * 24 * 3600
+
+# Pinned third-party files for `flask assets vendor`, verified against their SRI hashes
+VENDOR_FILES = {
+    "vendor/bootstrap.min.css": (
+        "https://cdn.jsdelivr.net/npm/bootstrap@5.3.3/dist/css/bootstrap.min.css",
+        "sha384-QWTKZyjpPEjISv5WaRU9OFeRpok6YctnYmDr5pNlyT2bRjXh0JMhjY6hW+ALEwIH",
+    ),
+    "vendor/bootstrap.bundle.min.js": (
+        "https://cdn.jsdelivr.net/npm/bootstrap@5.3.3/dist/js/bootstrap.bundle.min.js",
+        "sha384-YvpcrYf0tY3lHB60NNkmXc5s9fDVZLESaAA55NDzOxhy9GkcIdslK1eN7N6jIeHz",
+    ),
+}
+
+
+def _fingerprint(data):
+    return hashlib.sha256(data).hexdigest()[:10]
+
+
+def build(static_folder, echo=print):
+    """Write fingerprinted copies of the source directories to ``static/dist`` plus the manifest.
+
+    Files from earlier builds are kept: workers still running the previous
+    release keep serving the names they know until they are restarted.
+    """
+    dist = os.path.join(static_folder, DIST_DIR)
+    manifest = {}
+    for source_dir in SOURCE_DIRS:
+        root = os.path.join(static_folder, source_dir)
+        if not os.path.isdir(root):
+            continue
+        for dirpath, _, filenames in os.walk(root):
+            for filename in sorted(filenames):
+                path = os.path.join(dirpath, filename)
+                name = os.path.relpath(path, static_folder).replace(os.sep, "/")
+                with open(path, "rb") as fh:
+                    data = fh.read()
+                stem, ext = os.path.splitext(name)
+                hashed = f"{stem}.{_fingerprint(data)}{ext}"
+                target = os.path.join(dist, hashed)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                with open(target, "wb") as fh:
+                    fh.write(data)
+                sizes = [len(data)]
+                if ext in COMPRESSIBLE:
+                    with open(target + ".gz", "wb") as fh:
+                        compressed = gzip.compress(data, compresslevel=9, mtime=0)
+                        fh.write(compressed)
+                        sizes.append(len(compressed))
+                    if brotli is not None:
+                        with open(target + ".br", "wb") as fh:
+                            compressed = brotli.compress(data, quality=11)
+                            fh.write(compressed)
+                            sizes.append(len(compressed))
+                manifest[name] = hashed
+                echo(f"{name} -> {hashed} ({' / '.join(str(s) for s in sizes)} bytes)")
+
+    os.makedirs(dist, exist_ok=True)
+    tmp = os.path.join(dist, MANIFEST + ".tmp")
+    with open(tmp, "w") as fh:
+        json.dump(manifest, fh, indent=2, sort_keys=True)
+    os.replace(tmp, os.path.join(dist, MANIFEST))
+    return manifest
+
+
+def load_manifest(app):
+    path = os.path.join(app.static_folder, DIST_DIR, MANIFEST)
+    try:
+        with open(path) as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return {}
+
+
+def asset_url(name, fallback=None):
+    """URL for a static asset: fingerprinted when built, else the plain static file.
+
+    ``fallback`` (e.g. a CDN URL) is used when the file is neither built nor present.
+    """
+    app = current_app
+    manifest = app.extensions.get("asset_manifest")
+    if manifest is None or app.debug:
+        manifest = app.extensions["asset_manifest"] = load_manifest(app)
+    hashed = manifest.get(name)
+    if hashed:
+        return url_for("assets.dist", filename=hashed)
+    if fallback and not os.path.exists(os.path.join(app.static_folder, name)):
+        return fallback
+    return url_for("static", filename=name)
+
+
+class AssetAwareSessionInterface(SecureCookieSessionInterface):
+    """Never save the session (Set-Cookie / "Vary: Cookie") on asset responses.
+
+    Flask-Login reads the session on every response, which would otherwise
+    make fingerprinted assets uncacheable for shared proxies.
+    """
+
+    def save_session(self, app, session, response):
+        if request.endpoint == "assets.dist":
+            return
+        super().save_session(app, session, response)
+
+
+@assets_bp.route("/assets/<path:filename>")
+def dist(filename):
+    directory = os.path.join(current_app.static_folder, DIST_DIR)
+    if filename == MANIFEST or filename.endswith((".gz", ".br")):
+        abort(404)
+
+    accepted = request.headers.get("Accept-Encoding", "")
+    encoding = None
+    for candidate, suffix in (("br", ".br"), ("gzip", ".gz")):
+        if candidate in accepted and os.path.isfile(os.path.join(directory, filename + suffix)):
+            encoding = candidate
+            break
+
+    if encoding:
+        suffix = ".br" if encoding == "br" else ".gz"
+        response = send_from_directory(directory, filename + suffix, max_age=ONE_YEAR, conditional=True)
+        response.headers["Content-Encoding"] = encoding
+        # send_file guessed the type from the .br/.gz name; use the original file's
+        response.mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    else:
+        response = send_from_directory(directory, filename, max_age=ONE_YEAR, conditional=True)
+    response.headers["Cache-Control"] = f"public, max-age={ONE_YEAR}, immutable"
+    response.vary.add("Accept-Encoding")
+    return response
+
+
+@assets_cli.command("build")
+def build_command():
+    """Fingerprint css/, js/ and vendor/ into static/dist with a manifest."""
+    manifest = build(current_app.static_folder, echo=click.echo)
+    click.echo(f"Built {len(manifest)} asset(s){'' if brotli else ' (install brotli for .br variants)'}.")
+
+
+@assets_cli.command("vendor")
+def vendor_command():
+    """Download pinned third-party assets (Bootstrap) into static/vendor."""
+    for name, (url, integrity) in VENDOR_FILES.items():
+        with urllib.request.urlopen(url, timeout=30) as resp:
+            data = resp.read()
+        algo, expected = integrity.split("-", 1)
+        actual = b64encode(hashlib.new(algo, data).digest()).decode()
+        if actual != expected:
+            raise click.ClickException(f"{url}: integrity mismatch ({algo}-{actual})")
+        path = os.path.join(current_app.static_folder, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as fh:
+            fh.write(data)
+        click.echo(f"Saved {name} ({len(data)} bytes).")
+
+
+def init_assets(app):
+    """Register /assets and the asset_url() template helper."""
+    app.register_blueprint(assets_bp)
+    app.add_template_global(asset_url)
+    app.session_interface = AssetAwareSessionInterface()
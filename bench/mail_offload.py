@@ -0,0 +1,218 @@
+"""Requests/s per worker process with notification mail sent inline versus in the background.
+
+Starts a local SMTP sink that takes --smtp-delay seconds per message (a
+slow relay), then runs one gunicorn worker (--threads threads) twice,
+MAIL_ASYNC=0 and MAIL_ASYNC=1, and posts public registrations (upload +
+commit + notification mail) from concurrent clients.
+
+    python -m bench.mail_offload --clients 16 --threads 4 --smtp-delay 0.3 --duration 10
+"""
+import argparse
+import os
+import socketserver
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+
+from bench.run import percentile
+from bench.wsgi_compare import REPO_ROOT, free_port, wait_until_up
+
+
+class SlowSMTPHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib: accepts everything, sleeps before acknowledging DATA."""
+
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        self.reply("220 sink ready")
+        in_data = False
+        for raw in self.rfile:
+            line = raw.rstrip(b"\r\n")
+            if in_data:
+                if line == b".":
+                    in_data = False
+                    time.sleep(self.server.delay)
+                    with self.server.lock:
+                        self.server.received += 1
+                    self.reply("250 OK")
+                continue
+            verb = line[:4].upper()
+            if verb in (b"EHLO", b"HELO"):
+                self.reply("250 sink")
+            elif verb == b"DATA":
+                in_data = True
+                self.reply("354 go ahead")
+            elif verb == b"QUIT":
+                self.reply("221 bye")
+                return
+            else:
+                self.reply("250 OK")
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, port, delay):
+        super().__init__(("127.0.0.1", port), SlowSMTPHandler)
+        self.delay = delay
+        self.received = 0
+        self.lock = threading.Lock()
+
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+def registration_body():
+    boundary = uuid.uuid4().hex
+    iqama = str(uuid.uuid4().int)[:10]
+    fields = {
+        "full_name": f"Bench {iqama}", "iqama_number": iqama, "iqama_expiry_date": "2030-01-01",
+        "saudi_driving_license": "yes", "nationality": "PK", "city": "Riyadh",
+        "mobile_number": "0500000000", "previous_sponsor_number": "1",
+    }
+    parts = [
+        f'--{boundary}\r\nContent-Disposition: form-data; name="{k}"\r\n\r\n{v}\r\n'.encode()
+        for k, v in fields.items()
+    ]
+    parts.append(
+        f'--{boundary}\r\nContent-Disposition: form-data; name="iqama_card_upload"; filename="iqama.png"\r\n'
+        f"Content-Type: image/png\r\n\r\n".encode() + os.urandom(20_000) + b"\r\n"
+    )
+    parts.append(f"--{boundary}--\r\n".encode())
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+def load(base, clients, duration):
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    stop = time.time() + duration
+    opener = urllib.request.build_opener(NoRedirect)
+
+    def worker():
+        while time.time() < stop:
+            body, content_type = registration_body()
+            req = urllib.request.Request(f"{base}/register", data=body, headers={"Content-Type": content_type})
+            start = time.perf_counter()
+            try:
+                opener.open(req, timeout=60).read()
+                ok = False  # registration answers with a redirect; anything else is a failure
+            except urllib.error.HTTPError as e:
+                ok = e.code == 302
+            except OSError:
+                ok = False
+            elapsed = time.perf_counter() - start
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                else:
+                    errors[0] += 1
+
+    threads = [threading.Thread(target=worker) for _ in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors[0],
+        "rps": round(len(latencies) / duration, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+    }
+
+
+def drain(sink, expected, timeout=120):
+    """Wait for queued mail to reach the sink; returns seconds taken."""
+    start = time.time()
+    while sink.received < expected and time.time() - start < timeout:
+        time.sleep(0.1)
+    return round(time.time() - start, 1)
+
+
+def run(mode, args, sink, workdir):
+    port = free_port()
+    env = dict(
+        os.environ,
+        PYTHONPATH=REPO_ROOT,
+        DATABASE_URI=f"sqlite:///{os.path.join(workdir, f'{mode}.db')}",
+        UPLOAD_FOLDER=os.path.join(workdir, f"{mode}-uploads"),
+        AUTO_CREATE_SCHEMA="1",
+        MAIL_SERVER="127.0.0.1",
+        MAIL_PORT=str(sink.server_address[1]),
+        MAIL_ASYNC="1" if mode == "background" else "0",
+        MAIL_SEND_WORKERS=str(args.mail_workers),
+        RATE_LIMIT_ENABLED="0",
+        METRICS_ENABLED="0",
+        WEB_CONCURRENCY="1",
+        GUNICORN_THREADS=str(args.threads),
+        GUNICORN_ACCESS_LOG="/dev/null",
+    )
+    cmd = [sys.executable, "-m", "gunicorn", "-c", os.path.join(REPO_ROOT, "gunicorn.conf.py"),
+           "--bind", f"127.0.0.1:{port}", "wsgi:app"]
+    proc = subprocess.Popen(cmd, cwd=REPO_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        if not wait_until_up(port):
+            return {"mail": mode, "error": "gunicorn did not start"}
+        base = f"http://127.0.0.1:{port}"
+        before = sink.received
+        warm_up = load(base, 2, 1)
+        drain(sink, before + warm_up["requests"])
+        before = sink.received
+        result = load(base, args.clients, args.duration)
+        # Background mail keeps going after the responses; stopping the worker now would drop it
+        result["drain_s"] = drain(sink, before + result["requests"])
+        result["mails"] = sink.received - before
+        return {"mail": mode, **result}
+    finally:
+        proc.terminate()
+        proc.wait(timeout=60)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--threads", type=int, default=4, help="gunicorn threads in the single worker.")
+    parser.add_argument("--mail-workers", type=int, default=4, help="MAIL_SEND_WORKERS for the background run.")
+    parser.add_argument("--smtp-delay", type=float, default=0.3, help="Seconds the SMTP sink takes per message.")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds of load per run.")
+    args = parser.parse_args(argv)
+
+    try:
+        import gunicorn  # noqa: F401
+    except ImportError:
+        print("gunicorn is required for this benchmark")
+        return 1
+
+    sink = SMTPSink(free_port(), args.smtp_delay)
+    threading.Thread(target=sink.serve_forever, daemon=True).start()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        results = [run(mode, args, sink, workdir) for mode in ("inline", "background")]
+    sink.shutdown()
+
+    cols = ["mail", "requests", "errors", "rps", "p50_ms", "p95_ms", "p99_ms", "mails", "drain_s"]
+    print(f"# POST /register, 1 worker x {args.threads} threads, {args.clients} clients, "
+          f"SMTP {args.smtp_delay * 1000:.0f} ms/message, {args.duration:.0f}s each")
+    print("\t".join(cols))
+    for r in results:
+        if "error" in r:
+            print(f"{r['mail']}\t{r['error']}")
+        else:
+            print("\t".join(str(r[c]) for c in cols))
+    print("# drain_s: time after the load stopped until every notification reached the SMTP sink")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
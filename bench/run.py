@@ -0,0 +1,377 @@
+"""Benchmark harness: drives dashboards, approval routes and APIs under concurrency.
+
+Runs the app in-process (WSGI test clients, one per thread and role) against
+a seeded database and reports throughput, p50/p95/p99 latency, SQL queries
+per request (via the SQL profiler header) and peak RSS. Results can be saved
+as a baseline and later runs are compared against it.
+
+A request counts as an error when it fails outright (4xx/5xx), redirects
+where a page was expected or to the login page, flashes a danger/warning
+message, or answers JSON with ``"success": false``.
+
+    python -m bench.run --database-uri sqlite:////tmp/bench.db --seed-drivers 100000
+    python -m bench.run --database-uri postgresql://... --save-baseline
+    python -m bench.run --only dashboard --requests 20 --concurrency 4
+"""
+import argparse
+import io
+import json
+import logging
+import os
+import platform
+import queue
+import resource
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_FILE = os.path.join(REPO_ROOT, "bench", "baselines.json")
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values) - 1, -(-p * len(sorted_values) // 100) - 1))
+    return sorted_values[k]
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def _png():
+    return (io.BytesIO(b"\x89PNG\r\n\x1a\n" + b"0" * 2048), "bench.png")
+
+
+# -------------------------
+# Scenarios
+# -------------------------
+# name -> (role, method, url template, stage/status pool or None, payload factory, payload kind)
+DASHBOARDS = {
+    "dashboard.admin": ("SuperAdmin", "GET", "/dashboard/"),
+    "dashboard.hr": ("HR", "GET", "/dashboard/hr/dashboard"),
+    "dashboard.ops_manager": ("OpsManager", "GET", "/dashboard/ops/dashboard"),
+    "dashboard.ops_supervisor": ("OpsSupervisor", "GET", "/dashboard/ops_supervisor/dashboard"),
+    "dashboard.fleet": ("FleetManager", "GET", "/dashboard/fleet/dashboard"),
+    "dashboard.finance": ("FinanceManager", "GET", "/dashboard/finance/dashboard"),
+}
+
+APIS = {
+    "api.stage_durations": ("SuperAdmin", "GET", "/dashboard/analytics/stage_durations"),
+    "api.metrics": ("SuperAdmin", "GET", "/metrics"),
+}
+
+# Transitions consume one driver/offboarding from the matching pool per request.
+TRANSITIONS = {
+    "approve.ops_manager": ("OpsManager", "/dashboard/ops/approve_driver/{id}", ("driver", "Ops Manager"),
+                            lambda: {}, "form"),
+    "approve.hr": ("HR", "/dashboard/hr/approve_driver/{id}", ("driver", "HR"),
+                   lambda: {"qiwa_contract_created": "on", "company_contract_created": "on",
+                            "qiwa_contract_status": "Approved"}, "form"),
+    "approve.ops_supervisor": ("OpsSupervisor", "/dashboard/ops_supervisor/approve_driver/{id}",
+                               ("driver", "Ops Supervisor"),
+                               lambda: {"platform": "Jahez", "platform_id": "B1", "issued_mobile_number": "0500000000",
+                                        "mobile_issued": "on"}, "form"),
+    "approve.fleet": ("FleetManager", "/dashboard/fleet/assign_vehicle/{id}", ("driver", "Fleet Manager"),
+                      lambda: {"vehicle_plate": "BEN-1", "vehicle_details": "Hilux",
+                               "assignment_date": date.today().isoformat(), "tamm_authorized": "on",
+                               "tamm_authorization_ss": _png()}, "multipart"),
+    "approve.finance": ("FinanceManager", "/dashboard/finance/approve_driver/{id}", ("driver", "Finance"),
+                        lambda: {"transfer_fee_paid": "on", "transfer_fee_amount": "1500"}, "form"),
+    "approve.hr_final": ("HR", "/dashboard/hr/complete_transfer/{id}", ("driver", "HR Final"),
+                         lambda: {"sponsorship_transfer_proof": _png()}, "multipart"),
+    "offboarding.request": ("OpsManager", "/dashboard/ops/api/request_offboarding/{id}",
+                            ("driver", "Completed"), lambda: {}, "form"),
+    "offboarding.ops_supervisor": ("OpsSupervisor", "/dashboard/ops_supervisor/api/clear_offboarding/{id}",
+                                   ("offboarding", "OpsSupervisor"),
+                                   lambda: {"ops_supervisor_note": "bench"}, "json"),
+    "offboarding.fleet": ("FleetManager", "/dashboard/fleet/api/clear_offboarding/{id}", ("offboarding", "Fleet"),
+                          lambda: {"fleet_damage_report": "none", "fleet_damage_cost": "0"}, "json"),
+    "offboarding.finance": ("FinanceManager", "/dashboard/finance/offboarding/clear/{id}",
+                            ("offboarding", "Finance"), lambda: {"finance_adjustments": "100"}, "form"),
+    "offboarding.hr": ("HR", "/dashboard/hr/offboarding/finalize", ("offboarding", "HR"),
+                       lambda: {"company_contract_cancelled": "yes", "qiwa_contract_cancelled": "yes",
+                                "salary_paid": "yes"}, "json"),
+    "offboarding.revoke_tamm": ("FleetManager", "/dashboard/fleet/api/revoke_tamm/{id}",
+                                ("offboarding", "pending_tamm"), lambda: {"tamm_revoked": True}, "json"),
+}
+
+
+class Runner:
+    def __init__(self, app, concurrency):
+        self.app = app
+        self.concurrency = concurrency
+        self._local = threading.local()
+        self._register_counter = iter(range(10**9))
+        self._register_lock = threading.Lock()
+
+    def client(self, role):
+        from bench.seed import BENCH_PASSWORD
+
+        clients = getattr(self._local, "clients", None)
+        if clients is None:
+            clients = self._local.clients = {}
+        if role not in clients:
+            c = self.app.test_client()
+            if role:
+                c.post("/login", data={"username": f"bench_{role.lower()}_0", "password": BENCH_PASSWORD})
+            clients[role] = c
+        return clients[role]
+
+    def pool(self, role, entity, stage, limit):
+        from branches import in_branch
+        from models import Driver, Offboarding, User
+
+        q = queue.Queue()
+        with self.app.app_context():
+            if entity == "driver":
+                model = Driver
+                rows = Driver.query.with_entities(Driver.id).filter(Driver.onboarding_stage == stage)
+                if stage == "Completed":
+                    rows = rows.filter(~Driver.offboarding_records.any())
+            else:
+                model = Offboarding
+                rows = Offboarding.query.with_entities(Offboarding.id).filter(Offboarding.status == stage)
+            # Only records the acting user's branch can see; the rest would just 404
+            user = User.query.filter_by(username=f"bench_{role.lower()}_0").first()
+            if user is not None:
+                rows = in_branch(rows, model, user)
+            for (row_id,) in rows.limit(limit):
+                q.put(row_id)
+        return q
+
+    def _one(self, role, method, url, payload=None, kind="form"):
+        c = self.client(role)
+        start = time.perf_counter()
+        if method == "GET":
+            resp = c.get(url)
+        elif kind == "json":
+            resp = c.post(url, json=payload)
+        else:
+            resp = c.post(url, data=payload, content_type="multipart/form-data" if kind == "multipart" else None)
+        elapsed = time.perf_counter() - start
+        header = resp.headers.get("X-SQL-Profile", "")
+        queries = int(header.split(";")[0].split("=")[1]) if header.startswith("queries=") else None
+        # Redirecting routes report refusals ("Access denied", "already claimed") only as a flash
+        with c.session_transaction() as sess:
+            flashes = sess.pop("_flashes", [])
+        return elapsed, resp.status_code, queries, _failed(method, kind, resp, flashes)
+
+    def run(self, requests, make_call):
+        """Run ``requests`` calls of ``make_call()`` across the thread pool."""
+        results = []
+        lock = threading.Lock()
+
+        def work(_):
+            call = make_call()
+            if call is None:
+                return
+            result = self._one(*call)
+            with lock:
+                results.append(result)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            list(pool.map(work, range(requests)))
+        wall = time.perf_counter() - start
+        return results, wall
+
+    def register_call(self):
+        with self._register_lock:
+            n = next(self._register_counter)
+        data = {
+            "full_name": f"Bench Register {n}", "iqama_number": f"8{os.getpid() % 100:02d}{n:07d}",
+            "iqama_expiry_date": "2030-01-01", "saudi_driving_license": "yes", "nationality": "Pakistan",
+            "city": "Riyadh", "mobile_number": "0500000000", "previous_sponsor_number": "1",
+            "iqama_card_upload": _png(),
+        }
+        return None, "POST", "/register", data, "multipart"
+
+
+def _failed(method, kind, resp, flashes):
+    if resp.status_code >= 400:
+        return True
+    if resp.status_code in (301, 302, 303, 307, 308):
+        # Pages and JSON APIs should answer directly; form posts redirect, but not to the login
+        if method == "GET" or kind == "json" or "/login" in resp.headers.get("Location", ""):
+            return True
+    if any(category in ("danger", "warning", "error") for category, _ in flashes):
+        return True
+    if resp.is_json:
+        body = resp.get_json(silent=True)
+        if isinstance(body, dict) and body.get("success") is False:
+            return True
+    return False
+
+
+def summarize(name, results, wall):
+    latencies = sorted(r[0] for r in results)
+    errors = sum(1 for r in results if r[3])
+    queries = [r[2] for r in results if r[2] is not None]
+    return {
+        "scenario": name,
+        "requests": len(results),
+        "errors": errors,
+        "throughput_rps": round(len(results) / wall, 2) if wall else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "avg_queries": round(sum(queries) / len(queries), 1) if queries else None,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Return human-readable regressions versus a stored baseline."""
+    regressions = []
+    base = {r["scenario"]: r for r in baseline.get("results", [])}
+    for r in results:
+        b = base.get(r["scenario"])
+        if not b or not r["requests"]:
+            continue
+        if b["p95_ms"] and r["p95_ms"] > b["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{r['scenario']}: p95 {r['p95_ms']} ms vs baseline {b['p95_ms']} ms")
+        if b.get("avg_queries") is not None and r["avg_queries"] is not None and r["avg_queries"] > b["avg_queries"]:
+            regressions.append(f"{r['scenario']}: {r['avg_queries']} queries/request vs baseline {b['avg_queries']}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-uri", help="Overrides DATABASE_URI (e.g. sqlite:////tmp/bench.db).")
+    parser.add_argument("--seed-drivers", type=int, default=0, help="Seed this many drivers before running.")
+    parser.add_argument("--requests", type=int, default=50, help="Requests per scenario.")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--only", help="Only run scenarios whose name contains this string.")
+    parser.add_argument("--profile", default="default", help="Baseline name in bench/baselines.json.")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed p95 slowdown before flagging.")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON.")
+    args = parser.parse_args(argv)
+
+    if args.database_uri:
+        os.environ["DATABASE_URI"] = args.database_uri
+    os.environ["SQL_PROFILER_ENABLED"] = "1"
+    os.environ.setdefault("SQL_PROFILER_MAX_QUERIES", str(10**9))
+    os.environ.setdefault("SQL_PROFILER_MAX_DB_MS", str(10**9))
+    os.environ.setdefault("SQL_PROFILER_REPEAT_THRESHOLD", str(10**9))
+
+    # Uploads go to a temporary UPLOAD_FOLDER, out of the repo
+    sys.path.insert(0, REPO_ROOT)
+    workdir = tempfile.mkdtemp(prefix="dobs-bench-")
+    os.environ["UPLOAD_FOLDER"] = os.path.join(workdir, "static", "uploads")
+    try:
+        return _bench(args)
+    finally:
+        # Renders queued by the last scenarios still write into the workdir
+        import clearance
+        clearance.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def _bench(args):
+    import clearance
+    from app import create_app
+    from extensions import db
+    from bench.seed import seed
+
+    app = create_app()
+    app.config.update(MAIL_SUPPRESS_SEND=True)
+    app.extensions["mail"].suppress = True
+    app.logger.setLevel(logging.ERROR)
+
+    with app.app_context():
+        db.create_all()
+        if args.seed_drivers:
+            seed(args.seed_drivers)
+        dialect = db.engine.dialect.name
+        from models import Driver
+        total_drivers = Driver.query.count()
+
+    # Like gunicorn's post_fork: process start-up is not part of any scenario
+    for warmup in clearance.start(app):
+        warmup.result()
+
+    runner = Runner(app, args.concurrency)
+    selected = lambda name: not args.only or args.only in name  # noqa: E731
+    results = []
+
+    for name, (role, method, url) in {**DASHBOARDS, **APIS}.items():
+        if selected(name):
+            out, wall = runner.run(args.requests, lambda: (role, method, url))
+            results.append(summarize(name, out, wall))
+
+    for name, (role, url, (entity, stage), payload, kind) in TRANSITIONS.items():
+        if not selected(name):
+            continue
+        ids = runner.pool(role, entity, stage, args.requests)
+
+        def make_call(role=role, url=url, ids=ids, payload=payload, kind=kind, entity=entity):
+            try:
+                row_id = ids.get_nowait()
+            except queue.Empty:
+                return None
+            body = payload()
+            if "{id}" in url:
+                return role, "POST", url.format(id=row_id), body, kind
+            body["offboarding_id"] = row_id
+            return role, "POST", url, body, kind
+
+        out, wall = runner.run(args.requests, make_call)
+        results.append(summarize(name, out, wall))
+        # Completions queue clearance PDFs; let them render before timing the next scenario
+        clearance.wait_pending()
+
+    if selected("public.register"):
+        out, wall = runner.run(args.requests, runner.register_call)
+        results.append(summarize("public.register", out, wall))
+
+    meta = {
+        "dialect": dialect, "drivers": total_drivers, "requests": args.requests,
+        "concurrency": args.concurrency, "python": platform.python_version(), "machine": platform.machine(),
+    }
+
+    if args.json:
+        print(json.dumps({"meta": meta, "results": results}, indent=2))
+    else:
+        print(f"# {dialect}, {total_drivers} drivers, {args.requests} requests x {args.concurrency} threads")
+        cols = ["scenario", "requests", "errors", "throughput_rps", "p50_ms", "p95_ms", "p99_ms",
+                "avg_queries", "peak_rss_mb"]
+        print("\t".join(cols))
+        for r in results:
+            print("\t".join(str(r[c]) for c in cols))
+
+    baselines = {}
+    if os.path.exists(BASELINE_FILE):
+        with open(BASELINE_FILE) as fh:
+            baselines = json.load(fh)
+
+    if args.save_baseline:
+        baselines[args.profile] = {"meta": meta, "results": results}
+        with open(BASELINE_FILE, "w") as fh:
+            json.dump(baselines, fh, indent=2, sort_keys=True)
+            fh.write("\n")
+        print(f"Saved baseline '{args.profile}' to {BASELINE_FILE}")
+        return 0
+
+    if args.profile in baselines:
+        regressions = compare(results, baselines[args.profile], args.tolerance)
+        if regressions:
+            print("REGRESSIONS:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"No regressions against baseline '{args.profile}'.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,193 @@
+"""Synthetic fleet generator for load tests and benchmarks.
+
+Seeds users for every role and N drivers spread realistically across
+onboarding stages, with offboarding records for part of the completed
+fleet. Rows are bulk-inserted in chunks, so 100k drivers take seconds.
+
+    python -m bench.seed --drivers 100000 --database-uri sqlite:///bench.db
+"""
+import argparse
+import os
+import random
+from datetime import date, datetime, timedelta
+
+ROLES = ["SuperAdmin", "HR", "OpsManager", "OpsSupervisor", "FleetManager", "FinanceManager"]
+CITIES = ["Riyadh", "Jeddah", "Dammam", "Makkah", "Madinah", "Khobar"]
+PLATFORMS = ["Jahez", "HungerStation", "Keeta", "Mrsool", "ToYou"]
+NATIONALITIES = ["Pakistan", "India", "Bangladesh", "Egypt", "Sudan", "Yemen"]
+
+# Share of drivers currently sitting in each onboarding stage
+STAGE_WEIGHTS = [
+    ("Ops Manager", 6), ("HR", 6), ("Ops Supervisor", 5), ("Fleet Manager", 5),
+    ("Finance", 5), ("HR Final", 3), ("Completed", 70),
+]
+STAGE_ORDER = [s for s, _ in STAGE_WEIGHTS]
+# Share of completed drivers with an offboarding record, and where it sits
+OFFBOARDING_RATE = 0.15
+OFFBOARDING_WEIGHTS = [
+    ("OpsSupervisor", 10), ("Fleet", 10), ("Finance", 10), ("HR", 10), ("pending_tamm", 5), ("Completed", 55),
+]
+OFFBOARDING_ORDER = [s for s, _ in OFFBOARDING_WEIGHTS]
+
+BENCH_PASSWORD = "bench"
+
+
+def _driver_row(i, stage, rng, now):
+    reached = STAGE_ORDER.index(stage)
+    t = now - timedelta(days=rng.uniform(1, 365))
+
+    def step():
+        nonlocal t
+        t = t + timedelta(hours=rng.lognormvariate(2.5, 1.0))
+        return t
+
+    row = {
+        "id": i,
+        "full_name": f"Bench Driver {i}",
+        "iqama_number": f"9{i:09d}",
+        "iqama_expiry_date": date.today() + timedelta(days=rng.randint(-30, 730)),
+        "saudi_driving_license": rng.random() < 0.8,
+        "nationality": rng.choice(NATIONALITIES),
+        "mobile_number": f"05{rng.randint(10_000_000, 99_999_999)}",
+        "previous_sponsor_number": str(rng.randint(1_000_000, 9_999_999)),
+        "iqama_card_upload": f"bench_driver_{i}.png",
+        "city": rng.choice(CITIES),
+        "platform": "Unknown",
+        "onboarding_stage": stage,
+    }
+    if reached >= 1:
+        row.update(ops_manager_approved=True, ops_manager_approved_at=step())
+    if reached >= 2:
+        row.update(qiwa_contract_created=True, company_contract_created=True,
+                   qiwa_contract_status="Approved", hr_approved_at=step())
+    if reached >= 3:
+        row.update(platform=rng.choice(PLATFORMS), platform_id=f"P{i}", issued_mobile_number=f"05{i:08d}",
+                   mobile_issued=True, ops_supervisor_approved_at=step())
+    if reached >= 4:
+        row.update(car_details=f"BEN-{i % 10000:04d} - Toyota Hilux", assignment_date=t.date(),
+                   tamm_authorized=True, tamm_authorization_ss=f"bench_tamm_{i}.png",
+                   fleet_manager_approved_at=step())
+    if reached >= 5:
+        paid = step()
+        row.update(transfer_fee_paid=True, transfer_fee_amount=float(rng.choice([1000, 1500, 2000, 2500])),
+                   transfer_fee_paid_at=paid, finance_approved_at=paid)
+    if reached >= 6:
+        row.update(sponsorship_transfer_status="Completed", sponsorship_transfer_proof=f"bench_transfer_{i}.png")
+    return row, t
+
+
+def _offboarding_row(i, driver_id, city, status, requested_by, rng, start):
+    reached = OFFBOARDING_ORDER.index(status)
+    t = start + timedelta(days=rng.uniform(1, 60))
+    # Core inserts skip the before_insert hook that copies the driver's city
+    row = {"id": i, "driver_id": driver_id, "city": city, "requested_by_id": requested_by, "requested_at": t,
+           "created_at": t, "updated_at": t, "status": status}
+
+    def step():
+        nonlocal t
+        t = t + timedelta(hours=rng.lognormvariate(2.0, 1.0))
+        row["updated_at"] = t
+        return t
+
+    if reached >= 1:
+        row.update(ops_supervisor_cleared=True, ops_supervisor_cleared_at=step(), ops_supervisor_note="Returned")
+    if reached >= 2:
+        row.update(fleet_cleared=True, fleet_cleared_at=step(), fleet_damage_cost=float(rng.choice([0, 0, 250, 800])))
+    if reached >= 3:
+        row.update(finance_cleared=True, finance_cleared_at=step(), finance_adjustments=float(rng.randint(0, 3000)))
+    if reached >= 4:
+        row.update(hr_cleared=True, hr_cleared_at=step(), company_contract_cancelled=True,
+                   qiwa_contract_cancelled=True, salary_paid=True)
+    if reached >= 5:
+        row.update(tamm_revoked=True, tamm_revoked_at=step())
+    return row
+
+
+def seed(n_drivers=100_000, users_per_role=3, random_seed=42, chunk_size=5_000, echo=print):
+    """Bulk-insert users and a synthetic fleet. Must run inside an app context."""
+    from sqlalchemy import func, insert, text
+    from werkzeug.security import generate_password_hash
+
+    from extensions import db
+    from models import Driver, Offboarding, User
+
+    rng = random.Random(random_seed)
+    now = datetime.utcnow()
+    password = generate_password_hash(BENCH_PASSWORD)
+
+    users = []
+    for role in ROLES:
+        for n in range(users_per_role):
+            username = f"bench_{role.lower()}_{n}"
+            if not User.query.filter_by(username=username).first():
+                users.append(User(username=username, password=password, role=role, name=username,
+                                  branch_city=CITIES[n % len(CITIES)], email=f"{username}@bench.local"))
+    db.session.add_all(users)
+    db.session.commit()
+    ops_manager_ids = [u.id for u in User.query.filter_by(role="OpsManager").all()]
+
+    next_driver = (db.session.query(func.max(Driver.id)).scalar() or 0) + 1
+    next_offboarding = (db.session.query(func.max(Offboarding.id)).scalar() or 0) + 1
+    stages, weights = zip(*STAGE_WEIGHTS)
+    ob_statuses, ob_weights = zip(*OFFBOARDING_WEIGHTS)
+
+    drivers, offboardings = [], []
+    total_offboardings = 0
+
+    def flush():
+        if drivers:
+            db.session.execute(insert(Driver), drivers)
+        if offboardings:
+            db.session.execute(insert(Offboarding), offboardings)
+        db.session.commit()
+        drivers.clear()
+        offboardings.clear()
+
+    for n in range(n_drivers):
+        driver_id = next_driver + n
+        stage = rng.choices(stages, weights)[0]
+        row, last = _driver_row(driver_id, stage, rng, now)
+        drivers.append(row)
+        if stage == "Completed" and rng.random() < OFFBOARDING_RATE:
+            status = rng.choices(ob_statuses, ob_weights)[0]
+            offboardings.append(_offboarding_row(next_offboarding + total_offboardings, driver_id, row["city"],
+                                                 status, rng.choice(ops_manager_ids), rng, last))
+            total_offboardings += 1
+        if len(drivers) >= chunk_size:
+            flush()
+            echo(f"  seeded {n + 1}/{n_drivers} drivers")
+    flush()
+
+    if db.engine.dialect.name == "postgresql":
+        for table in ("driver", "offboarding"):
+            db.session.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT MAX(id) FROM {table}))"
+            ))
+        db.session.commit()
+
+    echo(f"Seeded {n_drivers} drivers, {total_offboardings} offboardings, {len(users)} users.")
+    return n_drivers, total_offboardings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--drivers", type=int, default=100_000)
+    parser.add_argument("--users-per-role", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--database-uri", help="Overrides DATABASE_URI (e.g. sqlite:///bench.db).")
+    args = parser.parse_args(argv)
+
+    if args.database_uri:
+        os.environ["DATABASE_URI"] = args.database_uri
+
+    from app import create_app
+    from extensions import db
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        seed(args.drivers, args.users_per_role, args.seed)
+
+
+if __name__ == "__main__":
+    main()
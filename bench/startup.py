@@ -0,0 +1,70 @@
+"""Startup-time benchmark: import + create_app() + first request, in fresh processes.
+
+Each run starts a new interpreter so imports are cold, as they are for a
+newly spawned worker. Fails (exit 1) when the median total exceeds the
+budget.
+
+    python -m bench.startup --runs 5 --budget-ms 1500
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = r"""
+import json, sys, time
+t0 = time.perf_counter()
+import app as app_module
+t1 = time.perf_counter()
+app = app_module.create_app()
+t2 = time.perf_counter()
+resp = app.test_client().get(sys.argv[1])
+t3 = time.perf_counter()
+print(json.dumps({"import_ms": (t1 - t0) * 1000, "create_app_ms": (t2 - t1) * 1000,
+                  "first_request_ms": (t3 - t2) * 1000, "status": resp.status_code}))
+"""
+
+
+def measure(path, env):
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE, path], cwd=REPO_ROOT, env=env,
+        capture_output=True, text=True, check=True,
+    )
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+    result["total_ms"] = result["import_ms"] + result["create_app_ms"] + result["first_request_ms"]
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=1500.0, help="Budget for the median total.")
+    parser.add_argument("--path", default="/login", help="URL for the first request.")
+    parser.add_argument("--database-uri", help="Overrides DATABASE_URI.")
+    args = parser.parse_args(argv)
+
+    env = dict(os.environ)
+    if args.database_uri:
+        env["DATABASE_URI"] = args.database_uri
+
+    runs = [measure(args.path, env) for _ in range(args.runs)]
+    phases = ["import_ms", "create_app_ms", "first_request_ms", "total_ms"]
+    print("phase\tmedian_ms\tmin_ms\tmax_ms")
+    for phase in phases:
+        values = [r[phase] for r in runs]
+        print(f"{phase}\t{statistics.median(values):.1f}\t{min(values):.1f}\t{max(values):.1f}")
+
+    median_total = statistics.median(r["total_ms"] for r in runs)
+    if median_total > args.budget_ms:
+        print(f"OVER BUDGET: median startup {median_total:.1f} ms > {args.budget_ms:.0f} ms")
+        return 1
+    print(f"Within budget: median startup {median_total:.1f} ms <= {args.budget_ms:.0f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
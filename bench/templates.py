@@ -0,0 +1,126 @@
+"""Template cache benchmark: dashboards with thousands of cards, fragment cache off vs. on.
+
+Seeds a fleet (default 5k drivers) into a fresh database and, for each
+dashboard, reports the median request time and card count with the
+``{% cache %}`` fragment cache disabled, cold (first render) and warm. It
+also times compiling the dashboard templates in a fresh Jinja environment
+with and without the bytecode cache, as a newly started worker would.
+
+    python -m bench.templates --drivers 5000 --requests 5
+"""
+import argparse
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DASHBOARDS = {
+    "admin": ("SuperAdmin", "/dashboard/"),
+    "hr": ("HR", "/dashboard/hr/dashboard"),
+    "finance": ("FinanceManager", "/dashboard/finance/dashboard"),
+    "ops_manager": ("OpsManager", "/dashboard/ops/dashboard"),
+}
+TEMPLATES = [
+    "dashboard.html", "dashboard_hr.html", "dashboard_ops.html", "dashboard_ops_supervisor.html",
+    "dashboard_fleet.html", "dashboard_finance.html",
+]
+
+
+def _login(app, role):
+    from bench.seed import BENCH_PASSWORD
+    client = app.test_client()
+    resp = client.post("/login", data={"username": f"bench_{role.lower()}_0", "password": BENCH_PASSWORD})
+    assert resp.status_code == 302, f"login failed for {role}"
+    return client
+
+
+def _timed_get(client, url):
+    start = time.perf_counter()
+    resp = client.get(url)
+    elapsed = (time.perf_counter() - start) * 1000
+    assert resp.status_code == 200, f"{url} -> {resp.status_code}"
+    return elapsed, resp.data.count(b'class="driver-card')
+
+
+def bench_dashboards(app, requests):
+    env = app.jinja_env
+    rows = []
+    for name, (role, url) in DASHBOARDS.items():
+        client = _login(app, role)
+
+        env.fragment_cache_enabled = False
+        _timed_get(client, url)  # warm the ORM / template compile
+        uncached = [_timed_get(client, url)[0] for _ in range(requests)]
+
+        env.fragment_cache_enabled = True
+        env.fragment_cache.clear()
+        cold, cards = _timed_get(client, url)
+        warm = [_timed_get(client, url)[0] for _ in range(requests)]
+
+        off, on = statistics.median(uncached), statistics.median(warm)
+        rows.append({
+            "dashboard": name, "cards": cards, "no_cache_ms": round(off, 1), "cold_ms": round(cold, 1),
+            "warm_ms": round(on, 1), "speedup": round(off / on, 2) if on else None,
+        })
+    return rows
+
+
+def bench_compile(app, cache_dir):
+    from jinja2 import Environment, FileSystemBytecodeCache
+
+    from template_cache import FragmentCacheExtension
+
+    def compile_all(bytecode_cache):
+        env = Environment(loader=app.jinja_env.loader, extensions=[FragmentCacheExtension],
+                          bytecode_cache=bytecode_cache, autoescape=True)
+        start = time.perf_counter()
+        for name in TEMPLATES:
+            env.get_template(name)
+        return (time.perf_counter() - start) * 1000
+
+    os.makedirs(cache_dir, exist_ok=True)
+    no_cache = compile_all(None)
+    compile_all(FileSystemBytecodeCache(cache_dir))  # populate
+    with_cache = compile_all(FileSystemBytecodeCache(cache_dir))
+    return round(no_cache, 1), round(with_cache, 1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--drivers", type=int, default=5000)
+    parser.add_argument("--requests", type=int, default=5, help="Timed requests per dashboard and mode.")
+    parser.add_argument("--database-uri", help="Defaults to a fresh SQLite file.")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="dobs-templates-")
+    os.environ["DATABASE_URI"] = args.database_uri or f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ["JINJA_BYTECODE_CACHE_DIR"] = ""
+    sys.path.insert(0, REPO_ROOT)
+
+    from app import create_app
+    from bench.seed import seed
+    from extensions import db
+
+    app = create_app()
+    app.logger.setLevel(logging.ERROR)
+    with app.app_context():
+        db.create_all()
+        seed(args.drivers, users_per_role=1, echo=lambda *a: None)
+
+    print(f"# {args.drivers} drivers, median of {args.requests} requests")
+    cols = ["dashboard", "cards", "no_cache_ms", "cold_ms", "warm_ms", "speedup"]
+    print("\t".join(cols))
+    for row in bench_dashboards(app, args.requests):
+        print("\t".join(str(row[c]) for c in cols))
+
+    no_cache, with_cache = bench_compile(app, os.path.join(workdir, "jinja"))
+    print(f"compile {len(TEMPLATES)} templates: {no_cache} ms without bytecode cache, {with_cache} ms with")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
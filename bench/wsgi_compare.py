@@ -0,0 +1,143 @@
+"""Throughput of the Flask dev server versus gunicorn (gunicorn.conf.py).
+
+Starts each server on a free local port, hammers one URL with concurrent
+HTTP clients for a fixed duration and reports requests/s and latency.
+
+    python -m bench.wsgi_compare --database-uri sqlite:////tmp/bench.db --duration 10 --clients 16
+    python -m bench.wsgi_compare --path /dashboard/hr/dashboard --login bench_hr_0:bench
+"""
+import argparse
+import http.cookiejar
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from bench.run import percentile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_until_up(port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+def opener_for(base, login):
+    jar = http.cookiejar.CookieJar()
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(jar))
+    if login:
+        username, password = login.split(":", 1)
+        data = urllib.parse.urlencode({"username": username, "password": password}).encode()
+        opener.open(f"{base}/login", data=data, timeout=30).read()
+    return opener
+
+
+def load(base, path, clients, duration, login):
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    stop = time.time() + duration
+
+    def worker():
+        opener = opener_for(base, login)
+        while time.time() < stop:
+            start = time.perf_counter()
+            try:
+                opener.open(f"{base}{path}", timeout=30).read()
+                ok = True
+            except (urllib.error.URLError, OSError):
+                ok = False
+            elapsed = time.perf_counter() - start
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                else:
+                    errors[0] += 1
+
+    threads = [threading.Thread(target=worker) for _ in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors[0],
+        "rps": round(len(latencies) / duration, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+    }
+
+
+def run_server(name, cmd, port, env, args):
+    proc = subprocess.Popen(cmd, cwd=REPO_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        if not wait_until_up(port):
+            return {"server": name, "error": "did not start"}
+        base = f"http://127.0.0.1:{port}"
+        load(base, args.path, 2, 1, args.login)  # warm-up
+        return {"server": name, **load(base, args.path, args.clients, args.duration, args.login)}
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-uri", help="Overrides DATABASE_URI.")
+    parser.add_argument("--path", default="/")
+    parser.add_argument("--login", help="username:password to log in before requesting --path.")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds of load per server.")
+    args = parser.parse_args(argv)
+
+    env = dict(os.environ, METRICS_ENABLED="0", GUNICORN_ACCESS_LOG="/dev/null")
+    if args.database_uri:
+        env["DATABASE_URI"] = args.database_uri
+
+    results = []
+    port = free_port()
+    dev_cmd = [sys.executable, "-c",
+               f"from app import create_app; create_app().run(host='127.0.0.1', port={port}, threaded=True)"]
+    results.append(run_server("flask-dev", dev_cmd, port, env, args))
+
+    try:
+        import gunicorn  # noqa: F401
+    except ImportError:
+        results.append({"server": "gunicorn", "error": "gunicorn not installed"})
+    else:
+        port = free_port()
+        gun_cmd = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--bind", f"127.0.0.1:{port}", "wsgi:app"]
+        results.append(run_server("gunicorn", gun_cmd, port, env, args))
+
+    cols = ["server", "requests", "errors", "rps", "p50_ms", "p95_ms", "p99_ms"]
+    print(f"# GET {args.path}, {args.clients} clients, {args.duration:.0f}s each")
+    print("\t".join(cols))
+    for r in results:
+        if "error" in r:
+            print(f"{r['server']}\t{r['error']}")
+        else:
+            print("\t".join(str(r[c]) for c in cols))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,16 +1,22 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask import Blueprint, Response, current_app, render_template, request, redirect, url_for, flash, jsonify, stream_with_context
 from flask_login import login_required, current_user
-from models import Offboarding, User, Driver
+from models import Offboarding, User, Driver, StageEvent
 from extensions import db, mail
 from flask_mail import Message
 from datetime import datetime
+import csv
+import io
 import os
 from werkzeug.security import check_password_hash, generate_password_hash
+from uploads import queue_upload_deletion, save_upload
+from db_routing import read_only
+from archive import EXPORT_COLUMNS, iter_driver_export, search_drivers
+import rollups
+from claims import check_version
 
 # ✅ Blueprint for SuperAdmin/Admin
 admin_bp = Blueprint("admin", __name__)
 
-UPLOAD_FOLDER = "static/uploads"
 
 def safe_date(value):
     """Return formatted date if value is datetime/date, else return value or None."""
@@ -35,6 +41,7 @@ def safe_datetime(value):
 # -------------------------
 @admin_bp.route("/")
 @login_required
+@read_only
 def dashboard():
     if current_user.role != "SuperAdmin":
         return "Forbidden", 403
@@ -123,6 +130,7 @@ def dashboard():
             "assignment_date": safe_date(d.assignment_date),
             "finance_approved_at": safe_datetime(d.finance_approved_at),
             "tamm_authorized": d.tamm_authorized,
+            "version": d.version,
             # ✅ New flags for template
             "fully_onboarded": d.onboarding_stage == "Completed",
             "in_offboarding": d.id in offboarded_ids
@@ -183,7 +191,7 @@ def add_driver():
         file = request.files["iqama_card_upload"]
         if file.filename:
             filename = f"iqama_{datetime.utcnow().timestamp()}_{file.filename}"
-            file.save(os.path.join(UPLOAD_FOLDER, filename))
+            save_upload(file, os.path.join(current_app.config["UPLOAD_FOLDER"], filename), "iqama_card_upload")
             iqama_card_upload = filename
 
     tamm_authorization_ss = None
@@ -191,7 +199,7 @@ def add_driver():
         file = request.files["tamm_authorization_ss"]
         if file.filename:
             filename = f"tamm_{datetime.utcnow().timestamp()}_{file.filename}"
-            file.save(os.path.join(UPLOAD_FOLDER, filename))
+            save_upload(file, os.path.join(current_app.config["UPLOAD_FOLDER"], filename), "tamm_authorization_ss")
             tamm_authorization_ss = filename
 
     new_driver = Driver(
@@ -209,6 +217,8 @@ def add_driver():
     )
 
     db.session.add(new_driver)
+    StageEvent.record(new_driver, None, new_driver.onboarding_stage or "Ops Manager",
+                      actor_id=current_user.id, source="admin")
     db.session.commit()
 
     flash(f"Driver {new_driver.full_name} added successfully.", "success")
@@ -221,6 +231,10 @@ def add_driver():
 @login_required
 def update_driver(driver_id):
     driver = Driver.query.get_or_404(driver_id)
+    check_version(driver)
+
+    # Amount and platform feed the finance rollup (the driver's and its offboardings' rows)
+    rollup_before = [(x, rollups.contributions(x)) for x in [driver, *driver.offboarding_records]]
 
     # Update fields
     driver.full_name = request.form.get("full_name", driver.full_name)
@@ -250,23 +264,26 @@ def update_driver(driver_id):
     if transfer_fee_paid_at:
         driver.transfer_fee_paid_at = datetime.strptime(transfer_fee_paid_at, "%Y-%m-%dT%H:%M")
 
-    driver.transfer_fee_amount = request.form.get("transfer_fee_amount") or None
+    amount = request.form.get("transfer_fee_amount")
+    driver.transfer_fee_amount = float(amount) if amount else None
 
     # File uploads
     if "tamm_authorization_ss" in request.files:
         file = request.files["tamm_authorization_ss"]
         if file.filename:
             filename = f"tamm_{datetime.utcnow().timestamp()}_{file.filename}"
-            file.save(os.path.join(UPLOAD_FOLDER, filename))
+            save_upload(file, os.path.join(current_app.config["UPLOAD_FOLDER"], filename), "tamm_authorization_ss")
             driver.tamm_authorization_ss = filename
 
     if "transfer_fee_receipt" in request.files:
         file = request.files["transfer_fee_receipt"]
         if file.filename:
             filename = f"receipt_{datetime.utcnow().timestamp()}_{file.filename}"
-            file.save(os.path.join(UPLOAD_FOLDER, filename))
+            save_upload(file, os.path.join(current_app.config["UPLOAD_FOLDER"], filename), "transfer_fee_receipt")
             driver.transfer_fee_receipt = filename
 
+    for entity, before in rollup_before:
+        rollups.apply_change(before, entity)
     db.session.commit()
     flash("Driver details updated successfully.", "success")
     return redirect(url_for("admin.dashboard"))
@@ -282,12 +299,75 @@ def delete_driver(driver_id):
         return redirect(url_for("admin.dashboard"))
 
     driver = Driver.query.get_or_404(driver_id)
-    db.session.delete(driver)
+    StageEvent.record(driver, driver.onboarding_stage, "Deleted", actor_id=current_user.id)
+    # Soft delete; files and rows are removed in the background by `flask uploads purge`
+    queue_upload_deletion(driver)
+    driver.mark_deleted()
     db.session.commit()
 
     flash(f"Driver {driver.full_name} deleted successfully.", "success")
     return redirect(url_for("admin.dashboard"))
 
+# -------------------------
+# Search & export (live + archived drivers)
+# -------------------------
+@admin_bp.route("/drivers/search")
+@login_required
+@read_only
+def driver_search():
+    if current_user.role != "SuperAdmin":
+        return jsonify({"success": False, "message": "Access denied"}), 403
+
+    term = request.args.get("q", "").strip()
+    if len(term) < 2:
+        return jsonify({"success": False, "message": "Search term must be at least 2 characters"}), 400
+
+    include_archived = request.args.get("archived", "1") != "0"
+    limit = max(1, min(request.args.get("limit", 50, type=int), 200))
+    rows = search_drivers(term, limit=limit, include_archived=include_archived)
+    return jsonify({
+        "success": True,
+        "drivers": [
+            dict(row, updated_at=safe_datetime(row["updated_at"])) for row in rows
+        ],
+    })
+
+
+def _csv_cell(value):
+    """Quote text that spreadsheets would run as a formula (``=``, ``+``, ``-``, ``@``)."""
+    if isinstance(value, str) and value.startswith(("=", "+", "-", "@", "\t", "\r")):
+        return "'" + value
+    return value
+
+
+@admin_bp.route("/drivers/export.csv")
+@login_required
+@read_only
+def driver_export():
+    if current_user.role != "SuperAdmin":
+        return "Forbidden", 403
+
+    include_archived = request.args.get("archived", "1") != "0"
+
+    def generate():
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        writer.writerow([*EXPORT_COLUMNS, "archived"])
+        for n, row in enumerate(iter_driver_export(include_archived), 1):
+            writer.writerow([_csv_cell(row[c]) for c in EXPORT_COLUMNS] + [int(row["archived"])])
+            if n % 500 == 0:
+                yield buf.getvalue()
+                buf.seek(0)
+                buf.truncate()
+        yield buf.getvalue()
+
+    filename = f"drivers-{datetime.utcnow():%Y%m%d}.csv"
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/csv",
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
+
 # -------------------------
 # Add/Edit/Delete Users (unchanged)
 # -------------------------
@@ -0,0 +1,188 @@
+import threading
+import time
+
+from flask import Blueprint, jsonify, request, current_app
+from flask_login import login_required, current_user
+from sqlalchemy import text, func
+
+from extensions import db
+from models import StageEvent
+from db_routing import read_only
+from archive import union_sql
+
+analytics_bp = Blueprint("analytics", __name__)
+
+# (stage label, start column, end column) — time spent waiting in each stage
+DRIVER_STAGES = [
+    ("HR", "ops_manager_approved_at", "hr_approved_at"),
+    ("Ops Supervisor", "hr_approved_at", "ops_supervisor_approved_at"),
+    ("Fleet Manager", "ops_supervisor_approved_at", "fleet_manager_approved_at"),
+    ("Finance", "fleet_manager_approved_at", "finance_approved_at"),
+]
+OFFBOARDING_STAGES = [
+    ("OpsSupervisor", "requested_at", "ops_supervisor_cleared_at"),
+    ("Fleet", "ops_supervisor_cleared_at", "fleet_cleared_at"),
+    ("Finance", "fleet_cleared_at", "finance_cleared_at"),
+    ("HR", "finance_cleared_at", "hr_cleared_at"),
+    ("pending_tamm", "hr_cleared_at", "tamm_revoked_at"),
+]
+GROUP_DIMENSIONS = ("city", "platform")
+PERCENTILES = (50, 90, 99)
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _seconds_between(dialect, start, end):
+    """Dialect-specific SQL expression for (end - start) in seconds."""
+    if dialect == "postgresql":
+        return f"EXTRACT(EPOCH FROM ({end} - {start}))"
+    if dialect == "sqlite":
+        return f"(julianday({end}) - julianday({start})) * 86400.0"
+    return f"TIMESTAMPDIFF(SECOND, {start}, {end})"
+
+
+def _durations_sql(dialect, kind):
+    """UNION ALL of (stage_order, stage, city, platform, seconds) rows, one SELECT per stage.
+
+    Live and archived rows are both included, so archiving never changes the stats.
+    """
+    stages = DRIVER_STAGES if kind == "driver" else OFFBOARDING_STAGES
+    stage_cols = sorted({col for _, start, end in stages for col in (start, end)})
+    if kind == "driver":
+        source, prefix = f"{union_sql('driver', ['id', 'city', 'platform', *stage_cols])} d", "d"
+    else:
+        offboardings = union_sql("offboarding", ["driver_id", *stage_cols])
+        drivers = union_sql("driver", ["id", "city", "platform"])
+        source, prefix = f"{offboardings} o JOIN {drivers} d ON d.id = o.driver_id", "o"
+
+    selects = []
+    for order, (stage, start, end) in enumerate(stages):
+        start_col, end_col = f"{prefix}.{start}", f"{prefix}.{end}"
+        selects.append(
+            f"SELECT {order} AS stage_order, '{stage}' AS stage, "
+            f"COALESCE(NULLIF(d.city, ''), 'Unknown') AS city, COALESCE(d.platform, 'Unknown') AS platform, "
+            f"{_seconds_between(dialect, start_col, end_col)} AS seconds "
+            f"FROM {source} WHERE {start_col} IS NOT NULL AND {end_col} IS NOT NULL"
+        )
+    return "\nUNION ALL\n".join(selects)
+
+
+def compute_stage_durations(kind="driver", group_by=()):
+    """Per-stage duration stats (count, avg, p50/p90/p99, SLA breaches) computed in SQL.
+
+    Percentiles use the nearest-rank method over ROW_NUMBER()/COUNT() window
+    functions so the same query runs on PostgreSQL and SQLite; only the
+    aggregated rows are returned to Python.
+    """
+    dims = [d for d in GROUP_DIMENSIONS if d in group_by]
+    dialect = db.engine.dialect.name
+    partition = ", ".join(["stage_order", "stage"] + dims)
+    dim_cols = "".join(f", {d}" for d in dims)
+    percentile_cols = "".join(
+        f",\n       MIN(CASE WHEN rn >= ({p} * n + 99) / 100 THEN seconds END) AS p{p}"
+        for p in PERCENTILES
+    )
+
+    sql = f"""
+WITH durations AS (
+{_durations_sql(dialect, kind)}
+),
+ranked AS (
+SELECT stage_order, stage{dim_cols}, seconds,
+       ROW_NUMBER() OVER (PARTITION BY {partition} ORDER BY seconds) AS rn,
+       COUNT(*) OVER (PARTITION BY {partition}) AS n
+FROM durations
+WHERE seconds >= 0
+)
+SELECT stage{dim_cols}, MAX(n) AS count, AVG(seconds) AS avg_seconds{percentile_cols},
+       SUM(CASE WHEN seconds > :sla_seconds THEN 1 ELSE 0 END) AS over_sla
+FROM ranked
+GROUP BY {partition}
+ORDER BY {partition}
+"""
+    sla_seconds = current_app.config.get("STAGE_SLA_HOURS", 48) * 3600
+    rows = db.session.execute(text(sql), {"sla_seconds": sla_seconds}).mappings().all()
+
+    results = []
+    for row in rows:
+        item = {"stage": row["stage"]}
+        for d in dims:
+            item[d] = row[d]
+        item["count"] = int(row["count"])
+        item["avg_seconds"] = round(float(row["avg_seconds"]), 1)
+        for p in PERCENTILES:
+            item[f"p{p}_seconds"] = round(float(row[f"p{p}"]), 1)
+        item["over_sla"] = int(row["over_sla"] or 0)
+        results.append(item)
+    return results
+
+
+def _watermark():
+    """Highest stage_event id; it only moves when a transition is recorded."""
+    return db.session.query(func.max(StageEvent.id)).scalar() or 0
+
+
+def get_stage_durations(kind="driver", group_by=()):
+    """Cached compute_stage_durations(); returns (results, watermark they reflect).
+
+    Cache entries are keyed on (kind, group_by) and tagged with the
+    stage_event high-water mark; a cheap MAX(id) lookup decides whether the
+    cached result is still current.
+
+    Refreshes recompute the whole report rather than folding in only the
+    events past the watermark: exact nearest-rank percentiles cannot be
+    updated from new durations without keeping every duration. To keep
+    steady write traffic from turning every request into a full scan, a
+    moved watermark only triggers a recompute once the entry is
+    STAGE_ANALYTICS_MIN_REFRESH seconds old. STAGE_ANALYTICS_CACHE_TTL bounds
+    staleness for edits that bypass the event log (e.g. admin updates).
+    """
+    key = (kind, tuple(d for d in GROUP_DIMENSIONS if d in group_by))
+    ttl = current_app.config.get("STAGE_ANALYTICS_CACHE_TTL", 300)
+    min_refresh = current_app.config.get("STAGE_ANALYTICS_MIN_REFRESH", 60)
+    now = time.monotonic()
+
+    with _cache_lock:
+        cached = _cache.get(key)
+    if cached:
+        age = now - cached["computed_at"]
+        if age < min(min_refresh, ttl) or (age < ttl and cached["watermark"] == _watermark()):
+            return cached["results"], cached["watermark"]
+
+    mark = _watermark()
+
+    results = compute_stage_durations(kind, key[1])
+    with _cache_lock:
+        _cache[key] = {"results": results, "watermark": mark, "computed_at": now}
+    return results, mark
+
+
+def parse_group_by(value):
+    return tuple(v.strip() for v in (value or "").split(",") if v.strip() in GROUP_DIMENSIONS)
+
+
+# -------------------------
+# Time-in-stage / SLA report
+# -------------------------
+@analytics_bp.route("/stage_durations")
+@login_required
+@read_only
+def stage_durations():
+    if current_user.role != "SuperAdmin":
+        return jsonify({"success": False, "message": "Access denied"}), 403
+
+    kind = request.args.get("kind", "driver")
+    if kind not in ("driver", "offboarding"):
+        return jsonify({"success": False, "message": "kind must be 'driver' or 'offboarding'"}), 400
+    group_by = parse_group_by(request.args.get("group_by", "city,platform"))
+
+    results, watermark = get_stage_durations(kind, group_by)
+    return jsonify({
+        "success": True,
+        "kind": kind,
+        "group_by": list(group_by),
+        "sla_hours": current_app.config.get("STAGE_SLA_HOURS", 48),
+        "watermark": watermark,
+        "stages": results,
+    })
@@ -0,0 +1,125 @@
+import base64
+import binascii
+import json
+from datetime import datetime, timedelta
+
+from flask import Blueprint, current_app, jsonify, request
+from flask_login import current_user
+from sqlalchemy import and_, or_
+
+from models import Driver, Offboarding
+
+api_bp = Blueprint("api", __name__)
+
+DEFAULT_PAGE = 100
+
+
+# -------------------------
+# Cursor helpers
+# -------------------------
+# The cursor is an opaque token holding the last (updated_at, id) returned per
+# entity. Rows are read in (updated_at, id) order using the composite indexes.
+def encode_cursor(position):
+    raw = json.dumps(position, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    if not token:
+        return {}
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        position = json.loads(raw)
+        return {
+            kind: (datetime.fromisoformat(ts), int(row_id))
+            for kind, (ts, row_id) in position.items()
+            if kind in ("driver", "offboarding")
+        }
+    except (binascii.Error, ValueError, TypeError, AttributeError):
+        raise ValueError("invalid cursor")
+
+
+def _serialize_driver(d):
+    return {
+        "id": d.id,
+        "full_name": d.full_name,
+        "iqama_number": d.iqama_number,
+        "onboarding_stage": d.onboarding_stage,
+        "city": d.city,
+        "platform": d.platform,
+        "platform_id": d.platform_id,
+        "sponsorship_transfer_status": d.sponsorship_transfer_status,
+        "version": d.version,
+        "updated_at": d.updated_at.isoformat() if d.updated_at else None,
+        "deleted": d.deleted_at is not None,
+    }
+
+
+def _serialize_offboarding(o):
+    return {
+        "id": o.id,
+        "driver_id": o.driver_id,
+        "status": o.status,
+        "requested_at": o.requested_at.isoformat() if o.requested_at else None,
+        "version": o.version,
+        "updated_at": o.updated_at.isoformat() if o.updated_at else None,
+        "deleted": o.deleted_at is not None,
+    }
+
+
+def _changed_since(model, after, until, limit):
+    query = model.query.filter(model.updated_at <= until)
+    if after is not None:
+        ts, row_id = after
+        query = query.filter(or_(
+            model.updated_at > ts,
+            and_(model.updated_at == ts, model.id > row_id),
+        ))
+    # Deletions are changes too: clients drop rows flagged "deleted"
+    return query.order_by(model.updated_at, model.id).limit(limit).execution_options(include_deleted=True).all()
+
+
+def _authorized():
+    token = current_app.config.get("CHANGES_API_TOKEN")
+    if token and request.headers.get("Authorization") == f"Bearer {token}":
+        return True
+    return current_user.is_authenticated and current_user.role == "SuperAdmin"
+
+
+# -------------------------
+# Delta sync: drivers and offboardings changed after a cursor
+# -------------------------
+@api_bp.route("/changes")
+def changes():
+    if not _authorized():
+        return jsonify({"success": False, "message": "Access denied"}), 403
+
+    try:
+        position = decode_cursor(request.args.get("since"))
+    except ValueError:
+        return jsonify({"success": False, "message": "Invalid cursor"}), 400
+
+    max_page = current_app.config.get("CHANGES_API_MAX_PAGE", 500)
+    limit = max(1, min(request.args.get("limit", DEFAULT_PAGE, type=int), max_page))
+
+    # Rows written in the last few seconds may belong to transactions that have
+    # not committed yet (or were stamped by a worker whose clock is slightly
+    # behind); leave them for the next call so the cursor never skips them.
+    until = datetime.utcnow() - timedelta(seconds=current_app.config.get("CHANGES_API_SETTLE_SECONDS", 5))
+
+    drivers = _changed_since(Driver, position.get("driver"), until, limit)
+    offboardings = _changed_since(Offboarding, position.get("offboarding"), until, limit)
+
+    next_position = {kind: [ts.isoformat(), row_id] for kind, (ts, row_id) in position.items()}
+    if drivers:
+        next_position["driver"] = [drivers[-1].updated_at.isoformat(), drivers[-1].id]
+    if offboardings:
+        next_position["offboarding"] = [offboardings[-1].updated_at.isoformat(), offboardings[-1].id]
+
+    return jsonify({
+        "success": True,
+        "drivers": [_serialize_driver(d) for d in drivers],
+        "offboardings": [_serialize_offboarding(o) for o in offboardings],
+        "next_cursor": encode_cursor(next_position),
+        "has_more": len(drivers) == limit or len(offboardings) == limit,
+    })
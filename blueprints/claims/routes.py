@@ -0,0 +1,74 @@
+from datetime import datetime
+
+from flask import Blueprint, jsonify, request
+from flask_login import login_required, current_user
+
+from claims import claim_next, release_claims
+from models import Driver, Offboarding
+
+claims_bp = Blueprint("claims", __name__)
+
+MAX_CLAIM = 50
+
+
+def _model_from_request():
+    kind = request.args.get("kind") or (request.get_json(silent=True) or {}).get("kind") or "driver"
+    return {"driver": Driver, "offboarding": Offboarding}.get(kind)
+
+
+def _serialize_claim(row):
+    return {
+        "id": row.id,
+        "stage": row.onboarding_stage if isinstance(row, Driver) else row.status,
+        "name": row.full_name if isinstance(row, Driver) else (row.driver.full_name if row.driver else ""),
+        "claimed_until": row.claimed_until.isoformat() if row.claimed_until else None,
+        "version": row.version,
+    }
+
+
+# -------------------------
+# Claim next N records for my role
+# -------------------------
+@claims_bp.route("/claim", methods=["POST"])
+@login_required
+def claim():
+    model = _model_from_request()
+    if model is None:
+        return jsonify({"success": False, "message": "kind must be 'driver' or 'offboarding'"}), 400
+
+    n = max(1, min(request.args.get("n", 5, type=int), MAX_CLAIM))
+    rows = claim_next(model, current_user, n)
+    return jsonify({"success": True, "claimed": [_serialize_claim(r) for r in rows]})
+
+
+# -------------------------
+# Release my claims
+# -------------------------
+@claims_bp.route("/release", methods=["POST"])
+@login_required
+def release():
+    model = _model_from_request()
+    if model is None:
+        return jsonify({"success": False, "message": "kind must be 'driver' or 'offboarding'"}), 400
+
+    ids = (request.get_json(silent=True) or {}).get("ids")
+    released = release_claims(model, current_user, ids)
+    return jsonify({"success": True, "released": released})
+
+
+# -------------------------
+# List my active claims
+# -------------------------
+@claims_bp.route("/mine")
+@login_required
+def mine():
+    model = _model_from_request()
+    if model is None:
+        return jsonify({"success": False, "message": "kind must be 'driver' or 'offboarding'"}), 400
+
+    rows = (
+        model.query
+        .filter(model.claimed_by_id == current_user.id, model.claimed_until > datetime.utcnow())
+        .all()
+    )
+    return jsonify({"success": True, "claimed": [_serialize_claim(r) for r in rows]})
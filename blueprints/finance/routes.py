@@ -7,13 +7,17 @@ from werkzeug.utils import secure_filename
 from models import Driver, User
 from extensions import db, mail
 from flask_mail import Message
-from models import Offboarding
+from models import Offboarding, StageEvent
+from uploads import save_upload
+from db_routing import read_only
+from claims import transition_blocked
+from branches import get_in_branch_or_404, in_branch, user_branch
+import rollups
 
 
 finance_bp = Blueprint("finance", __name__)
 
-# Configure upload folder & allowed file types
-UPLOAD_FOLDER = "static/uploads"
+# Allowed file types (uploads go to config UPLOAD_FOLDER)
 ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg", "pdf"}
 
 def allowed_file(filename):
@@ -33,6 +37,7 @@ from sqlalchemy import not_, exists
 
 @finance_bp.route("/dashboard")
 @login_required
+@read_only
 def dashboard_finance():
     """Display pending and completed drivers for Finance stage."""
     if current_user.role != "FinanceManager":
@@ -40,11 +45,11 @@ def dashboard_finance():
         return redirect(url_for("auth.login"))
 
     # Pending drivers: onboarding stage = Finance
-    pending_drivers = Driver.query.filter_by(onboarding_stage="Finance").all()
+    pending_drivers = in_branch(Driver.query, Driver).filter_by(onboarding_stage="Finance").all()
 
     # Completed drivers: onboarding_stage = Completed AND NOT in Offboarding
     completed_drivers = (
-        Driver.query
+        in_branch(Driver.query, Driver)
         .filter(
             Driver.onboarding_stage == "Completed",
             ~exists().where(Offboarding.driver_id == Driver.id)
@@ -54,7 +59,7 @@ def dashboard_finance():
 
     # Offboarding requests (pending in finance)
     offboarding_requests = (
-        Offboarding.query
+        in_branch(Offboarding.query, Offboarding)
         .filter_by(status="Finance")
         .order_by(Offboarding.requested_at.desc())
         .all()
@@ -80,7 +85,14 @@ def approve_driver(driver_id):
         flash("Access denied. Finance Manager role required.", "danger")
         return redirect(url_for("auth.login"))
 
-    driver = Driver.query.get_or_404(driver_id)
+    driver = get_in_branch_or_404(Driver, driver_id)
+
+    blocked = transition_blocked(driver, "Finance", current_user)
+    if blocked:
+        flash(blocked, "warning")
+        return redirect(url_for("finance.dashboard_finance"))
+
+    rollup_before = rollups.contributions(driver)
 
     # ✅ Collect finance form fields
     driver.transfer_fee_paid = bool(request.form.get("transfer_fee_paid"))
@@ -129,14 +141,18 @@ def approve_driver(driver_id):
 
         new_filename = make_safe_filename(driver, file.filename)
         filepath = os.path.join(upload_folder, secure_filename(new_filename))
-        file.save(filepath)
+        save_upload(file, filepath, "transfer_fee_receipt")
         driver.transfer_fee_receipt = new_filename
 
     # ✅ Mark as finance approved
     driver.transfer_fee_paid = True
     driver.transfer_fee_paid_at = datetime.utcnow()
+    from_stage = driver.onboarding_stage
     driver.finance_approved_at = datetime.utcnow()
     driver.onboarding_stage = "HR Final"
+    StageEvent.record(driver, from_stage, driver.onboarding_stage, actor_id=current_user.id,
+                      transfer_fee_amount=driver.transfer_fee_amount)
+    rollups.apply_change(rollup_before, driver)
 
     try:
         db.session.commit()
@@ -169,7 +185,7 @@ Regards,
 Finance Department
 """
             )
-            mail.send(msg)
+            mail.send_later(msg)
 
         flash(f"✅ Driver {driver.full_name} has been financially cleared and marked as Completed.", "success")
     except Exception as e:
@@ -217,10 +233,16 @@ def clear_offboarding(offboarding_id):
     if current_user.role != "FinanceManager":
         return jsonify({"success": False, "message": "Access denied. Finance Manager role required."}), 403
 
-    record = Offboarding.query.get_or_404(offboarding_id)
+    record = get_in_branch_or_404(Offboarding, offboarding_id)
+
+    blocked = transition_blocked(record, "Finance", current_user)
+    if blocked:
+        return jsonify({"success": False, "message": blocked}), 409
 
     try:
         # Collect inputs
+        from_status = record.status
+        rollup_before = rollups.contributions(record)
         record.finance_cleared = True
         record.finance_cleared_at = datetime.utcnow()
         record.finance_adjustments = float(request.form.get("finance_adjustments") or 0)
@@ -232,7 +254,7 @@ def clear_offboarding(offboarding_id):
             if not allowed_file(file.filename):
                 return jsonify({"success": False, "message": "Invalid file type. Allowed: JPG, JPEG, PNG, PDF."}), 400
 
-            upload_folder = current_app.config.get("UPLOAD_FOLDER") or "static/uploads"
+            upload_folder = current_app.config["UPLOAD_FOLDER"]
             os.makedirs(upload_folder, exist_ok=True)
 
             # Sanitize name
@@ -241,11 +263,14 @@ def clear_offboarding(offboarding_id):
             ext = file.filename.rsplit(".", 1)[1].lower()
             safe_name = secure_filename(f"offboarding_{base_name}_{iqama_clean}_invoice.{ext}")
 
-            file.save(os.path.join(upload_folder, safe_name))
+            save_upload(file, os.path.join(upload_folder, safe_name), "finance_invoice_file")
             record.finance_invoice_file = safe_name
 
         # Move to HR stage
         record.status = "HR"
+        StageEvent.record(record, from_status, record.status, actor_id=current_user.id,
+                          finance_adjustments=record.finance_adjustments)
+        rollups.apply_change(rollup_before, record)
 
         db.session.commit()
 
@@ -272,7 +297,7 @@ Regards,
 Finance Department
 """
                 )
-                mail.send(msg)
+                mail.send_later(msg)
         except Exception as e:
             current_app.logger.warning(f"[FINANCE][EMAIL] Failed to notify HR: {e}")
 
@@ -282,3 +307,41 @@ Finance Department
         db.session.rollback()
         current_app.logger.error(f"[FINANCE][OFFBOARD ERROR] {e}")
         return jsonify({"success": False, "message": "Error processing offboarding clearance."}), 500
+
+
+# -------------------------
+# Finance totals report (reads finance_daily_rollup)
+# -------------------------
+@finance_bp.route("/reports/totals")
+@login_required
+@read_only
+def finance_totals():
+    """Transfer fees, damage costs and adjustments per day/month/quarter/year.
+
+    Query args: period (default month), from / to (YYYY-MM-DD, default: this
+    year), group_by (comma-separated: city, platform).
+    """
+    if current_user.role not in ("FinanceManager", "SuperAdmin"):
+        return jsonify({"success": False, "message": "Access denied"}), 403
+
+    period = request.args.get("period", "month")
+    if period not in rollups.PERIODS:
+        return jsonify({"success": False, "message": f"period must be one of: {', '.join(rollups.PERIODS)}"}), 400
+    try:
+        start = datetime.strptime(request.args["from"], "%Y-%m-%d").date() if request.args.get("from") \
+            else date.today().replace(month=1, day=1)
+        end = datetime.strptime(request.args["to"], "%Y-%m-%d").date() if request.args.get("to") else date.today()
+    except ValueError:
+        return jsonify({"success": False, "message": "from/to must be dates (YYYY-MM-DD)"}), 400
+    group_by = [g.strip() for g in request.args.get("group_by", "").split(",") if g.strip() in rollups.GROUP_DIMENSIONS]
+
+    branch = user_branch()
+    return jsonify({
+        "success": True,
+        "period": period,
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "group_by": group_by,
+        "branch": branch,
+        "totals": rollups.totals(period, start, end, group_by, branch),
+    })
@@ -6,8 +6,14 @@ from datetime import datetime, date
 import os
 from flask import current_app
 from werkzeug.utils import secure_filename
-from models import Offboarding, Driver, User
+from models import Offboarding, Driver, User, StageEvent
 from sqlalchemy import or_
+from uploads import save_upload
+from db_routing import read_only
+from claims import transition_blocked
+from branches import get_in_branch_or_404, in_branch
+import rollups
+import clearance
 
 
 fleet_bp = Blueprint("fleet", __name__)
@@ -17,15 +23,16 @@ fleet_bp = Blueprint("fleet", __name__)
 # -------------------------
 @fleet_bp.route("/dashboard")
 @login_required
+@read_only
 def dashboard_fleet():
     if current_user.role != "FleetManager":
         flash("Access denied", "danger")
         return redirect(url_for("auth.login"))
 
-    onboarding_drivers = Driver.query.filter_by(onboarding_stage="Fleet Manager").all()
+    onboarding_drivers = in_branch(Driver.query, Driver).filter_by(onboarding_stage="Fleet Manager").all()
 
     offboarding_requests = (
-        Offboarding.query
+        in_branch(Offboarding.query, Offboarding)
         .filter(
             or_(
                 Offboarding.status == "Fleet",
@@ -53,7 +60,12 @@ def assign_vehicle(driver_id):
         flash("Access denied. Fleet Manager role required.", "danger")
         return redirect(url_for("auth.login"))
 
-    driver = Driver.query.get_or_404(driver_id)
+    driver = get_in_branch_or_404(Driver, driver_id)
+
+    blocked = transition_blocked(driver, "Fleet Manager", current_user)
+    if blocked:
+        flash(blocked, "warning")
+        return redirect(url_for("fleet.dashboard_fleet"))
 
     # ✅ Collect & validate form data
     vehicle_plate = request.form.get("vehicle_plate", "").strip()
@@ -89,7 +101,7 @@ def assign_vehicle(driver_id):
             f"{driver.full_name}_{driver.iqama_number}_{vehicle_plate}_TAMM_Authorisation{ext}"
         )
         upload_path = os.path.join(current_app.config["UPLOAD_FOLDER"], safe_name)
-        tamm_file.save(upload_path)
+        save_upload(tamm_file, upload_path, "tamm_authorization_ss")
 
         # ✅ Store assignment + file info in DB
         driver.car_details = f"{vehicle_plate} - {vehicle_details}"
@@ -98,7 +110,10 @@ def assign_vehicle(driver_id):
         driver.tamm_authorization_ss = safe_name  # <-- store filename
 
         # ✅ Mark Fleet Manager approval & move to Finance stage
+        from_stage = driver.onboarding_stage
         driver.mark_fleet_manager_approved()
+        StageEvent.record(driver, from_stage, driver.onboarding_stage, actor_id=current_user.id,
+                          car_details=driver.car_details)
         db.session.commit()
 
         # ✅ Notify Finance Team (Finance + FinanceManager)
@@ -129,8 +144,8 @@ Regards,
 Fleet Team
 """
                 )
-                mail.send(msg)
-                current_app.logger.info("[FLEET] Finance notification email sent successfully.")
+                mail.send_later(msg)
+                current_app.logger.info("[FLEET] Finance notification email queued.")
             else:
                 current_app.logger.warning("[FLEET] No finance users with email found. Skipping notification.")
         except Exception as e:
@@ -190,10 +205,16 @@ def fleet_clear_offboarding(offboarding_id):
     if current_user.role != "FleetManager":
         return jsonify({"success": False, "message": "Access denied"}), 403
 
-    record = Offboarding.query.get_or_404(offboarding_id)
+    record = get_in_branch_or_404(Offboarding, offboarding_id)
+
+    blocked = transition_blocked(record, "Fleet", current_user)
+    if blocked:
+        return jsonify({"success": False, "message": blocked}), 409
 
     try:
         data = request.get_json()
+        from_status = record.status
+        rollup_before = rollups.contributions(record)
         record.fleet_cleared = True
         record.fleet_cleared_at = datetime.utcnow()
         record.fleet_damage_report = data.get("fleet_damage_report")
@@ -201,6 +222,9 @@ def fleet_clear_offboarding(offboarding_id):
 
         # 🚀 Move to Finance stage
         record.status = "Finance"
+        StageEvent.record(record, from_status, record.status, actor_id=current_user.id,
+                          fleet_damage_cost=record.fleet_damage_cost)
+        rollups.apply_change(rollup_before, record)
 
         db.session.commit()
 
@@ -245,15 +269,21 @@ def revoke_tamm(offboarding_id):
     if current_user.role != "FleetManager":
         return jsonify({"success": False, "message": "Access denied"}), 403
 
-    record = Offboarding.query.get_or_404(offboarding_id)
+    record = get_in_branch_or_404(Offboarding, offboarding_id)
     data = request.get_json()
 
+    blocked = transition_blocked(record, "pending_tamm", current_user)
+    if blocked:
+        return jsonify({"success": False, "message": blocked}), 409
+
     try:
         # Only proceed if TAMM revocation is requested
         if not data.get("tamm_revoked"):
             return jsonify({"success": False, "message": "TAMM not revoked"}), 400
 
         # ✅ Mark driver as fully offboarded
+        from_status = record.status
+        rollup_before = rollups.contributions(record)
         record.status = "Completed"
         record.fleet_cleared = True
         record.fleet_cleared_at = datetime.utcnow()
@@ -261,6 +291,9 @@ def revoke_tamm(offboarding_id):
         # ✅ Mark TAMM revoked fields
         record.tamm_revoked = True
         record.tamm_revoked_at = datetime.utcnow()   # << add timestamp
+        StageEvent.record(record, from_status, record.status, actor_id=current_user.id)
+        # fleet_cleared_at moves to now, and the rollup files fleet totals by that day
+        rollups.apply_change(rollup_before, record)
 
         db.session.commit()
 
@@ -286,6 +319,12 @@ Fleet Team
             )
             mail.send(msg)
 
+        # 📄 Clearance certificate, rendered in the background
+        try:
+            clearance.schedule(record)
+        except Exception as e:
+            current_app.logger.error(f"[CLEARANCE PDF] offboarding {record.id}: {e}")
+
         return jsonify({
             "success": True,
             "message": f"Driver {record.driver.full_name} fully offboarded and email sent.",
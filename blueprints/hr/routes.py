@@ -1,7 +1,6 @@
 # blueprints/hr/routes.py
-from flask import Blueprint, jsonify, render_template, request, redirect, url_for, flash
+from flask import Blueprint, jsonify, render_template, request, redirect, url_for, flash, current_app, send_from_directory
 from flask_login import login_required, current_user
-from blueprints import hr
 from models import Driver, User
 from extensions import db, mail
 from flask_mail import Message
@@ -9,12 +8,16 @@ from datetime import datetime
 import os
 from werkzeug.utils import secure_filename
 from werkzeug.security import check_password_hash, generate_password_hash
-from models import Offboarding
+from models import Offboarding, StageEvent
+from uploads import save_upload
+from db_routing import read_only
+from claims import transition_blocked
+from branches import get_in_branch_or_404, in_branch
+from sqlalchemy.orm import joinedload
+import clearance
 
 hr_bp = Blueprint("hr", __name__, url_prefix='/hr')
 
-UPLOAD_FOLDER = os.path.join(os.getcwd(), "static", "uploads")
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 ALLOWED_EXT = {'.jpg', '.jpeg', '.png', '.pdf'}
 
 def _allowed_filename(fn):
@@ -58,6 +61,7 @@ def _serialize_driver(d):
         "tamm_authorized": bool(d.tamm_authorized),  # ✅ add this
         "sponsorship_transfer_status": d.sponsorship_transfer_status,
         "onboarding_stage": d.onboarding_stage,
+        "version": d.version,
     }
 def _serialize_offboarding(o):
     return {
@@ -82,6 +86,7 @@ def _serialize_offboarding(o):
 # -------------------------
 @hr_bp.route("/dashboard")
 @login_required
+@read_only
 def dashboard_hr():
     if current_user.role != "HR":
         flash("Access denied. HR role required.", "danger")
@@ -90,16 +95,17 @@ def dashboard_hr():
     # --------------------------
     # Get all drivers in HR/HR Final/Completed
     # --------------------------
-    all_drivers = Driver.query.filter(
+    all_drivers = in_branch(Driver.query, Driver).filter(
         Driver.onboarding_stage.in_(["HR", "HR Final", "Completed"])
     ).all()
 
     # --------------------------
-    # Get all drivers currently in offboarding
+    # Get all drivers currently in offboarding (with their drivers, one query)
     # --------------------------
-    offboarding_driver_ids = {o.driver_id for o in Offboarding.query.filter(
+    offboardings = in_branch(Offboarding.query, Offboarding).options(joinedload(Offboarding.driver)).filter(
         Offboarding.status.in_(["HR", "Completed"])
-    ).all()}
+    ).all()
+    offboarding_driver_ids = {o.driver_id for o in offboardings}
 
     # --------------------------
     # Filter out drivers who are in offboarding
@@ -109,7 +115,6 @@ def dashboard_hr():
     # --------------------------
     # Keep your offboarding data as-is
     # --------------------------
-    offboardings = Offboarding.query.filter(Offboarding.status.in_(["HR", "Completed"])).all()
     offboarding_data = []
     for o in offboardings:
         d = o.driver
@@ -128,6 +133,8 @@ def dashboard_hr():
             "fleet_damage_report": getattr(o, "fleet_damage_report", "") or "",
             "fleet_damage_cost": float(getattr(o, "fleet_damage_cost", 0) or 0),
             "salary_paid": getattr(o, "salary_paid", False),
+            "version": o.version,
+            "driver_version": d.version,
         })
 
     return render_template(
@@ -146,7 +153,12 @@ def approve_driver(driver_id):
         flash("Access denied. HR role required.", "danger")
         return redirect(url_for("auth.login"))
 
-    driver = Driver.query.get_or_404(driver_id)
+    driver = get_in_branch_or_404(Driver, driver_id)
+
+    blocked = transition_blocked(driver, "HR", current_user)
+    if blocked:
+        flash(blocked, "warning")
+        return redirect(url_for("hr.dashboard_hr"))
 
     # Save form fields
     driver.qiwa_contract_created = bool(request.form.get("qiwa_contract_created"))
@@ -167,8 +179,10 @@ def approve_driver(driver_id):
         flash("Qiwa contract status must be 'Approved' before approval.", "danger")
         return redirect(url_for("hr.dashboard_hr"))
 
+    from_stage = driver.onboarding_stage
     driver.hr_approved_at = datetime.utcnow()
     driver.onboarding_stage = "Ops Supervisor"
+    StageEvent.record(driver, from_stage, driver.onboarding_stage, actor_id=current_user.id)
 
     db.session.commit()
 
@@ -200,7 +214,12 @@ def complete_sponsorship_transfer(driver_id):
         flash("Access denied", "danger")
         return redirect(url_for("auth.login"))
 
-    driver = Driver.query.get_or_404(driver_id)
+    driver = get_in_branch_or_404(Driver, driver_id)
+
+    blocked = transition_blocked(driver, "HR Final", current_user)
+    if blocked:
+        flash(blocked, "warning")
+        return redirect(url_for("hr.dashboard_hr"))
 
     # handle file upload (optional)
     file = request.files.get("sponsorship_transfer_proof")
@@ -213,8 +232,8 @@ def complete_sponsorship_transfer(driver_id):
         iqama = driver.iqama_number or "unknown"
         filename = f"{driver_name}_{iqama}_transfer_proof{ext}"
 
-        dest = os.path.join(UPLOAD_FOLDER, filename)
-        file.save(dest)
+        dest = os.path.join(current_app.config["UPLOAD_FOLDER"], filename)
+        save_upload(file, dest, "sponsorship_transfer_proof")
 
         # assign to the correct column
         if hasattr(driver, "sponsorship_transfer_proof"):
@@ -223,9 +242,12 @@ def complete_sponsorship_transfer(driver_id):
             driver.transfer_fee_receipt = filename  # fallback
 
     # update statuses and finish
+    from_stage = driver.onboarding_stage
     driver.sponsorship_transfer_status = "Completed"
     driver.sponsorship_transfer_completed_at = datetime.utcnow()
     driver.onboarding_stage = "Completed"
+    StageEvent.record(driver, from_stage, driver.onboarding_stage, actor_id=current_user.id,
+                      sponsorship_transfer_proof=driver.sponsorship_transfer_proof)
 
     db.session.commit()
 
@@ -239,7 +261,7 @@ def complete_sponsorship_transfer(driver_id):
                 recipients=recipients,
                 body=f"Driver {driver.full_name} completed sponsorship transfer. Iqama: {driver.iqama_number or 'N/A'}"
             )
-            mail.send(msg)
+            mail.send_later(msg)
     except Exception as e:
         print("[EMAIL ERROR]", e)
 
@@ -286,7 +308,7 @@ def start_offboarding(driver_id):
         flash("Access denied", "danger")
         return redirect(url_for("auth.login"))
 
-    driver = Driver.query.get_or_404(driver_id)
+    driver = get_in_branch_or_404(Driver, driver_id)
     driver.offboarding_stage = "HR"
     driver.offboarding_reason = request.form.get("offboarding_reason", "Not specified")
     driver.offboarding_requested_at = datetime.utcnow()
@@ -307,11 +329,25 @@ def complete_offboarding(offboarding_id):
         flash("Access denied", "danger")
         return redirect(url_for("auth.login"))
 
-    offboarding = Offboarding.query.get_or_404(offboarding_id)
+    offboarding = get_in_branch_or_404(Offboarding, offboarding_id)
+
+    blocked = transition_blocked(offboarding, "HR", current_user)
+    if blocked:
+        flash(blocked, "warning")
+        return redirect(url_for("hr.dashboard_hr"))
+
     note = request.form.get("hr_note")
+    from_status = offboarding.status
     offboarding.mark_hr_cleared(note=note)
+    StageEvent.record(offboarding, from_status, offboarding.status, actor_id=current_user.id)
 
     db.session.commit()
+
+    try:
+        clearance.schedule(offboarding)
+    except Exception as e:
+        current_app.logger.error(f"[CLEARANCE PDF] offboarding {offboarding.id}: {e}")
+
     flash(f"HR clearance completed for {offboarding.driver.full_name}.", "success")
     return redirect(url_for("hr.dashboard_hr"))
 
@@ -339,7 +375,14 @@ def finalize_offboarding():
         salary_paid = request.form.get("salary_paid") == "yes"
 
     # Fetch Offboarding record
-    offboarding = Offboarding.query.get_or_404(offboarding_id)
+    offboarding = get_in_branch_or_404(Offboarding, offboarding_id)
+
+    blocked = transition_blocked(offboarding, "HR", current_user)
+    if blocked:
+        if request.is_json:
+            return jsonify({"success": False, "message": blocked}), 409
+        flash(blocked, "warning")
+        return redirect(url_for("hr.dashboard_hr"))
 
     # Update fields
     offboarding.company_contract_cancelled = company_cancelled
@@ -355,9 +398,11 @@ def finalize_offboarding():
         return redirect(url_for("hr.dashboard_hr"))
 
     # Mark HR cleared
+    from_status = offboarding.status
     offboarding.hr_cleared = True
     offboarding.hr_cleared_at = datetime.utcnow()
     offboarding.status = "pending_tamm"
+    StageEvent.record(offboarding, from_status, offboarding.status, actor_id=current_user.id)
 
     db.session.commit()
 
@@ -385,3 +430,35 @@ def finalize_offboarding():
         return jsonify({"success": True, "message": success_message})
     flash(success_message, "success")
     return redirect(url_for("hr.dashboard_hr"))
+
+
+# -------------------------
+# Clearance certificate (PDF)
+# -------------------------
+@hr_bp.route("/offboarding/<int:offboarding_id>/clearance.pdf")
+@login_required
+def clearance_pdf(offboarding_id):
+    if current_user.role not in ("HR", "SuperAdmin"):
+        return jsonify({"success": False, "message": "Access denied"}), 403
+
+    record = get_in_branch_or_404(Offboarding, offboarding_id)
+    if record.status != "Completed":
+        return jsonify({"success": False, "message": "Clearance certificates are issued once offboarding is completed."}), 409
+
+    upload_folder = current_app.config["UPLOAD_FOLDER"]
+    if clearance.is_current(record, upload_folder):
+        return send_from_directory(upload_folder, record.clearance_pdf, mimetype="application/pdf")
+
+    # Missing or outdated: render in the background and let the client retry
+    try:
+        clearance.schedule(record)
+    except Exception as e:
+        current_app.logger.error(f"[CLEARANCE PDF] offboarding {record.id}: {e}")
+        response = jsonify({"success": False, "message": "Clearance certificate could not be generated, please retry later."})
+        response.status_code = 503
+        response.headers["Retry-After"] = "30"
+        return response
+    response = jsonify({"success": False, "message": "Clearance certificate is being generated, please retry shortly."})
+    response.status_code = 202
+    response.headers["Retry-After"] = "2"
+    return response
@@ -1,14 +1,13 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app
 from flask_login import login_required, current_user
-from models import Driver, User
 from extensions import db, mail
 from flask_mail import Message
 from datetime import datetime
 from werkzeug.exceptions import BadRequest
-from models import Driver, Offboarding, User
-from flask_mail import Message
-from datetime import datetime
-from app import db, mail
+from models import Driver, Offboarding, User, StageEvent
+from db_routing import read_only
+from claims import check_version, transition_blocked
+from branches import get_in_branch_or_404, in_branch
 
 ops_manager_bp = Blueprint("ops_manager", __name__)
 
@@ -17,19 +16,23 @@ ops_manager_bp = Blueprint("ops_manager", __name__)
 # -------------------------
 @ops_manager_bp.route("/dashboard")
 @login_required
+@read_only
 def dashboard_ops():
     if current_user.role != "OpsManager":
         flash("Access denied. Ops Manager role required.", "danger")
         return redirect(url_for("auth.login"))
 
     # Show drivers that are currently at Ops Manager stage
-    drivers = Driver.query.filter_by(onboarding_stage="Ops Manager").all()
+    drivers = in_branch(Driver.query, Driver).filter_by(onboarding_stage="Ops Manager").all()
     
     # ✅ Get drivers who are COMPLETED (eligible for offboarding)
     # ✅ Completed Drivers eligible for Offboarding
     from sqlalchemy import not_
+    from sqlalchemy.orm import selectinload
+    # The cards (and their cache keys) read each driver's offboarding records: load them in one query
     offboarding_drivers = (
-        Driver.query
+        in_branch(Driver.query, Driver)
+        .options(selectinload(Driver.offboarding_records))
         .filter(Driver.onboarding_stage == "Completed")
         .filter(
             ~Driver.offboarding_records.any(Offboarding.status == "Completed")
@@ -61,13 +64,18 @@ def approve_driver(driver_id):
         flash("Access denied. Ops Manager role required.", "danger")
         return redirect(url_for("auth.login"))
 
-    driver = Driver.query.get_or_404(driver_id)
+    driver = get_in_branch_or_404(Driver, driver_id)
 
     # Validate stage to avoid re-processing
     if driver.onboarding_stage != "Ops Manager":
         flash(f"Driver is not in Ops Manager stage (current: {driver.onboarding_stage}).", "warning")
         return redirect(url_for("ops_manager.dashboard_ops"))
 
+    blocked = transition_blocked(driver, "Ops Manager", current_user)
+    if blocked:
+        flash(blocked, "warning")
+        return redirect(url_for("ops_manager.dashboard_ops"))
+
     # Optional: allow ops manager to add a short note (not required)
     ops_note = request.form.get("ops_note", "").strip()
 
@@ -82,6 +90,7 @@ def approve_driver(driver_id):
 
     # Move to HR stage
     driver.onboarding_stage = "HR"
+    StageEvent.record(driver, "Ops Manager", "HR", actor_id=current_user.id, ops_note=ops_note or None)
 
     # Save
     try:
@@ -181,7 +190,8 @@ def request_offboarding(driver_id):
         flash("Access denied", "danger")
         return redirect(url_for("ops_manager.dashboard_ops"))
 
-    driver = Driver.query.get_or_404(driver_id)
+    driver = get_in_branch_or_404(Driver, driver_id)
+    check_version(driver)
 
     if driver.onboarding_stage != "Completed":
         flash("Only completed drivers can be offboarded.", "warning")
@@ -201,6 +211,7 @@ def request_offboarding(driver_id):
         status="OpsSupervisor"  # 🔑 mark next stage clearly
     )
     db.session.add(offboarding)
+    StageEvent.record(offboarding, None, offboarding.status, actor_id=current_user.id, driver_id=driver.id)
     db.session.commit()
 
     # ✅ Notify Ops Supervisors via email
@@ -232,7 +243,8 @@ def api_request_offboarding(driver_id):
     if current_user.role != "OpsManager":
         return {"success": False, "message": "Access denied"}, 403
 
-    driver = Driver.query.get_or_404(driver_id)
+    driver = get_in_branch_or_404(Driver, driver_id)
+    check_version(driver)
     if driver.onboarding_stage != "Completed":
         return {"success": False, "message": "Only completed drivers can be offboarded."}, 400
 
@@ -246,6 +258,7 @@ def api_request_offboarding(driver_id):
         status="Requested"
     )
     db.session.add(offboarding)
+    StageEvent.record(offboarding, None, offboarding.status, actor_id=current_user.id, driver_id=driver.id)
     db.session.commit()
 
     # notify supervisors (same as before)
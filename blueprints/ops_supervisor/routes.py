@@ -1,6 +1,9 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app
 from flask_login import login_required, current_user
-from models import Driver, User
+from models import Driver, User, StageEvent
+from db_routing import read_only
+from claims import transition_blocked
+from branches import get_in_branch_or_404, in_branch
 from extensions import db, mail
 from flask_mail import Message
 from werkzeug.security import check_password_hash, generate_password_hash
@@ -14,6 +17,7 @@ ops_supervisor_bp = Blueprint("ops_supervisor", __name__)
 
 @ops_supervisor_bp.route("/dashboard")
 @login_required
+@read_only
 def dashboard_ops_supervisor():
     if current_user.role != "OpsSupervisor":
         flash("Access denied", "danger")
@@ -21,7 +25,7 @@ def dashboard_ops_supervisor():
 
     # 🔹 Drivers still in onboarding (Ops Supervisor stage)
     onboarding_drivers = (
-        Driver.query
+        in_branch(Driver.query, Driver)
         .filter_by(onboarding_stage="Ops Supervisor")
         .order_by(Driver.id.desc())
         .all()
@@ -31,7 +35,7 @@ def dashboard_ops_supervisor():
 
         # 🔹 Offboarding requests at Ops Supervisor stage
     offboarding_requests = (
-        Offboarding.query
+        in_branch(Offboarding.query, Offboarding)
         .filter(Offboarding.status.in_(["Requested", "OpsSupervisor"]))
         .order_by(Offboarding.requested_at.desc())
         .all()
@@ -59,7 +63,12 @@ def approve_driver(driver_id):
         flash("Access denied. Ops Supervisor role required.", "danger")
         return redirect(url_for("auth.login"))
 
-    driver = Driver.query.get_or_404(driver_id)
+    driver = get_in_branch_or_404(Driver, driver_id)
+
+    blocked = transition_blocked(driver, "Ops Supervisor", current_user)
+    if blocked:
+        flash(blocked, "warning")
+        return redirect(url_for("ops_supervisor.dashboard_ops_supervisor"))
 
     # Log raw incoming form
     current_app.logger.info(f"[OPS_SUPERVISOR][START] driver_id={driver_id} form={dict(request.form)}")
@@ -92,8 +101,11 @@ def approve_driver(driver_id):
         driver.issued_mobile_number = str(issued_mobile_number)
         driver.issued_device_id = str(issued_device_id) if issued_device_id else None
         driver.mobile_issued = True
+        from_stage = driver.onboarding_stage
         driver.ops_supervisor_approved_at = datetime.utcnow()
         driver.onboarding_stage = "Fleet Manager"
+        StageEvent.record(driver, from_stage, driver.onboarding_stage, actor_id=current_user.id,
+                          platform=driver.platform, platform_id=driver.platform_id)
 
         # Explicitly mark as changed & commit
         db.session.add(driver)
@@ -183,6 +195,7 @@ def change_password():
 from models import Offboarding
 @ops_supervisor_bp.route("/offboarding")
 @login_required
+@read_only
 def offboarding_dashboard():
     if current_user.role != "OpsSupervisor":
         flash("Access denied", "danger")
@@ -190,7 +203,7 @@ def offboarding_dashboard():
 
     # fetch all offboarding requests pending at ops supervisor stage
     offboarding_requests = (
-    Offboarding.query
+    in_branch(Offboarding.query, Offboarding)
     .filter(Offboarding.status.in_(["Requested", "OpsSupervisor"]))
     .order_by(Offboarding.requested_at.desc())
     .all() )
@@ -205,10 +218,15 @@ def api_clear_offboarding(offboarding_id):
     if current_user.role != "OpsSupervisor":
         return {"success": False, "message": "Access denied"}, 403
 
-    record = Offboarding.query.get_or_404(offboarding_id)
+    record = get_in_branch_or_404(Offboarding, offboarding_id)
+
+    blocked = transition_blocked(record, ["Requested", "OpsSupervisor"], current_user)
+    if blocked:
+        return {"success": False, "message": blocked}, 409
 
     try:
         data = request.get_json(force=True)  # parse JSON payload
+        from_status = record.status
         record.ops_supervisor_cleared = True
         record.ops_supervisor_cleared_at = datetime.utcnow()
         record.company_mobile_returned = bool(data.get("company_mobile_returned"))
@@ -217,6 +235,7 @@ def api_clear_offboarding(offboarding_id):
         record.ops_supervisor_note = data.get("ops_supervisor_note", "")
         record.ops_supervisor_id = current_user.id
         record.status = "Fleet"
+        StageEvent.record(record, from_status, record.status, actor_id=current_user.id)
 
         db.session.commit()
 
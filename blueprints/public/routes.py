@@ -1,10 +1,15 @@
 import os
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+import uuid
+from flask import Blueprint, current_app, render_template, request, redirect, url_for, flash
 from extensions import db
-from models import Driver
+from models import Driver, StageEvent
 from datetime import datetime
 from flask_mail import Message
 from extensions import mail
+from sqlalchemy.exc import IntegrityError
+from uploads import save_upload
+from rate_limit import rate_limited
+import idempotency
 
 public_bp = Blueprint("public", __name__)
 
@@ -13,9 +18,42 @@ def index():
     return render_template("index.html")
 
 @public_bp.route("/register", methods=["POST"])
+@rate_limited("register", message="Too many registrations from this network. Please wait a moment and try again.")
 def register():
+    # Double submissions (same idempotency key) get the first submission's outcome back
+    key = idempotency.request_key()
+    if key:
+        claimed, previous = idempotency.claim(key, "register")
+        if not claimed:
+            if previous is None or previous.result is None:
+                return _finish(None, "⏳ This registration is already being processed.", "info")
+            return _finish(None, previous.result["message"], previous.result["category"])
+    try:
+        return _register(key)
+    except Exception:
+        if key:
+            idempotency.release(key)
+        raise
+
+
+def _finish(key, message, category):
+    """Flash the outcome (remembering it for the idempotency key) and go back to the form."""
+    if key:
+        idempotency.complete(key, {"message": message, "category": category})
+        db.session.commit()
+    flash(message, category)
+    return redirect(url_for("public.index"))
+
+
+def _iqama_taken(iqama_number):
+    # Unique-index lookup; soft-deleted drivers still hold their iqama until purged
+    return db.session.query(Driver.id).filter_by(iqama_number=iqama_number) \
+        .execution_options(include_deleted=True).first() is not None
+
+
+def _register(key):
     full_name = request.form["full_name"]
-    iqama_number = request.form["iqama_number"]
+    iqama_number = request.form["iqama_number"].strip()
     iqama_expiry_date = request.form["iqama_expiry_date"]
     saudi_driving_license = request.form["saudi_driving_license"] == "yes"
     nationality = request.form["nationality"]
@@ -24,21 +62,24 @@ def register():
     previous_sponsor_number = request.form["previous_sponsor_number"]
     iqama_card_upload = request.files["iqama_card_upload"]
 
-    upload_folder = "static/uploads/"
-    if not os.path.exists(upload_folder):
-        os.makedirs(upload_folder)
+    # Checked before any file I/O
+    if _iqama_taken(iqama_number):
+        return _finish(key, f"⚠️ Iqama {iqama_number} is already registered.", "warning")
+
+    upload_folder = current_app.config["UPLOAD_FOLDER"]
 
     safe_name = full_name.replace(" ", "_").lower()
     safe_iqama = iqama_number.replace(" ", "_")
     extension = os.path.splitext(iqama_card_upload.filename)[1]
-    file_name = f"{safe_name}_{safe_iqama}{extension}"
+    # Unique per submission: a concurrent registration of the same iqama must not overwrite this file
+    file_name = f"{safe_name}_{safe_iqama}_{uuid.uuid4().hex[:8]}{extension}"
     file_path = os.path.join(upload_folder, file_name)
-    iqama_card_upload.save(file_path)
+    save_upload(iqama_card_upload, file_path, "iqama_card_upload")
 
     new_driver = Driver(
         full_name=full_name,
         iqama_number=iqama_number,
-        iqama_expiry_date=iqama_expiry_date,
+        iqama_expiry_date=datetime.strptime(iqama_expiry_date, "%Y-%m-%d").date() if iqama_expiry_date else None,
         saudi_driving_license=saudi_driving_license,
         nationality=nationality,
         city=city,
@@ -50,8 +91,20 @@ def register():
 
     )
 
-    db.session.add(new_driver)
-    db.session.commit()
+    try:
+        db.session.add(new_driver)
+        StageEvent.record(new_driver, None, new_driver.onboarding_stage, source="public_registration")
+        if key:
+            idempotency.complete(key, {"message": "✅ Driver data received successfully!", "category": "success"})
+        db.session.commit()
+    except IntegrityError:
+        # Lost a race with a concurrent registration of the same iqama; nothing references our file
+        db.session.rollback()
+        try:
+            os.remove(file_path)
+        except OSError:
+            pass
+        return _finish(key, f"⚠️ Iqama {iqama_number} is already registered.", "warning")
 
     try:
         msg = Message(
@@ -59,7 +112,7 @@ def register():
             recipients=["uaqx1057@gmail.com"],
             body=f"Driver {full_name} has submitted a new registration form. Please review the details."
         )
-        mail.send(msg)
+        mail.send_later(msg)
     except Exception as e:
         print(f"Error sending email: {e}")
 
@@ -0,0 +1,48 @@
+"""Branch (city) scoping.
+
+Staff with a ``branch_city`` only see and act on drivers/offboardings of
+their city, plus unassigned records (blank city) so nothing gets stranded.
+SuperAdmins and users without a branch see every city, and
+BRANCH_SCOPING_ENABLED=0 turns scoping off altogether.
+
+Scoped queries filter on ``city`` first, which the ``(city, onboarding_stage)``
+/ ``(city, status)`` indexes serve directly; on PostgreSQL the tables can also
+be list-partitioned by city (``flask branches partition``) so each branch's
+queries only touch its own partition.
+"""
+from flask import current_app
+from flask_login import current_user
+from sqlalchemy import or_
+
+from models import normalize_city
+
+UNSCOPED_ROLES = {"SuperAdmin"}
+UNASSIGNED = ""
+
+
+def user_branch(user=None):
+    """The city ``user`` (default: current user) is limited to, or None for all cities."""
+    user = user if user is not None else current_user
+    if not current_app.config.get("BRANCH_SCOPING_ENABLED", True):
+        return None
+    if not getattr(user, "is_authenticated", False) or user.role in UNSCOPED_ROLES:
+        return None
+    return normalize_city(user.branch_city) or None
+
+
+def city_visible(city, branch):
+    """Python-side twin of ``in_branch`` for a single record/event."""
+    return branch is None or (city or UNASSIGNED) in (branch, UNASSIGNED)
+
+
+def in_branch(query, model, user=None):
+    """Restrict a Driver/Offboarding query to the user's branch (no-op when unscoped)."""
+    branch = user_branch(user)
+    if branch is None:
+        return query
+    return query.filter(or_(model.city.in_([branch, UNASSIGNED]), model.city.is_(None)))
+
+
+def get_in_branch_or_404(model, ident):
+    """Like ``model.query.get_or_404`` but 404s for records outside the user's branch."""
+    return in_branch(model.query, model).filter(model.id == ident).first_or_404()
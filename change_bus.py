@@ -0,0 +1,198 @@
+"""Cluster-wide change notifications for drivers and offboardings.
+
+Transitions queue a small change event on the DB session (see
+``live_events.queue_stage_event``). On PostgreSQL the events are sent with
+``pg_notify`` inside the committing transaction, so they are delivered only
+if the commit succeeds, and a listener thread in every worker (``LISTEN``)
+fans them out to that worker's local subscribers — the SSE broker and any
+in-process cache that registers with ``subscribe()``. Other databases
+(SQLite, tests) or CHANGE_BUS_BACKEND=local fan out in-process after commit.
+"""
+import json
+import logging
+import os
+import select
+import threading
+
+from flask import current_app
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.pool import NullPool
+
+from db_routing import RoutingSession
+from metrics import CHANGE_EVENTS
+
+logger = logging.getLogger(__name__)
+
+_PENDING_KEY = "pending_changes"
+_NOTIFIED_KEY = "changes_notified"
+# PostgreSQL rejects NOTIFY payloads of 8000 bytes or more
+_MAX_PAYLOAD = 7900
+
+_subscribers = []
+_state = {"backend": "local", "channel": "driver_changes"}
+_listener = None
+_listener_lock = threading.Lock()
+
+
+def subscribe(callback):
+    """Call ``callback(evt)`` for every committed change, from any worker."""
+    _subscribers.append(callback)
+    return callback
+
+
+def queue_change(session, evt):
+    """Attach ``evt`` (a JSON-serializable dict) to ``session``; it is sent on commit."""
+    session.info.setdefault(_PENDING_KEY, []).append(evt)
+
+
+def _fan_out(evt):
+    CHANGE_EVENTS.inc(direction="delivered")
+    for callback in list(_subscribers):
+        try:
+            callback(evt)
+        except Exception:
+            logger.exception("[CHANGE_BUS] subscriber %r failed", callback)
+
+
+def _payload(evt):
+    payload = json.dumps(evt, default=str)
+    if len(payload) > _MAX_PAYLOAD:
+        payload = json.dumps({k: evt.get(k) for k in ("entity", "id", "from", "to")})
+    return payload
+
+
+# -------------------------
+# Session hooks
+# -------------------------
+@event.listens_for(RoutingSession, "before_commit")
+def _notify_pending(session):
+    pending = session.info.get(_PENDING_KEY)
+    if not pending or _state["backend"] != "notify":
+        return
+    # The primary engine: a commit inside a @read_only view must not notify through a replica
+    engine = session._db.engine
+    if engine.dialect.name != "postgresql":
+        return
+    for evt in pending:
+        session.execute(
+            text("SELECT pg_notify(:channel, :payload)"),
+            {"channel": _state["channel"], "payload": _payload(evt)},
+            bind_arguments={"bind": engine},
+        )
+        CHANGE_EVENTS.inc(direction="published")
+    session.info[_NOTIFIED_KEY] = True
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _deliver_local(session):
+    pending = session.info.pop(_PENDING_KEY, [])
+    if session.info.pop(_NOTIFIED_KEY, False):
+        return  # the LISTEN thread of every worker, this one included, delivers them
+    for evt in pending:
+        CHANGE_EVENTS.inc(direction="published")
+        _fan_out(evt)
+
+
+@event.listens_for(RoutingSession, "after_rollback")
+def _discard_pending(session):
+    session.info.pop(_PENDING_KEY, None)
+    session.info.pop(_NOTIFIED_KEY, None)
+
+
+# -------------------------
+# LISTEN thread (one per worker process)
+# -------------------------
+class _Listener(threading.Thread):
+    def __init__(self, url, channel, poll_seconds=5.0):
+        super().__init__(name="change-bus-listener", daemon=True)
+        self.url = url
+        self.channel = channel
+        self.poll_seconds = poll_seconds
+        self.pid = os.getpid()
+        self._stopping = threading.Event()
+
+    def stop(self):
+        self._stopping.set()
+
+    def run(self):
+        backoff = 1
+        # A dedicated connection outside the pool: it stays in LISTEN for the worker's lifetime
+        engine = create_engine(self.url, poolclass=NullPool)
+        while not self._stopping.is_set():
+            conn = None
+            try:
+                conn = engine.raw_connection()
+                dbapi_conn = conn.driver_connection
+                dbapi_conn.autocommit = True
+                cursor = dbapi_conn.cursor()
+                cursor.execute(f'LISTEN "{self.channel}"')
+                cursor.close()
+                logger.info("[CHANGE_BUS] pid %s listening on %s", self.pid, self.channel)
+                backoff = 1
+                while not self._stopping.is_set():
+                    for payload in self._wait(dbapi_conn):
+                        self._dispatch(payload)
+            except Exception as e:
+                logger.warning("[CHANGE_BUS] listener error (%s); reconnecting in %ss", e, backoff)
+                self._stopping.wait(backoff)
+                backoff = min(backoff * 2, 30)
+            finally:
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+        engine.dispose()
+
+    def _wait(self, dbapi_conn):
+        """Block up to ``poll_seconds`` and return received payloads (psycopg2 or psycopg 3)."""
+        if hasattr(dbapi_conn, "poll"):  # psycopg2
+            if select.select([dbapi_conn], [], [], self.poll_seconds) != ([], [], []):
+                dbapi_conn.poll()
+            payloads = [n.payload for n in dbapi_conn.notifies]
+            dbapi_conn.notifies.clear()
+            return payloads
+        return [n.payload for n in dbapi_conn.notifies(timeout=self.poll_seconds)]
+
+    def _dispatch(self, payload):
+        try:
+            evt = json.loads(payload)
+        except ValueError:
+            logger.warning("[CHANGE_BUS] ignoring malformed payload %r", payload[:200])
+            return
+        CHANGE_EVENTS.inc(direction="received")
+        _fan_out(evt)
+
+
+def start_listener(app):
+    """Start this process's LISTEN thread (no-op for the local backend or if already running)."""
+    global _listener
+    if _state["backend"] != "notify":
+        return
+    with _listener_lock:
+        if _listener is not None and _listener.pid == os.getpid() and _listener.is_alive():
+            return
+        from extensions import db
+        with app.app_context():
+            url = db.engine.url
+        _listener = _Listener(url, _state["channel"])
+        _listener.start()
+
+
+def _ensure_listener():
+    # Threads do not survive fork: start lazily in each worker on its first request
+    if _listener is None or _listener.pid != os.getpid():
+        start_listener(current_app._get_current_object())
+
+
+def init_change_bus(app):
+    """Pick the backend: NOTIFY/LISTEN on PostgreSQL, in-process otherwise."""
+    backend = app.config.get("CHANGE_BUS_BACKEND", "auto")
+    uri = app.config.get("SQLALCHEMY_DATABASE_URI", "")
+    if backend == "auto":
+        backend = "notify" if uri.startswith("postgresql") else "local"
+    _state["backend"] = backend
+    _state["channel"] = app.config.get("CHANGE_BUS_CHANNEL", "driver_changes")
+
+    if backend == "notify":
+        app.before_request(_ensure_listener)
@@ -0,0 +1,161 @@
+"""Concurrency-safe work claiming and transition guards.
+
+Staff claim the next N pending drivers/offboardings for their role; rows are
+picked with ``SELECT ... FOR UPDATE SKIP LOCKED`` so concurrent claimers
+never receive the same record, and each claim is a lease that expires after
+CLAIM_LEASE_MINUTES. ``version`` columns on Driver/Offboarding make
+concurrent transitions fail with StaleDataError instead of overwriting each
+other; ``init_claims`` turns that into a 409 / flash message.
+
+That only covers two requests racing between load and flush. Dashboards
+therefore post back the ``version`` they rendered, and ``check_version``
+(called by ``transition_blocked``) rejects the action the same way when the
+record has changed since. Leases are written with plain UPDATEs that leave
+``version`` and ``updated_at`` alone: taking or renewing a claim does not
+change the record, so it must not make other users' cards stale.
+"""
+from datetime import datetime, timedelta
+
+from flask import current_app, flash, jsonify, redirect, request, url_for
+from sqlalchemy import or_, update
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.exc import StaleDataError
+
+from branches import in_branch
+from extensions import db
+from models import Driver, Offboarding, User
+
+# Role -> stages (Driver.onboarding_stage / Offboarding.status) that role works on
+DRIVER_STAGES_BY_ROLE = {
+    "OpsManager": ["Ops Manager"],
+    "HR": ["HR", "HR Final"],
+    "OpsSupervisor": ["Ops Supervisor"],
+    "FleetManager": ["Fleet Manager"],
+    "FinanceManager": ["Finance"],
+}
+OFFBOARDING_STAGES_BY_ROLE = {
+    "OpsSupervisor": ["Requested", "OpsSupervisor"],
+    "FleetManager": ["Fleet", "pending_tamm"],
+    "FinanceManager": ["Finance"],
+    "HR": ["HR"],
+}
+
+
+def _stage_column(model):
+    return Driver.onboarding_stage if model is Driver else Offboarding.status
+
+
+def _stage_of(entity):
+    return entity.onboarding_stage if isinstance(entity, Driver) else entity.status
+
+
+def claim_next(model, user, n):
+    """Lease up to ``n`` unclaimed records at the user's stage(s) and branch; returns them.
+
+    Records already leased to the user are renewed and count towards ``n``.
+    """
+    stages_by_role = DRIVER_STAGES_BY_ROLE if model is Driver else OFFBOARDING_STAGES_BY_ROLE
+    stages = stages_by_role.get(user.role)
+    if not stages:
+        return []
+
+    now = datetime.utcnow()
+    lease = timedelta(minutes=current_app.config.get("CLAIM_LEASE_MINUTES", 15))
+    order = Driver.id if model is Driver else Offboarding.requested_at
+
+    rows = (
+        in_branch(model.query, model, user)
+        .filter(_stage_column(model).in_(stages))
+        .filter(or_(model.claimed_until.is_(None), model.claimed_until < now, model.claimed_by_id == user.id))
+        .order_by(order.asc())
+        .limit(n)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    _set_lease(model, rows, user.id, now + lease)
+    db.session.commit()
+    return rows
+
+
+def _set_lease(model, rows, user_id, until):
+    """Write claim columns without bumping ``version`` / ``updated_at`` (see module docstring)."""
+    if not rows:
+        return
+    table = model.__table__
+    db.session.execute(
+        update(table)
+        .where(table.c.id.in_([row.id for row in rows]))
+        .values(claimed_by_id=user_id, claimed_until=until, updated_at=table.c.updated_at)
+    )
+    for row in rows:
+        set_committed_value(row, "claimed_by_id", user_id)
+        set_committed_value(row, "claimed_until", until)
+
+
+def release_claims(model, user, ids=None):
+    """Drop the user's leases (all, or only ``ids``); returns how many were released."""
+    query = model.query.filter(model.claimed_by_id == user.id)
+    if ids:
+        query = query.filter(model.id.in_(ids))
+    rows = query.all()
+    _set_lease(model, rows, None, None)
+    db.session.commit()
+    return len(rows)
+
+
+def check_version(entity):
+    """Raise StaleDataError when the request posted a ``version`` other than the record's current one.
+
+    Requests without a version (API clients, older pages) are not checked.
+    """
+    body = request.get_json(silent=True) if request.is_json else None
+    sent = (body or {}).get("version") if isinstance(body, dict) else None
+    if sent is None:
+        sent = request.values.get("version")
+    if sent in (None, ""):
+        return
+    try:
+        sent = int(sent)
+    except (TypeError, ValueError):
+        sent = None
+    if sent != entity.version:
+        raise StaleDataError(
+            f"{entity.__tablename__} {entity.id} is at version {entity.version}, the page showed {sent}"
+        )
+
+
+def transition_blocked(entity, expected_stages, user):
+    """Why ``user`` may not move ``entity`` right now, or None if they may.
+
+    Blocks when the record is no longer at one of ``expected_stages`` (someone
+    already processed it) or when another user holds an active lease on it.
+    A stale posted ``version`` raises StaleDataError instead (409 / flash).
+    """
+    check_version(entity)
+    if isinstance(expected_stages, str):
+        expected_stages = [expected_stages]
+    stage = _stage_of(entity)
+    if stage not in expected_stages:
+        return f"Record is no longer at {' / '.join(expected_stages)} (current: {stage})."
+
+    if entity.claimed_by_id and entity.claimed_by_id != user.id and entity.claimed_until \
+            and entity.claimed_until > datetime.utcnow():
+        holder = db.session.get(User, entity.claimed_by_id)
+        name = (holder.name or holder.username) if holder else "another user"
+        return f"Record is currently claimed by {name} until {entity.claimed_until.strftime('%H:%M')} UTC."
+    return None
+
+
+def _stale_data(error):
+    db.session.rollback()
+    message = "This record was changed by someone else in the meantime. Please reload and try again."
+    current_app.logger.warning(f"[CLAIMS] concurrent update rejected on {request.path}: {error}")
+    xhr = request.headers.get("X-Requested-With") == "XMLHttpRequest"
+    if request.is_json or xhr or request.path.startswith("/dashboard/claims") or "/api/" in request.path:
+        return jsonify({"success": False, "message": message}), 409
+    flash(message, "warning")
+    return redirect(request.referrer or url_for("auth.login"))
+
+
+def init_claims(app):
+    app.register_error_handler(StaleDataError, _stale_data)
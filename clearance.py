@@ -0,0 +1,255 @@
+"""Offboarding clearance certificates (PDF), rendered in a background process pool.
+
+When an offboarding reaches Completed the view calls ``schedule(record)``
+after committing. The record is snapshotted into plain data in the request,
+rendered by ``pdf.write_pdf`` in a worker process (so web workers never
+spend CPU on it) straight into UPLOAD_FOLDER, and the file name is stored in
+``offboarding.clearance_pdf`` once the file exists.
+
+File names embed the record's ``updated_at``, which doubles as the cache
+key: a current file is never re-rendered, and any later change to the
+record yields a new name. The superseded file is queued for
+``flask uploads purge``. A render already in flight for the same version is
+not queued again, and a pool broken by a dying worker is replaced on the
+next call. ``start`` spawns the workers up front (gunicorn's post_fork) so
+the first completions do not pay for it. ``flask clearance generate`` does
+the same for every offboarding completed in a date range.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures import wait as wait_for
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, time
+
+from flask import current_app
+from sqlalchemy import func, select, update
+
+import pdf
+from extensions import db
+from metrics import CLEARANCE_PDFS
+
+_pool = None
+_pool_lock = threading.Lock()
+# (record id, file name) -> Future of renders queued or running in this process
+_pending = {}
+_pending_lock = threading.Lock()
+
+
+def _executor():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: workers must not inherit the web process's threads, locks or DB connections
+            _pool = ProcessPoolExecutor(
+                max_workers=current_app.config.get("CLEARANCE_PDF_WORKERS", 2),
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+    return _pool
+
+
+def _submit(fn, *args):
+    """Submit to the pool, replacing it once if a worker died and broke it."""
+    global _pool
+    pool = _executor()
+    try:
+        return pool.submit(fn, *args)
+    except BrokenProcessPool:
+        current_app.logger.warning("[CLEARANCE PDF] Process pool broken, starting a new one")
+        with _pool_lock:
+            if _pool is pool:
+                _pool = None
+        pool.shutdown(wait=False)
+        return _executor().submit(fn, *args)
+
+
+def start(app):
+    """Spawn the pool's worker processes now instead of on the first ``schedule``.
+
+    A spawned worker starts a fresh interpreter and imports ``pdf``, which
+    otherwise lands on whichever request completes an offboarding first.
+    Returns the warm-up futures for callers that want to wait for them.
+    """
+    with app.app_context():
+        return [_submit(os.getpid) for _ in range(app.config.get("CLEARANCE_PDF_WORKERS", 2))]
+
+
+def wait_pending(timeout=None):
+    """Block until the renders queued in this process so far are stored (or failed)."""
+    with _pending_lock:
+        futures = list(_pending.values())
+    wait_for(futures, timeout=timeout)
+
+
+def shutdown(wait=True):
+    """Stop the pool; with ``wait``, queued renders are finished and stored first."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=wait)
+
+
+def pdf_filename(record):
+    stamp = (record.updated_at or record.created_at).strftime("%Y%m%d%H%M%S%f")
+    return f"clearance_{record.id}_{stamp}.pdf"
+
+
+def is_current(record, upload_folder):
+    """True when the stored PDF matches the record as it is now and is on disk."""
+    return (
+        record.clearance_pdf == pdf_filename(record)
+        and os.path.exists(os.path.join(upload_folder, record.clearance_pdf))
+    )
+
+
+def _fmt(value):
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return "Yes" if value else "No"
+    if hasattr(value, "strftime"):
+        return value.strftime("%Y-%m-%d %H:%M")
+    return value
+
+
+def document(record):
+    """(title, sections) for ``pdf.render_pdf``; plain data, so it can be sent to a worker process."""
+    from models import User
+
+    driver = record.driver
+    requester = db.session.get(User, record.requested_by_id)
+    sections = [
+        ("Driver", [
+            ("Name", driver.full_name),
+            ("Iqama number", driver.iqama_number),
+            ("City", record.city or driver.city),
+            ("Platform", driver.platform),
+            ("Platform ID", driver.platform_id),
+        ]),
+        ("Offboarding", [
+            ("Requested at", record.requested_at),
+            ("Requested by", requester.name or requester.username if requester else None),
+            ("Status", record.status),
+        ]),
+        ("Ops Supervisor", [
+            ("Cleared at", record.ops_supervisor_cleared_at),
+            ("Note", record.ops_supervisor_note),
+        ]),
+        ("Fleet", [
+            ("Cleared at", record.fleet_cleared_at),
+            ("Damage report", record.fleet_damage_report),
+            ("Damage cost (SAR)", record.fleet_damage_cost or 0),
+        ]),
+        ("Finance", [
+            ("Cleared at", record.finance_cleared_at),
+            ("Adjustments (SAR)", record.finance_adjustments or 0),
+            ("Note", record.finance_note),
+            ("Invoice", record.finance_invoice_file),
+        ]),
+        ("HR", [
+            ("Cleared at", record.hr_cleared_at),
+            ("Company contract cancelled", record.company_contract_cancelled),
+            ("Qiwa contract cancelled", record.qiwa_contract_cancelled),
+            ("Salary paid", record.salary_paid),
+            ("Note", record.hr_note),
+        ]),
+        ("TAMM", [
+            ("Revoked", record.tamm_revoked),
+            ("Revoked at", record.tamm_revoked_at),
+        ]),
+    ]
+    sections = [(heading, [(label, _fmt(value)) for label, value in rows]) for heading, rows in sections]
+    return f"Offboarding Clearance Certificate - {driver.full_name}", sections
+
+
+def _store(app, record_id, updated_at, filename, rendered, done):
+    """Runs in the parent once the worker is done: point the record at the new file."""
+    from models import Offboarding, PendingFileDeletion
+
+    with app.app_context():
+        try:
+            rendered.result()
+        except Exception as e:
+            CLEARANCE_PDFS.inc(result="failed")
+            app.logger.error(f"[CLEARANCE PDF] offboarding {record_id}: {e}")
+            done.set_exception(e)
+            return
+        try:
+            table = Offboarding.__table__
+            previous = db.session.execute(
+                select(table.c.clearance_pdf).where(table.c.id == record_id)
+            ).scalar()
+            # Only if the record is unchanged since the snapshot; updated_at/version stay as they are
+            stored = db.session.execute(
+                update(table)
+                .where(table.c.id == record_id, table.c.updated_at == updated_at)
+                .values(clearance_pdf=filename, updated_at=table.c.updated_at)
+            ).rowcount
+            if not stored:
+                # The record changed while rendering; the next schedule() renders the new version
+                db.session.add(PendingFileDeletion(filename=filename))
+            elif previous and previous != filename:
+                db.session.add(PendingFileDeletion(filename=previous))
+            db.session.commit()
+            CLEARANCE_PDFS.inc(result="generated" if stored else "stale")
+            done.set_result(filename if stored else None)
+        except Exception as e:
+            db.session.rollback()
+            app.logger.error(f"[CLEARANCE PDF] offboarding {record_id}: {e}")
+            done.set_exception(e)
+
+
+def schedule(record, force=False):
+    """Queue a clearance PDF for ``record`` unless a current one exists.
+
+    Returns None when the stored PDF is current, else a future resolving to
+    the stored file name (None if the record changed while rendering).
+    """
+    upload_folder = current_app.config["UPLOAD_FOLDER"]
+    if not force and is_current(record, upload_folder):
+        CLEARANCE_PDFS.inc(result="cached")
+        return None
+
+    filename = pdf_filename(record)
+    key = (record.id, filename)
+    with _pending_lock:
+        if key in _pending:
+            CLEARANCE_PDFS.inc(result="pending")
+            return _pending[key]
+        done = _pending[key] = Future()
+    done.add_done_callback(lambda f: _forget(key))
+
+    try:
+        os.makedirs(upload_folder, exist_ok=True)
+        title, sections = document(record)
+        rendered = _submit(pdf.write_pdf, os.path.join(upload_folder, filename), title, sections)
+    except Exception as e:
+        done.set_exception(e)
+        raise
+    app = current_app._get_current_object()
+    record_id, updated_at = record.id, record.updated_at
+    rendered.add_done_callback(lambda f: _store(app, record_id, updated_at, filename, f, done))
+    return done
+
+
+def _forget(key):
+    with _pending_lock:
+        _pending.pop(key, None)
+
+
+def completed_between(start, end):
+    """Completed offboardings whose TAMM was revoked (or HR cleared) on a day in [start, end]."""
+    from models import Offboarding
+
+    finished_at = func.coalesce(Offboarding.tamm_revoked_at, Offboarding.hr_cleared_at)
+    return (
+        Offboarding.query
+        .filter(
+            Offboarding.status == "Completed",
+            finished_at >= datetime.combine(start, time.min),
+            finished_at <= datetime.combine(end, time.max),
+        )
+        .order_by(Offboarding.id)
+    )
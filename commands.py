@@ -0,0 +1,515 @@
+from datetime import date, datetime
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import text
+
+from extensions import db
+
+stage_events_cli = AppGroup("stage-events", help="Stage event log maintenance.")
+analytics_cli = AppGroup("analytics", help="Reporting commands.")
+iqama_cli = AppGroup("iqama", help="Iqama expiry monitoring.")
+branches_cli = AppGroup("branches", help="Branch (city) data maintenance.")
+archive_cli = AppGroup("archive", help="Cold storage for finished drivers and offboardings.")
+uploads_cli = AppGroup("uploads", help="Upload file maintenance.")
+finance_cli = AppGroup("finance", help="Finance reporting maintenance.")
+clearance_cli = AppGroup("clearance", help="Offboarding clearance certificates.")
+
+
+def _month_start(d, offset=0):
+    """First day of the month ``offset`` months after ``d``."""
+    month_index = d.year * 12 + (d.month - 1) + offset
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def _is_partitioned(conn, table):
+    return bool(conn.execute(
+        text("SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = :t"),
+        {"t": table},
+    ).scalar())
+
+
+@stage_events_cli.command("partition")
+@click.option("--months", default=3, show_default=True, help="Number of upcoming months to pre-create.")
+def partition_stage_events(months):
+    """Range-partition stage_event by month (PostgreSQL only).
+
+    The first run converts the plain table into a partitioned one (copying
+    existing rows into a DEFAULT partition); later runs just add the upcoming
+    monthly partitions.
+    """
+    if db.engine.dialect.name != "postgresql":
+        click.echo("Partitioning is only supported on PostgreSQL; stage_event stays a plain table.")
+        return
+
+    with db.engine.begin() as conn:
+        today = date.today()
+        first_month = _month_start(today)
+        converting = not _is_partitioned(conn, "stage_event")
+
+        if converting:
+            oldest = conn.execute(text("SELECT MIN(created_at) FROM stage_event")).scalar()
+            if oldest:
+                first_month = _month_start(oldest.date())
+            conn.execute(text("ALTER TABLE stage_event RENAME TO stage_event_unpartitioned"))
+            conn.execute(text("ALTER TABLE stage_event_unpartitioned RENAME CONSTRAINT stage_event_pkey TO stage_event_unpartitioned_pkey"))
+            conn.execute(text("DROP INDEX IF EXISTS ix_stage_event_entity"))
+            conn.execute(text("DROP INDEX IF EXISTS ix_stage_event_created_at"))
+            conn.execute(text(
+                "CREATE TABLE stage_event (LIKE stage_event_unpartitioned INCLUDING DEFAULTS) "
+                "PARTITION BY RANGE (created_at)"
+            ))
+            conn.execute(text("ALTER TABLE stage_event ADD PRIMARY KEY (id, created_at)"))
+            conn.execute(text("ALTER SEQUENCE stage_event_id_seq OWNED BY stage_event.id"))
+            conn.execute(text(
+                "CREATE INDEX ix_stage_event_entity ON stage_event (entity_type, entity_id, created_at)"
+            ))
+            conn.execute(text("CREATE INDEX ix_stage_event_created_at ON stage_event (created_at)"))
+            conn.execute(text("CREATE TABLE stage_event_default PARTITION OF stage_event DEFAULT"))
+
+        month = first_month
+        last_month = _month_start(today, months)
+        while month <= last_month:
+            end = _month_start(month, 1)
+            name = f"stage_event_{month:%Y_%m}"
+            conn.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF stage_event "
+                f"FOR VALUES FROM ('{month}') TO ('{end}')"
+            ))
+            click.echo(f"Partition {name} ready ({month} .. {end}).")
+            month = end
+
+        if converting:
+            conn.execute(text("INSERT INTO stage_event SELECT * FROM stage_event_unpartitioned"))
+            conn.execute(text("DROP TABLE stage_event_unpartitioned"))
+            click.echo("Converted stage_event to a monthly partitioned table.")
+
+
+def _normalize_cities(conn):
+    """Rewrite city / branch_city values to their canonical spelling; returns rows changed."""
+    from models import normalize_city
+
+    # Drivers and offboardings are versioned: bump updated_at/version so /api/changes
+    # clients and version-keyed caches pick the new city up
+    bump = ", updated_at = :now, version = version + 1"
+    now = datetime.utcnow()
+    changed = 0
+    for table, column, versioned in (
+        ("driver", "city", True), ("offboarding", "city", True), ('"user"', "branch_city", False),
+    ):
+        values = conn.execute(text(f"SELECT DISTINCT {column} FROM {table}")).scalars().all()
+        for value in values:
+            canonical = normalize_city(value)
+            if value == canonical:
+                continue
+            where = f"{column} IS NULL" if value is None else f"{column} = :old"
+            changed += conn.execute(
+                text(f"UPDATE {table} SET {column} = :new{bump if versioned else ''} WHERE {where}"),
+                {"new": canonical, "old": value, "now": now},
+            ).rowcount
+    # Offboardings follow their driver's city
+    changed += conn.execute(text(
+        f"UPDATE offboarding SET city = (SELECT d.city FROM driver d WHERE d.id = offboarding.driver_id){bump} "
+        "WHERE city <> (SELECT d.city FROM driver d WHERE d.id = offboarding.driver_id)"
+    ), {"now": now}).rowcount
+    return changed
+
+
+def _ensure_iqama_key(conn, backfill):
+    """Keep iqama_number globally unique once driver is partitioned by city.
+
+    PostgreSQL cannot enforce a unique index across partitions, so every
+    iqama also gets a row in the plain ``driver_iqama`` table, written by
+    triggers in the same statement as the driver row. A duplicate iqama in
+    any city raises the same unique violation (IntegrityError) as before.
+    A driver whose city changes moves partition as a delete plus an insert,
+    so its key is removed and added back.
+    """
+    created = not conn.execute(text("SELECT to_regclass('driver_iqama')")).scalar()
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS driver_iqama ("
+        "iqama_number VARCHAR(20) PRIMARY KEY, driver_id INTEGER NOT NULL UNIQUE)"
+    ))
+    conn.execute(text("""
+        CREATE OR REPLACE FUNCTION driver_iqama_sync() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                DELETE FROM driver_iqama WHERE driver_id = OLD.id;
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                INSERT INTO driver_iqama (iqama_number, driver_id) VALUES (NEW.iqama_number, NEW.id);
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """))
+    conn.execute(text(
+        "CREATE OR REPLACE TRIGGER driver_iqama_sync AFTER INSERT OR DELETE OR UPDATE OF iqama_number, id "
+        "ON driver FOR EACH ROW EXECUTE FUNCTION driver_iqama_sync()"
+    ))
+    if created and backfill:
+        duplicates = conn.execute(text(
+            "SELECT iqama_number FROM driver GROUP BY iqama_number HAVING COUNT(*) > 1"
+        )).scalars().all()
+        if duplicates:
+            raise click.ClickException(
+                f"iqama_number registered in more than one city: {', '.join(duplicates[:20])}. "
+                "Resolve these drivers and run again."
+            )
+        conn.execute(text("INSERT INTO driver_iqama (iqama_number, driver_id) SELECT iqama_number, id FROM driver"))
+
+
+def _partition_name(table, city):
+    slug = "".join(ch if ch.isalnum() else "_" for ch in city.lower()).strip("_")
+    return f"{table}_{slug or 'unassigned'}"
+
+
+def _convert_to_city_partitions(conn, table, foreign_keys):
+    """Swap ``table`` for a LIST (city) partitioned copy with a DEFAULT partition (rows copied later)."""
+    from models import Driver, Offboarding
+
+    model = {"driver": Driver, "offboarding": Offboarding}[table]
+    conn.execute(text(f"ALTER TABLE {table} RENAME TO {table}_unpartitioned"))
+    conn.execute(text(f"ALTER TABLE {table}_unpartitioned RENAME CONSTRAINT {table}_pkey TO {table}_unpartitioned_pkey"))
+    for index in model.__table__.indexes:
+        conn.execute(text(f"DROP INDEX IF EXISTS {index.name}"))
+    conn.execute(text(
+        f"CREATE TABLE {table} (LIKE {table}_unpartitioned INCLUDING DEFAULTS) PARTITION BY LIST (city)"
+    ))
+    conn.execute(text(f"ALTER TABLE {table} ALTER COLUMN city SET DEFAULT '', ALTER COLUMN city SET NOT NULL"))
+    # Primary keys and unique constraints of a partitioned table must include the partition key
+    conn.execute(text(f"ALTER TABLE {table} ADD PRIMARY KEY (id, city)"))
+    conn.execute(text(f"ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id"))
+    for ddl in foreign_keys:
+        conn.execute(text(f"ALTER TABLE {table} ADD {ddl}"))
+    for index in model.__table__.indexes:
+        index.create(conn)
+    conn.execute(text(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT"))
+
+
+@branches_cli.command("normalize")
+def normalize_branches():
+    """Canonicalize city spellings ("riyadh " -> "Riyadh") so scoping and partitions match."""
+    with db.engine.begin() as conn:
+        changed = _normalize_cities(conn)
+    click.echo(f"Normalized {changed} row(s).")
+
+
+@branches_cli.command("partition")
+@click.option("--city", "cities", multiple=True, help="Also pre-create a partition for this city (repeatable).")
+def partition_branches(cities):
+    """List-partition driver and offboarding by city (PostgreSQL 15+ only).
+
+    The first run converts both tables (driver keyed by (id, city),
+    offboarding referencing it by (driver_id, city) with ON UPDATE CASCADE, so
+    changing a driver's city moves its rows to the new partition). Every run
+    adds a partition for each known city (drivers' cities, users' branches
+    and ``--city``); run it before opening a new branch. iqama_number stays
+    unique across all cities through the ``driver_iqama`` key table (see
+    ``_ensure_iqama_key``), since PostgreSQL cannot enforce a global unique
+    index across partitions.
+    """
+    from models import normalize_city
+
+    if db.engine.dialect.name != "postgresql":
+        click.echo("Partitioning is only supported on PostgreSQL; driver/offboarding stay plain tables.")
+        return
+
+    with db.engine.begin() as conn:
+        _normalize_cities(conn)
+        converting = not _is_partitioned(conn, "driver")
+
+        if converting:
+            conn.execute(text("UPDATE driver SET city = '' WHERE city IS NULL"))
+            conn.execute(text(
+                "UPDATE offboarding SET city = COALESCE((SELECT d.city FROM driver d WHERE d.id = offboarding.driver_id), '')"
+            ))
+            conn.execute(text("ALTER TABLE offboarding DROP CONSTRAINT IF EXISTS offboarding_driver_id_fkey"))
+            _convert_to_city_partitions(conn, "driver", [
+                'FOREIGN KEY (hr_approved_by) REFERENCES "user" (id)',
+                'FOREIGN KEY (claimed_by_id) REFERENCES "user" (id)',
+            ])
+            conn.execute(text("CREATE INDEX ix_driver_iqama_number ON driver (iqama_number)"))
+            _convert_to_city_partitions(conn, "offboarding", [
+                'FOREIGN KEY (requested_by_id) REFERENCES "user" (id)',
+                'FOREIGN KEY (claimed_by_id) REFERENCES "user" (id)',
+            ])
+
+        # Converting: the keys are written as rows are copied into the new table below
+        _ensure_iqama_key(conn, backfill=not converting)
+
+        known = set(conn.execute(text(
+            "SELECT city FROM driver_unpartitioned" if converting else "SELECT city FROM driver"
+        )).scalars())
+        known |= {normalize_city(c) for c in conn.execute(text('SELECT branch_city FROM "user"')).scalars()}
+        known |= {normalize_city(c) for c in cities}
+        known.add("")
+
+        for table in ("driver", "offboarding"):
+            existing = set(conn.execute(text(
+                "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                "JOIN pg_class p ON p.oid = i.inhparent WHERE p.relname = :t"
+            ), {"t": table}).scalars())
+            for city in sorted(known):
+                name = _partition_name(table, city)
+                if name in existing:
+                    continue
+                stranded = 0 if converting else conn.execute(
+                    text(f"SELECT COUNT(*) FROM {table}_default WHERE city = :c"), {"c": city},
+                ).scalar()
+                if stranded:
+                    # Attaching would fail while the DEFAULT partition holds this city's rows
+                    click.echo(f"Skipped {name}: {stranded} row(s) of {city!r} are in {table}_default.")
+                    continue
+                literal = city.replace("'", "''")
+                conn.execute(text(f"CREATE TABLE {name} PARTITION OF {table} FOR VALUES IN ('{literal}')"))
+                click.echo(f"Partition {name} ready.")
+
+        if converting:
+            conn.execute(text("INSERT INTO driver SELECT * FROM driver_unpartitioned"))
+            conn.execute(text("INSERT INTO offboarding SELECT * FROM offboarding_unpartitioned"))
+            conn.execute(text("DROP TABLE offboarding_unpartitioned"))
+            conn.execute(text("DROP TABLE driver_unpartitioned"))
+            conn.execute(text(
+                "ALTER TABLE offboarding ADD CONSTRAINT offboarding_driver_fkey FOREIGN KEY (driver_id, city) "
+                "REFERENCES driver (id, city) ON UPDATE CASCADE"
+            ))
+            click.echo("Converted driver and offboarding to city partitioned tables.")
+
+
+@archive_cli.command("run")
+@click.option("--days", type=int, help="Archive drivers offboarded more than this many days ago [ARCHIVE_AFTER_DAYS].")
+@click.option("--batch-size", default=500, show_default=True, help="Drivers moved per transaction.")
+@click.option("--dry-run", is_flag=True, help="Only count what would be archived.")
+def archive_run(days, batch_size, dry_run):
+    """Move fully offboarded drivers and their offboardings to the archive tables.
+
+    Meant to be run nightly from cron, e.g. ``flask archive run``. Archived
+    rows stay visible to search, exports and stage analytics.
+    """
+    from flask import current_app
+
+    from jobs.archival import archive_finished, count_archivable
+
+    days = days if days is not None else current_app.config.get("ARCHIVE_AFTER_DAYS", 180)
+    if dry_run:
+        click.echo(f"{count_archivable(days)} driver(s) offboarded more than {days} days ago would be archived.")
+        return
+    drivers, offboardings = archive_finished(days, batch_size=batch_size)
+    click.echo(f"Archived {drivers} driver(s) and {offboardings} offboarding(s).")
+
+
+@uploads_cli.command("purge")
+@click.option("--batch-size", default=200, show_default=True, help="Files deleted per transaction.")
+@click.option("--watch", is_flag=True, help="Keep running as a worker, polling every --interval seconds.")
+@click.option("--interval", default=30, show_default=True, help="Seconds between polls with --watch.")
+def purge_uploads(batch_size, watch, interval):
+    """Delete files queued by driver deletions, then purge soft-deleted rows.
+
+    Rows are kept for SOFT_DELETE_RETENTION_HOURS so /api/changes clients
+    still see the deletion.
+    """
+    import time
+    from collections import Counter
+    from datetime import timedelta
+
+    from flask import current_app
+
+    from uploads import purge_deleted_records, remove_queued_files
+
+    upload_folder = current_app.config["UPLOAD_FOLDER"]
+    retention = timedelta(hours=current_app.config.get("SOFT_DELETE_RETENTION_HOURS", 24))
+    while True:
+        totals = Counter()
+        while True:
+            outcomes = remove_queued_files(upload_folder, batch_size=batch_size)
+            if not outcomes:
+                break
+            totals.update(outcomes)
+            if set(outcomes) == {"failed"}:
+                break  # only retries left; try again on the next pass
+        purged = 0
+        while True:
+            n = purge_deleted_records(datetime.utcnow() - retention)
+            purged += n
+            if not n:
+                break
+        if totals or purged or not watch:
+            summary = ", ".join(f"{k}={v}" for k, v in sorted(totals.items())) or "no files"
+            click.echo(f"Upload purge: {summary}; {purged} deleted driver(s) purged.")
+        if not watch:
+            return
+        db.session.remove()
+        time.sleep(interval)
+
+
+@uploads_cli.command("gc")
+@click.option("--grace-hours", type=float, help="Skip files modified more recently than this [UPLOAD_GC_GRACE_HOURS].")
+@click.option("--delete", "delete_files", is_flag=True, help="Remove orphans (default: report only).")
+@click.option("--list", "list_files", is_flag=True, help="Print every orphaned file.")
+def gc_uploads(grace_hours, delete_files, list_files):
+    """Report (or --delete) upload files that no driver/offboarding references."""
+    from flask import current_app
+
+    from uploads import collect_orphans
+
+    if grace_hours is None:
+        grace_hours = current_app.config.get("UPLOAD_GC_GRACE_HOURS", 24)
+    on_orphan = (lambda name, st: click.echo(f"{name}\t{st.st_size}")) if list_files else None
+    stats = collect_orphans(
+        current_app.config["UPLOAD_FOLDER"], grace_hours * 3600, delete=delete_files, on_orphan=on_orphan,
+    )
+    click.echo(
+        f"Scanned {stats['scanned']} file(s) against {stats['references']} reference(s): "
+        f"{stats['orphaned']} orphaned ({stats['orphaned_bytes'] / 1e6:.1f} MB), {stats['recent']} within grace period."
+    )
+    if delete_files:
+        click.echo(f"Removed {stats['removed']} file(s), {stats['failed']} failed.")
+    elif stats["orphaned"]:
+        click.echo("Dry run; pass --delete to remove them.")
+
+
+@analytics_cli.command("stage-durations")
+@click.option("--kind", type=click.Choice(["driver", "offboarding"]), default="driver", show_default=True)
+@click.option("--group-by", default="city,platform", show_default=True, help="Comma-separated: city, platform.")
+def stage_durations_report(kind, group_by):
+    """Print time-in-stage percentiles (hours) per stage."""
+    from blueprints.analytics.routes import compute_stage_durations, parse_group_by
+
+    dims = parse_group_by(group_by)
+    rows = compute_stage_durations(kind, dims)
+    if not rows:
+        click.echo("No completed stages yet.")
+        return
+
+    header = ["stage", *dims, "count", "avg_h", "p50_h", "p90_h", "p99_h", "over_sla"]
+    click.echo("\t".join(header))
+    for row in rows:
+        hours = [f"{row[k] / 3600:.1f}" for k in ("avg_seconds", "p50_seconds", "p90_seconds", "p99_seconds")]
+        click.echo("\t".join([row["stage"], *(row[d] for d in dims), str(row["count"]), *hours, str(row["over_sla"])]))
+
+
+@finance_cli.command("rebuild-rollups")
+def rebuild_finance_rollups():
+    """Recompute finance_daily_rollup from all driver/offboarding history.
+
+    Run once after deploying the rollup table (to backfill it) and whenever
+    totals are suspected to have drifted, e.g. after manual SQL fixes.
+    """
+    from rollups import rebuild
+
+    click.echo(f"Rebuilt finance rollup: {rebuild()} day/city/platform row(s).")
+
+
+@clearance_cli.command("generate")
+@click.option("--from", "start", type=click.DateTime(["%Y-%m-%d"]), required=True, help="First completion day.")
+@click.option("--to", "end", type=click.DateTime(["%Y-%m-%d"]), help="Last completion day [today].")
+@click.option("--force", is_flag=True, help="Re-render PDFs that are already current.")
+def generate_clearance_pdfs(start, end, force):
+    """Render clearance PDFs for offboardings completed between --from and --to.
+
+    Rendering runs in the CLEARANCE_PDF_WORKERS process pool; records with a
+    current PDF are skipped unless --force is given.
+    """
+    from concurrent.futures import wait
+
+    from clearance import completed_between, schedule
+
+    end = end.date() if end else date.today()
+    futures, cached = [], 0
+    for record in completed_between(start.date(), end).yield_per(200):
+        future = schedule(record, force=force)
+        if future is None:
+            cached += 1
+        else:
+            futures.append(future)
+    db.session.commit()  # end the read transaction so the results can be stored (SQLite locks)
+    wait(futures)
+    failed = sum(1 for f in futures if f.exception() is not None)
+    click.echo(f"Rendered {len(futures) - failed} clearance PDF(s), {cached} already current, {failed} failed.")
+
+
+@iqama_cli.command("alert-expiring")
+@click.option("--days", default=30, show_default=True, help="Alert for iqamas expiring within this many days.")
+@click.option("--include-expired", is_flag=True, help="Also list iqamas that have already expired.")
+@click.option("--dry-run", is_flag=True, help="Only print who would be alerted.")
+def alert_expiring_iqamas(days, include_expired, dry_run):
+    """Email HR / Ops Managers a batched list of expiring iqamas per branch.
+
+    Meant to be run daily from cron, e.g. ``flask iqama alert-expiring --days 30``.
+    Exits non-zero when any alert could not be sent.
+    """
+    from jobs.iqama_expiry import send_iqama_expiry_alerts
+
+    found, summary, failed = send_iqama_expiry_alerts(days, include_expired=include_expired, dry_run=dry_run)
+    click.echo(f"{found} driver(s) with iqama expiring within {days} days.")
+    for email, count in sorted(summary.items()):
+        click.echo(f"  {'would alert' if dry_run else 'alerted'} {email}: {count} driver(s)")
+    for email, error in sorted(failed.items()):
+        click.echo(f"  FAILED {email}: {error}", err=True)
+    if failed:
+        raise click.ClickException(f"{len(failed)} alert(s) could not be sent.")
+
+
+@click.command("init-db")
+def init_db():
+    """Create any missing tables and indexes (safe to re-run)."""
+    from sqlalchemy import inspect
+
+    import models  # noqa: F401  (registers the tables on db.metadata)
+
+    db.create_all()
+
+    # create_all() skips columns and indexes on tables that already existed; add any missing ones.
+    inspector = inspect(db.engine)
+    preparer = db.engine.dialect.identifier_preparer
+    for table in db.metadata.sorted_tables:
+        columns = {c["name"] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in columns:
+                continue
+            ddl = f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {preparer.format_column(column)} " \
+                  f"{column.type.compile(db.engine.dialect)}"
+            if column.server_default is not None:
+                ddl += f" DEFAULT {column.server_default.arg}"
+            with db.engine.begin() as conn:
+                conn.execute(text(ddl))
+            click.echo(f"Added column {table.name}.{column.name}.")
+
+        existing = {ix["name"] for ix in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(db.engine)
+                click.echo(f"Created index {index.name}.")
+
+    # Rows that predate updated_at get one so /api/changes returns them once
+    with db.engine.begin() as conn:
+        for table in ("driver", "offboarding"):
+            result = conn.execute(
+                text(f"UPDATE {table} SET updated_at = :now WHERE updated_at IS NULL"),
+                {"now": datetime.utcnow()},
+            )
+            if result.rowcount:
+                click.echo(f"Backfilled updated_at on {result.rowcount} {table} row(s).")
+        result = conn.execute(text(
+            "UPDATE offboarding SET city = (SELECT d.city FROM driver d WHERE d.id = offboarding.driver_id) "
+            "WHERE city IS NULL"
+        ))
+        if result.rowcount:
+            click.echo(f"Backfilled city on {result.rowcount} offboarding row(s).")
+    click.echo("Database schema is up to date.")
+
+
+def register_commands(app):
+    from assets import assets_cli
+
+    app.cli.add_command(init_db)
+    app.cli.add_command(assets_cli)
+    app.cli.add_command(stage_events_cli)
+    app.cli.add_command(analytics_cli)
+    app.cli.add_command(iqama_cli)
+    app.cli.add_command(branches_cli)
+    app.cli.add_command(archive_cli)
+    app.cli.add_command(uploads_cli)
+    app.cli.add_command(finance_cli)
+    app.cli.add_command(clearance_cli)
@@ -0,0 +1,142 @@
+"""gzip / brotli compression of text responses.
+
+Dashboards embed every card's data as JSON, so HTML and JSON responses
+compress 5-10x. Buffered responses are compressed when they reach
+COMPRESS_MIN_SIZE bytes; streamed responses (SSE, generators) are compressed
+chunk by chunk with a sync flush, so every chunk still reaches the client
+immediately. Responses that already carry a Content-Encoding (precompressed
+/assets), file responses and non-text types (uploaded images/PDFs) are left
+alone. Brotli is used when the optional ``brotli`` package is installed and
+the client prefers it.
+"""
+import zlib
+
+from flask import request
+
+from metrics import COMPRESSION_BYTES
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+DEFAULT_MIMETYPES = (
+    "text/html", "text/css", "text/plain", "text/csv", "text/javascript", "text/event-stream",
+    "application/javascript", "application/json", "image/svg+xml",
+)
+
+
+class _Gzip:
+    def __init__(self, level):
+        # wbits=31: zlib stream with a gzip header/trailer
+        self._obj = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self._obj.compress(data)
+
+    def flush(self):
+        return self._obj.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._obj.flush(zlib.Z_FINISH)
+
+
+class _Brotli:
+    def __init__(self, quality):
+        self._obj = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        return self._obj.process(data)
+
+    def flush(self):
+        return self._obj.flush()
+
+    def finish(self):
+        return self._obj.finish()
+
+
+def _compressor(encoding, config):
+    if encoding == "br":
+        return _Brotli(config.get("COMPRESS_BR_QUALITY", 4))
+    return _Gzip(config.get("COMPRESS_LEVEL", 6))
+
+
+def _choose_encoding():
+    offered = ["br", "gzip"] if brotli is not None else ["gzip"]
+    return request.accept_encodings.best_match(offered)
+
+
+def _compress_stream(chunks, compressor, encoding):
+    """Compress an iterable lazily, flushing after every chunk."""
+    raw = out = 0
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            if not chunk:
+                continue
+            data = compressor.compress(chunk) + compressor.flush()
+            raw += len(chunk)
+            out += len(data)
+            yield data
+        tail = compressor.finish()
+        out += len(tail)
+        yield tail
+    finally:
+        if hasattr(chunks, "close"):
+            chunks.close()
+        COMPRESSION_BYTES.inc(raw, encoding=encoding, direction="in")
+        COMPRESSION_BYTES.inc(out, encoding=encoding, direction="out")
+
+
+def _compress_response(app):
+    config = app.config
+    mimetypes = tuple(config.get("COMPRESS_MIMETYPES") or DEFAULT_MIMETYPES)
+    min_size = config.get("COMPRESS_MIN_SIZE", 1024)
+
+    def compress(response):
+        if response.mimetype not in mimetypes:
+            return response
+        response.vary.add("Accept-Encoding")
+        if (
+            request.method == "HEAD"
+            or response.status_code < 200
+            or response.status_code in (204, 206, 304)
+            or response.direct_passthrough
+            or "Content-Encoding" in response.headers
+            or "no-transform" in (response.headers.get("Cache-Control") or "")
+        ):
+            return response
+
+        encoding = _choose_encoding()
+        if not encoding:
+            return response
+
+        compressor = _compressor(encoding, config)
+        if response.is_streamed:
+            response.response = _compress_stream(response.response, compressor, encoding)
+            response.headers.pop("Content-Length", None)
+        else:
+            data = response.get_data()
+            if len(data) < min_size:
+                return response
+            compressed = compressor.compress(data) + compressor.finish()
+            if len(compressed) >= len(data):
+                return response
+            response.set_data(compressed)
+            COMPRESSION_BYTES.inc(len(data), encoding=encoding, direction="in")
+            COMPRESSION_BYTES.inc(len(compressed), encoding=encoding, direction="out")
+
+        response.headers["Content-Encoding"] = encoding
+        etag, weak = response.get_etag()
+        if etag:
+            response.set_etag(f"{etag}-{encoding}", weak=weak)
+        return response
+
+    return compress
+
+
+def init_compression(app):
+    """Compress text responses (disable with COMPRESS_ENABLED=0, e.g. behind a compressing proxy)."""
+    if app.config.get("COMPRESS_ENABLED", True):
+        app.after_request(_compress_response(app))
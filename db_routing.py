@@ -0,0 +1,84 @@
+"""Read-replica routing for read-only views.
+
+Set DATABASE_REPLICA_URIS (comma-separated) to register ``replica_N`` binds.
+Views decorated with ``@read_only`` send their SELECTs to a replica; every
+flush and every statement outside those views goes to the primary. A user
+whose request just wrote to the primary is pinned to it for
+REPLICA_STICKY_SECONDS, so the redirect back to their dashboard sees their
+own change even while replicas lag.
+
+To try it locally, point DATABASE_URI and DATABASE_REPLICA_URIS at two
+SQLite files (copy the primary file over the replica to "replicate").
+"""
+import random
+import time
+from functools import wraps
+
+from flask import current_app, g, has_request_context, session as http_session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import Delete, Insert, Update, event
+
+REPLICA_BIND_PREFIX = "replica_"
+_STICKY_KEY = "_db_primary_until"
+
+
+def replica_binds(uris):
+    """SQLALCHEMY_BINDS entries for a comma-separated list of replica URIs."""
+    return {
+        f"{REPLICA_BIND_PREFIX}{i}": uri.strip()
+        for i, uri in enumerate((uris or "").split(","))
+        if uri.strip()
+    }
+
+
+def _replica_requested():
+    if not (has_request_context() and g.get("db_read_only")):
+        return False
+    return http_session.get(_STICKY_KEY, 0) < time.time()
+
+
+class RoutingSession(Session):
+    """Flask-SQLAlchemy session that sends read-only view SELECTs to a replica."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (
+            bind is None
+            and not self._flushing
+            and not isinstance(clause, (Insert, Update, Delete))
+            and _replica_requested()
+        ):
+            replicas = [
+                engine for key, engine in self._db.engines.items()
+                if key and key.startswith(REPLICA_BIND_PREFIX)
+            ]
+            if replicas:
+                return random.choice(replicas)
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _remember_write(session, flush_context):
+    if has_request_context():
+        g.db_wrote = True
+
+
+def read_only(view):
+    """Mark a view as read-only so its queries may be served by a replica."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.db_read_only = True
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def _pin_writers_to_primary(response):
+    if g.get("db_wrote"):
+        http_session[_STICKY_KEY] = time.time() + current_app.config.get("REPLICA_STICKY_SECONDS", 10)
+    return response
+
+
+def init_replica_routing(app):
+    """Enable read-your-writes stickiness when replicas are configured."""
+    binds = app.config.get("SQLALCHEMY_BINDS") or {}
+    if any(key.startswith(REPLICA_BIND_PREFIX) for key in binds):
+        app.after_request(_pin_writers_to_primary)
@@ -1,8 +1,62 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
 from flask_sqlalchemy import SQLAlchemy
 from flask_mail import Mail
 from flask_login import LoginManager
 
-db = SQLAlchemy()
-mail = Mail()
+from metrics import track_mail
+from db_routing import RoutingSession
+
+
+class InstrumentedMail(Mail):
+    """Flask-Mail that records send latency and failures in /metrics.
+
+    ``send_later`` hands a message to a per-process thread pool
+    (MAIL_SEND_WORKERS) so the request returns without waiting on SMTP;
+    ``backlog()`` counts messages queued or being sent there. MAIL_ASYNC=0
+    makes ``send_later`` send inline.
+    """
+
+    def __init__(self, app=None):
+        self._executor = None
+        self._backlog = 0
+        self._lock = threading.Lock()
+        super().__init__(app)
+
+    def send(self, message):
+        with track_mail():
+            return super().send(message)
+
+    def send_later(self, message):
+        app = current_app._get_current_object()
+        if not app.config.get("MAIL_ASYNC", True):
+            return self.send(message)
+        with self._lock:
+            # Created on first use, i.e. in each forked worker rather than the preloading master
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=app.config.get("MAIL_SEND_WORKERS", 4), thread_name_prefix="mail",
+                )
+            self._backlog += 1
+        return self._executor.submit(self._send_in_background, app, message)
+
+    def _send_in_background(self, app, message):
+        try:
+            with app.app_context():
+                self.send(message)
+        except Exception as e:
+            app.logger.error(f"[MAIL] Background send of {message.subject!r} failed: {e}")
+        finally:
+            with self._lock:
+                self._backlog -= 1
+
+    def backlog(self):
+        return self._backlog
+
+
+db = SQLAlchemy(session_options={"class_": RoutingSession})
+mail = InstrumentedMail()
 login_manager = LoginManager()
 login_manager.login_view = "auth.login"
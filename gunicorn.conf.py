@@ -0,0 +1,46 @@
+"""Gunicorn settings for production: gunicorn -c gunicorn.conf.py wsgi:app
+
+Every value can be overridden through the environment (WEB_CONCURRENCY,
+GUNICORN_THREADS, PORT, ...).
+"""
+import multiprocessing
+import os
+
+bind = os.getenv("GUNICORN_BIND", f"0.0.0.0:{os.getenv('PORT', '8000')}")
+
+# Load the app once in the master; workers fork with the code already imported.
+preload_app = True
+
+# Mostly I/O bound (DB, SMTP, uploads): 2 x CPU + 1 processes, a few threads each.
+# Live dashboard streams (SSE) each hold a thread for minutes; config.SSE_MAX_STREAMS
+# caps them at half the threads, so add threads if many dashboards stay open.
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv("GUNICORN_THREADS", 4))
+worker_class = "gthread" if threads > 1 else "sync"
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 60))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", 5))
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 2000))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", 200))
+
+accesslog = os.getenv("GUNICORN_ACCESS_LOG", "-")
+errorlog = "-"
+
+
+def post_fork(server, worker):
+    """Drop pooled connections inherited from the master so workers never share sockets,
+    then start the worker's change-bus LISTEN thread and clearance PDF processes."""
+    import clearance
+    from change_bus import start_listener
+    from extensions import db
+    from metrics import instrument_pools
+    from wsgi import app
+
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+    # dispose() swaps in fresh pools; put the checkout timing/waiter counting back on them
+    instrument_pools(app)
+    start_listener(app)
+    clearance.start(app)
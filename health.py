@@ -0,0 +1,110 @@
+"""Load-balancer probes.
+
+``/healthz`` answers as long as the process serves requests (liveness).
+``/readyz`` also checks what requests depend on and answers 503 when this
+worker should get no new traffic:
+
+* database: ``SELECT 1`` on the primary within READY_DB_TIMEOUT seconds, and
+  no more than READY_MAX_POOL_WAITERS threads queued for a connection
+  (``waiting`` is null where the pool can't count them);
+* uploads: a file can be created in UPLOAD_FOLDER;
+* mail: fewer than READY_MAX_MAIL_BACKLOG messages waiting (mail.send_later).
+
+Neither needs a login, and both answer within about READY_DB_TIMEOUT: the
+database check runs in a helper thread, and a check still hanging from an
+earlier probe is waited on rather than started again.
+"""
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from flask import Blueprint, current_app, jsonify
+from sqlalchemy import text
+
+from extensions import db, mail
+from metrics import instrument_pools, pool_stats
+
+health_bp = Blueprint("health", __name__)
+
+_db_check = ThreadPoolExecutor(max_workers=1, thread_name_prefix="readyz")
+_db_pending = None
+_db_lock = threading.Lock()
+
+
+def _select_one(app):
+    with app.app_context():
+        with db.engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+
+
+def _check_database():
+    global _db_pending
+    app = current_app._get_current_object()
+    # Pools replaced by engine.dispose() (e.g. gunicorn post_fork) lose their waiter counting
+    instrument_pools(app)
+    pool = pool_stats(db.engine)  # taken before the probe's own checkout
+    with _db_lock:
+        if _db_pending is None or _db_pending.done():
+            _db_pending = _db_check.submit(_select_one, app)
+        pending = _db_pending
+
+    result = {"pool": pool}
+    try:
+        pending.result(timeout=app.config.get("READY_DB_TIMEOUT", 2))
+        result["ok"] = True
+    except TimeoutError:
+        result.update(ok=False, error="timed out")
+    except Exception as e:
+        result.update(ok=False, error=str(e))
+
+    max_waiters = app.config.get("READY_MAX_POOL_WAITERS", 2)
+    if result["ok"] and pool["waiting"] is not None and pool["waiting"] > max_waiters:
+        result.update(ok=False, error=f"{pool['waiting']} threads waiting for a connection (max {max_waiters})")
+    return result
+
+
+def _check_uploads():
+    folder = current_app.config["UPLOAD_FOLDER"]
+    try:
+        # Dotfile, so the upload GC never sees it even if removal fails
+        with tempfile.NamedTemporaryFile(dir=folder, prefix=".readyz-"):
+            pass
+        return {"ok": True}
+    except OSError as e:
+        return {"ok": False, "error": str(e)}
+
+
+def _check_mail():
+    backlog = mail.backlog()
+    limit = current_app.config.get("READY_MAX_MAIL_BACKLOG", 100)
+    result = {"ok": backlog < limit, "backlog": backlog}
+    if not result["ok"]:
+        result["error"] = f"{backlog} messages waiting (max {limit})"
+    return result
+
+
+@health_bp.route("/healthz")
+def healthz():
+    return jsonify({"status": "ok", "pid": os.getpid()})
+
+
+@health_bp.route("/readyz")
+def readyz():
+    checks = {}
+    for name, check in (("database", _check_database), ("uploads", _check_uploads), ("mail", _check_mail)):
+        start = time.perf_counter()
+        checks[name] = check()
+        checks[name]["ms"] = round((time.perf_counter() - start) * 1000, 1)
+
+    ready = all(c["ok"] for c in checks.values())
+    response = jsonify({"status": "ready" if ready else "unavailable", "pid": os.getpid(), "checks": checks})
+    response.status_code = 200 if ready else 503
+    response.headers["Cache-Control"] = "no-store"
+    return response
+
+
+def init_health(app):
+    instrument_pools(app)
+    app.register_blueprint(health_bp)
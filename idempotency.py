@@ -0,0 +1,87 @@
+"""Idempotency keys for form/API submissions.
+
+A client sends a unique key with a submission (``Idempotency-Key`` header or
+an ``idempotency_key`` form field; ``idempotency_key()`` in templates makes
+one). The first request with a key claims it by inserting a row, which only
+one concurrent request can do. A repeat gets the stored outcome of the first
+(or "in progress" while it runs) instead of redoing the work. Keys expire
+after IDEMPOTENCY_KEY_TTL_HOURS.
+"""
+import random
+import uuid
+from datetime import datetime, timedelta
+
+from flask import current_app, request
+from sqlalchemy.exc import IntegrityError
+
+from extensions import db
+from models import IdempotencyKey
+
+MAX_KEY_LENGTH = 100
+# A claim never completed after this long belongs to a request that died; let a retry take it
+ABANDONED_AFTER = timedelta(minutes=5)
+
+
+def new_key():
+    return uuid.uuid4().hex
+
+
+def request_key():
+    """The idempotency key sent with the current request, if any."""
+    key = request.headers.get("Idempotency-Key") or request.form.get("idempotency_key")
+    key = (key or "").strip()
+    return key[:MAX_KEY_LENGTH] or None
+
+
+def _ttl():
+    return timedelta(hours=current_app.config.get("IDEMPOTENCY_KEY_TTL_HOURS", 24))
+
+
+def claim(key, scope):
+    """Claim ``key`` for this request; returns (claimed, previous row or None).
+
+    Commits the claim immediately so concurrent duplicates see it.
+    """
+    now = datetime.utcnow()
+    existing = db.session.get(IdempotencyKey, key)
+    if existing is not None and (
+        existing.created_at < now - _ttl()
+        or (existing.completed_at is None and existing.created_at < now - ABANDONED_AFTER)
+    ):
+        db.session.delete(existing)
+        db.session.flush()
+        existing = None
+    if existing is not None:
+        return False, existing
+
+    db.session.add(IdempotencyKey(key=key, scope=scope, created_at=now))
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return False, db.session.get(IdempotencyKey, key)
+
+    # Expired keys are dropped now and then by whoever claims a new one
+    if random.random() < 0.01:
+        IdempotencyKey.query.filter(IdempotencyKey.created_at < now - _ttl()).delete()
+        db.session.commit()
+    return True, None
+
+
+def complete(key, result):
+    """Record the outcome; added to the session, so it commits with the caller's work."""
+    row = db.session.get(IdempotencyKey, key)
+    if row is not None:
+        row.result = result
+        row.completed_at = datetime.utcnow()
+
+
+def release(key):
+    """Forget a claim whose request failed, so the client can retry with the same key."""
+    db.session.rollback()
+    IdempotencyKey.query.filter_by(key=key).delete()
+    db.session.commit()
+
+
+def init_idempotency(app):
+    app.add_template_global(new_key, "idempotency_key")
@@ -0,0 +1,76 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, exists, insert, literal, or_, select, text
+
+from extensions import db
+from metrics import ARCHIVED_ROWS
+from models import Driver, Offboarding, driver_archive, offboarding_archive
+
+
+def _finished_filter(cutoff):
+    """Drivers with a Completed offboarding, nothing still open and no change since ``cutoff``."""
+    completed = exists().where(Offboarding.driver_id == Driver.id, Offboarding.status == "Completed")
+    pending = exists().where(
+        Offboarding.driver_id == Driver.id,
+        or_(Offboarding.status.is_(None), Offboarding.status != "Completed", Offboarding.updated_at >= cutoff),
+    )
+    return [completed, ~pending, or_(Driver.updated_at.is_(None), Driver.updated_at < cutoff)]
+
+
+def _ensure_partition(archive, when):
+    """Yearly range partition of an archive table (PostgreSQL only)."""
+    if db.engine.dialect.name != "postgresql":
+        return
+    year = when.year
+    db.session.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {archive.name}_{year} PARTITION OF {archive.name} "
+        f"FOR VALUES FROM ('{year}-01-01') TO ('{year + 1}-01-01')"
+    ))
+
+
+def _move(source, archive, where, archived_at):
+    """Copy matching rows into ``archive`` and delete them from ``source``; returns the row count."""
+    names = [c.name for c in source.columns]
+    db.session.execute(insert(archive).from_select(
+        names + ["archived_at"],
+        select(*source.c, literal(archived_at, db.DateTime)).where(where),
+    ))
+    moved = db.session.execute(delete(source).where(where)).rowcount
+    ARCHIVED_ROWS.inc(moved, table=source.name)
+    return moved
+
+
+def count_archivable(days, now=None):
+    cutoff = (now or datetime.utcnow()) - timedelta(days=days)
+    return db.session.query(Driver.id).filter(*_finished_filter(cutoff)).count()
+
+
+def archive_finished(days, batch_size=500, now=None):
+    """Move drivers offboarded more than ``days`` days ago, with their offboardings, to the archive.
+
+    Each batch is one transaction: rows are locked (``SKIP LOCKED`` so
+    concurrent requests are never blocked), copied, deleted and committed.
+    Returns ``(drivers, offboardings)`` moved.
+    """
+    now = now or datetime.utcnow()
+    cutoff = now - timedelta(days=days)
+
+    for archive in (driver_archive, offboarding_archive):
+        _ensure_partition(archive, now)
+    db.session.commit()
+
+    drivers = offboardings = 0
+    while True:
+        ids = db.session.execute(
+            select(Driver.id)
+            .where(*_finished_filter(cutoff))
+            .order_by(Driver.id)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        ).scalars().all()
+        if not ids:
+            break
+        offboardings += _move(Offboarding.__table__, offboarding_archive, Offboarding.driver_id.in_(ids), now)
+        drivers += _move(Driver.__table__, driver_archive, Driver.id.in_(ids), now)
+        db.session.commit()
+    return drivers, offboardings
@@ -0,0 +1,112 @@
+from collections import defaultdict
+from datetime import date, timedelta
+
+from flask import current_app
+from flask_mail import Message
+from sqlalchemy import exists
+
+from extensions import db, mail
+from metrics import track_mail
+from models import Driver, Offboarding, User
+
+# Roles that are responsible for renewing a driver's iqama in their branch
+ALERT_ROLES = ("HR", "OpsManager")
+
+
+def find_expiring_drivers(days, include_expired=False, today=None):
+    """Drivers whose iqama expires within ``days`` days, in one index range scan.
+
+    Only the columns needed for the alert are loaded; fully offboarded drivers
+    are skipped.
+    """
+    today = today or date.today()
+    horizon = today + timedelta(days=days)
+
+    query = (
+        db.session.query(
+            Driver.id, Driver.full_name, Driver.iqama_number, Driver.iqama_expiry_date,
+            Driver.city, Driver.onboarding_stage,
+        )
+        .filter(Driver.iqama_expiry_date <= horizon)
+        .filter(~exists().where(Offboarding.driver_id == Driver.id).where(Offboarding.status == "Completed"))
+        .order_by(Driver.iqama_expiry_date.asc())
+    )
+    if not include_expired:
+        query = query.filter(Driver.iqama_expiry_date >= today)
+    return query.all()
+
+
+def group_by_recipient(drivers):
+    """Map recipient email -> drivers in their branch.
+
+    Users of ALERT_ROLES see drivers of their ``branch_city``; users without a
+    branch see every city.
+    """
+    by_city = defaultdict(list)
+    for d in drivers:
+        by_city[(d.city or "").strip().lower()].append(d)
+
+    recipients = defaultdict(list)
+    users = User.query.filter(User.role.in_(ALERT_ROLES), User.email.isnot(None)).all()
+    for u in users:
+        branch = (u.branch_city or "").strip().lower()
+        if branch:
+            recipients[u.email].extend(by_city.get(branch, []))
+        else:
+            recipients[u.email].extend(drivers)
+    return {email: rows for email, rows in recipients.items() if rows}
+
+
+def _alert_body(rows, days, today):
+    lines = [
+        "Dear Team,",
+        "",
+        f"The following drivers have an iqama expiring within {days} days:",
+        "",
+    ]
+    for d in rows:
+        remaining = (d.iqama_expiry_date - today).days
+        status = "EXPIRED" if remaining < 0 else f"{remaining} days left"
+        lines.append(
+            f"- {d.full_name} (Iqama: {d.iqama_number}) — {d.city or 'N/A'} — "
+            f"expires {d.iqama_expiry_date.strftime('%Y-%m-%d')} ({status}) — stage: {d.onboarding_stage}"
+        )
+    lines += ["", "Please arrange renewals in time.", "", "Regards,", "Driver Onboarding System"]
+    return "\n".join(lines)
+
+
+def send_iqama_expiry_alerts(days=30, include_expired=False, dry_run=False):
+    """Send one batched alert per recipient over a single SMTP connection.
+
+    Returns (number of drivers found, {email: number of drivers listed},
+    {email: error}) where the second dict only holds alerts actually sent
+    (or that would be sent, with ``dry_run``) and the third the failed ones.
+    """
+    today = date.today()
+    drivers = find_expiring_drivers(days, include_expired=include_expired, today=today)
+    batches = group_by_recipient(drivers)
+
+    if dry_run or not batches:
+        return len(drivers), {email: len(rows) for email, rows in batches.items()}, {}
+
+    sent, failed = {}, {}
+    try:
+        with mail.connect() as conn:
+            for email, rows in batches.items():
+                try:
+                    with track_mail():
+                        conn.send(Message(
+                            subject=f"[Iqama Expiry] {len(rows)} driver(s) expiring within {days} days",
+                            recipients=[email],
+                            body=_alert_body(rows, days, today),
+                        ))
+                    sent[email] = len(rows)
+                except Exception as e:
+                    failed[email] = str(e)
+                    current_app.logger.warning(f"[IQAMA_EXPIRY] alert to {email} failed: {e}")
+    except Exception as e:
+        # Could not connect (or the connection broke): nobody left got an alert
+        for email in batches.keys() - sent.keys() - failed.keys():
+            failed[email] = str(e)
+        current_app.logger.error(f"[IQAMA_EXPIRY] SMTP connection failed: {e}")
+    return len(drivers), sent, failed
@@ -0,0 +1,187 @@
+"""Live dashboard updates over Server-Sent Events.
+
+``StageEvent.record`` queues a small event on the DB session; once the
+transaction commits the event is published to every open ``/dashboard/live/stream``
+connection whose role works on the old or new stage. Dashboards patch their
+lists from these events (remove a card that left the stage, announce new
+arrivals) instead of reloading the whole page.
+
+Each worker's broker is fed by the change bus (``change_bus.subscribe``), so
+a stream sees transitions committed by any worker.
+"""
+import json
+import queue
+import threading
+import time
+
+from flask import Blueprint, Response, current_app, stream_with_context
+from flask_login import current_user, login_required
+
+import change_bus
+from extensions import db
+from metrics import SSE_REJECTED
+
+live_bp = Blueprint("live", __name__)
+
+_SUBSCRIBER_QUEUE_SIZE = 200
+_RECONNECT_MS = 3000
+
+
+class _Subscriber:
+    def __init__(self, role, user_id, branch=None):
+        self.role = role
+        self.user_id = user_id
+        self.branch = branch
+        self.queue = queue.Queue(maxsize=_SUBSCRIBER_QUEUE_SIZE)
+        self.overflowed = False
+
+
+class Broker:
+    """Fan-out of published events to per-connection queues."""
+
+    def __init__(self):
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self, role, user_id, branch=None, limit=None):
+        """Register a connection; returns None when ``limit`` connections are already open."""
+        sub = _Subscriber(role, user_id, branch)
+        with self._lock:
+            if limit is not None and len(self._subscribers) >= limit:
+                return None
+            self._subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    def publish(self, evt):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for sub in subscribers:
+            try:
+                sub.queue.put_nowait(evt)
+            except queue.Full:
+                # Slow client: tell it to resync with a full reload instead of blocking publishers
+                sub.overflowed = True
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+
+broker = Broker()
+change_bus.subscribe(broker.publish)
+
+
+# -------------------------
+# Collecting events on commit
+# -------------------------
+def queue_stage_event(session, entity, from_stage, to_stage):
+    """Put a transition on the change bus; it is published when ``session`` commits."""
+    evt = {
+        "entity": "driver" if entity.__tablename__ == "driver" else "offboarding",
+        "id": entity.id,
+        "from": from_stage,
+        "to": to_stage,
+        "name": getattr(entity, "full_name", None),
+        "driver_id": getattr(entity, "driver_id", None),
+        "city": entity.city,
+        "at": time.time(),
+    }
+    change_bus.queue_change(session, evt)
+
+
+# -------------------------
+# Per-role routing
+# -------------------------
+def _stages_for(role, entity):
+    from claims import DRIVER_STAGES_BY_ROLE, OFFBOARDING_STAGES_BY_ROLE
+    by_role = DRIVER_STAGES_BY_ROLE if entity == "driver" else OFFBOARDING_STAGES_BY_ROLE
+    return set(by_role.get(role, ()))
+
+
+def event_for_role(evt, role, branch=None):
+    """Return ``evt`` tagged with an ``action`` for ``role``, or None if it does not concern them.
+
+    ``action`` is "entered" / "left" when the record crossed into / out of the
+    role's stages and "moved" when it went between two of them.
+
+    SuperAdmin watches every open record, so for them only reaching
+    "Completed" (or "Deleted") counts as leaving.
+
+    ``branch`` limits the stream to one city (see ``branches.user_branch``).
+    """
+    from branches import city_visible
+    if not city_visible(evt.get("city"), branch):
+        return None
+
+    if role == "SuperAdmin":
+        left = evt["to"] in ("Completed", "Deleted")
+        return dict(evt, action="left" if left else "entered")
+
+    stages = _stages_for(role, evt["entity"])
+    was_mine, is_mine = evt["from"] in stages, evt["to"] in stages
+    if is_mine and not was_mine:
+        return dict(evt, action="entered")
+    if was_mine and not is_mine:
+        return dict(evt, action="left")
+    if was_mine and is_mine:
+        return dict(evt, action="moved")
+    return None
+
+
+def _format_sse(evt, event_name="stage"):
+    return f"event: {event_name}\ndata: {json.dumps(evt)}\n\n"
+
+
+@live_bp.route("/dashboard/live/stream")
+@login_required
+def stream():
+    from branches import user_branch
+
+    role, user_id, branch = current_user.role, current_user.id, user_branch()
+    heartbeat = current_app.config.get("SSE_HEARTBEAT_SECONDS", 15)
+    max_seconds = current_app.config.get("SSE_MAX_STREAM_SECONDS", 300)
+
+    # Every open stream pins a worker thread; past the cap, keep the rest for normal requests
+    sub = broker.subscribe(role, user_id, branch, limit=current_app.config.get("SSE_MAX_STREAMS"))
+    if sub is None:
+        SSE_REJECTED.inc()
+        return Response(
+            "Too many live streams on this worker.\n", status=503, mimetype="text/plain",
+            headers={"Retry-After": str(current_app.config.get("SSE_RETRY_AFTER_SECONDS", 30))},
+        )
+
+    # Release the DB connection used to load current_user; the stream may stay open for minutes
+    db.session.remove()
+
+    def generate():
+        deadline = time.monotonic() + max_seconds
+        try:
+            # Browsers reconnect after ``retry`` ms when the stream ends or the connection drops
+            yield f"retry: {_RECONNECT_MS}\n\n"
+            while time.monotonic() < deadline:
+                if sub.overflowed:
+                    yield _format_sse({"reason": "overflow"}, "resync")
+                    return
+                try:
+                    evt = sub.queue.get(timeout=heartbeat)
+                except queue.Empty:
+                    yield ": ping\n\n"
+                    continue
+                tagged = event_for_role(evt, role, branch)
+                if tagged is not None:
+                    yield _format_sse(tagged)
+        finally:
+            broker.unsubscribe(sub)
+
+    response = Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+    # A client gone before the first chunk never starts generate(), so its finally never runs
+    response.call_on_close(lambda: broker.unsubscribe(sub))
+    return response
@@ -0,0 +1,314 @@
+"""Prometheus-style metrics, exposed as text at ``/metrics``.
+
+A small in-process registry (no extra dependency) for request latency, DB
+pool checkout waits, uploads, mail and workflow state. Values are per
+process; with several workers, scrape each worker or sum in Prometheus.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import Blueprint, Response, current_app, g, request
+from flask_login import current_user
+
+from db_routing import read_only
+
+metrics_bp = Blueprint("metrics", __name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (10_000, 50_000, 100_000, 500_000, 1_000_000, 2_000_000, 5_000_000, 10_000_000, 16_000_000)
+
+_registry = []
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)] + list(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(n, "")) for n in self.label_names)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def collect(self):
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [f"{self.name}{_format_labels(self.label_names, k)} {v}" for k, v in items]
+
+
+class Gauge(_Metric):
+    """Gauge whose samples are produced at scrape time by ``collector()`` -> {label tuple: value}."""
+    kind = "gauge"
+
+    def __init__(self, name, help_text, labels=(), collector=None):
+        super().__init__(name, help_text, labels)
+        self.collector = collector
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def collect(self):
+        if self.collector is not None:
+            try:
+                values = self.collector()
+            except Exception as e:
+                current_app.logger.warning("[METRICS] collector for %s failed: %s", self.name, e)
+                values = {}
+            with self._lock:
+                self._values = dict(values)
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [f"{self.name}{_format_labels(self.label_names, k)} {v}" for k, v in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state["counts"][i] += 1
+            state["sum"] += value
+            state["count"] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def collect(self):
+        with self._lock:
+            items = [(k, dict(v, counts=list(v["counts"]))) for k, v in self._values.items()]
+        lines = self.header()
+        for key, state in items:
+            for bound, count in zip(self.buckets, state["counts"]):
+                labels = _format_labels(self.label_names, key, ['le="%s"' % bound])
+                lines.append(f"{self.name}_bucket{labels} {count}")
+            labels = _format_labels(self.label_names, key, ['le="+Inf"'])
+            lines.append(f"{self.name}_bucket{labels} {state['count']}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {state['sum']}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {state['count']}")
+        return lines
+
+
+# -------------------------
+# Metric definitions
+# -------------------------
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "Request latency by blueprint and endpoint.",
+    ("blueprint", "endpoint", "method"),
+)
+REQUESTS_TOTAL = Counter(
+    "http_requests_total", "Requests by endpoint and status code.", ("endpoint", "method", "status"),
+)
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a pooled DB connection.", ("bind",),
+)
+UPLOAD_SIZE = Histogram("upload_size_bytes", "Size of saved uploads.", ("field",), buckets=SIZE_BUCKETS)
+UPLOAD_SAVE_DURATION = Histogram("upload_save_duration_seconds", "Time to write an upload to storage.", ("field",))
+MAIL_SEND_DURATION = Histogram("mail_send_duration_seconds", "Mail send latency.")
+MAIL_FAILURES = Counter("mail_send_failures_total", "Mail sends that raised an error.")
+STAGE_TRANSITIONS = Counter(
+    "stage_transitions_total", "Onboarding/offboarding transitions recorded.", ("entity", "to_stage"),
+)
+FRAGMENT_CACHE = Counter("template_fragment_cache_total", "{% cache %} fragment lookups.", ("result",))
+CHANGE_EVENTS = Counter(
+    "change_bus_events_total", "Change-bus events published, received over LISTEN and delivered locally.",
+    ("direction",),
+)
+UPLOAD_FILES_REMOVED = Counter(
+    "upload_files_removed_total", "Upload files removed by the purge queue (removed, missing, kept, failed) and the GC (orphan).", ("result",),
+)
+SSE_REJECTED = Counter("sse_streams_rejected_total", "Live streams refused because SSE_MAX_STREAMS were open.")
+RATE_LIMITED = Counter("rate_limited_requests_total", "Requests rejected by a rate limit.", ("limit",))
+ARCHIVED_ROWS = Counter("archived_rows_total", "Rows moved to the archive tables.", ("table",))
+CLEARANCE_PDFS = Counter(
+    "clearance_pdfs_total", "Clearance PDF requests (generated, cached, pending, stale, failed).", ("result",),
+)
+COMPRESSION_BYTES = Counter(
+    "http_compression_bytes_total",
+    "Response bytes before (in) and after (out) compression; in - out is the bytes saved.",
+    ("encoding", "direction"),
+)
+
+
+def _drivers_by_stage():
+    from extensions import db
+    from models import Driver
+    rows = db.session.query(Driver.onboarding_stage, db.func.count(Driver.id)).group_by(Driver.onboarding_stage)
+    return {(stage or "",): n for stage, n in rows}
+
+
+def _offboardings_by_status():
+    from extensions import db
+    from models import Offboarding
+    rows = db.session.query(Offboarding.status, db.func.count(Offboarding.id)).group_by(Offboarding.status)
+    return {(status or "",): n for status, n in rows}
+
+
+def pool_stats(engine):
+    """Queue-pool counters of ``engine`` (absent for pools without them, e.g. SQLite's).
+
+    ``waiting`` is the number of threads inside a checkout right now, or None
+    (unknown) while the pool is not instrumented (``instrument_pools``).
+    """
+    pool = engine.pool
+    stats = {}
+    for stat in ("size", "checkedout", "overflow", "checkedin"):
+        fn = getattr(pool, stat, None)
+        if callable(fn):
+            stats[stat] = fn()
+    stats["waiting"] = getattr(pool, "_checkouts_waiting", None)
+    return stats
+
+
+def _pool_stats():
+    from extensions import db
+    return {
+        (bind or "default", stat): value
+        for bind, engine in db.engines.items()
+        for stat, value in pool_stats(engine).items()
+        if value is not None
+    }
+
+
+def _mail_backlog():
+    from extensions import mail
+    return {(): mail.backlog()}
+
+
+DRIVERS_BY_STAGE = Gauge("drivers_by_onboarding_stage", "Drivers per onboarding stage.", ("stage",), _drivers_by_stage)
+OFFBOARDINGS_BY_STATUS = Gauge("offboardings_by_status", "Offboarding records per status.", ("status",), _offboardings_by_status)
+DB_POOL = Gauge("db_pool_connections", "Connection pool state.", ("bind", "state"), _pool_stats)
+MAIL_BACKLOG = Gauge("mail_backlog", "Messages waiting to be sent in the background (mail.send_later).", (), _mail_backlog)
+
+
+@contextmanager
+def track_mail():
+    """Time a mail send and count failures (the exception is re-raised)."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        MAIL_FAILURES.inc()
+        raise
+    finally:
+        MAIL_SEND_DURATION.observe(time.perf_counter() - start)
+
+
+def _instrument_pool(bind, engine):
+    pool = engine.pool
+    if getattr(pool, "_metrics_instrumented", False):
+        return
+    original_connect = pool.connect
+    lock = threading.Lock()
+    pool._checkouts_waiting = 0
+
+    def timed_connect():
+        start = time.perf_counter()
+        with lock:
+            pool._checkouts_waiting += 1
+        try:
+            return original_connect()
+        finally:
+            with lock:
+                pool._checkouts_waiting -= 1
+            DB_POOL_CHECKOUT_WAIT.observe(time.perf_counter() - start, bind=bind or "default")
+
+    pool.connect = timed_connect
+    pool._metrics_instrumented = True
+
+
+def instrument_pools(app):
+    """Time checkouts and count waiters on every bind's pool (idempotent)."""
+    from extensions import db
+    with app.app_context():
+        for bind, engine in db.engines.items():
+            _instrument_pool(bind, engine)
+
+
+def _start_timer():
+    g.metrics_start = time.perf_counter()
+
+
+def _record_request(response):
+    start = g.pop("metrics_start", None)
+    if start is not None and request.endpoint != "metrics.metrics":
+        endpoint = request.endpoint or "unmatched"
+        REQUEST_LATENCY.observe(
+            time.perf_counter() - start,
+            blueprint=request.blueprint or "", endpoint=endpoint, method=request.method,
+        )
+        REQUESTS_TOTAL.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+    return response
+
+
+def _authorized():
+    token = current_app.config.get("METRICS_TOKEN")
+    if token and request.headers.get("Authorization") == f"Bearer {token}":
+        return True
+    return current_user.is_authenticated and current_user.role == "SuperAdmin"
+
+
+@metrics_bp.route("/metrics")
+@read_only
+def metrics():
+    # Business counts (drivers per stage, transitions): scrapers need METRICS_TOKEN
+    if not _authorized():
+        return Response("Forbidden\n", status=403, mimetype="text/plain")
+
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.collect())
+    return Response("\n".join(lines) + "\n", mimetype="text/plain; version=0.0.4")
+
+
+def init_metrics(app):
+    """Register request timing and the /metrics endpoint (disable with METRICS_ENABLED=0)."""
+    if not app.config.get("METRICS_ENABLED", True):
+        return
+
+    instrument_pools(app)
+
+    app.before_request(_start_timer)
+    app.after_request(_record_request)
+    app.register_blueprint(metrics_bp)
@@ -1,6 +1,10 @@
 from extensions import db
 from flask_login import UserMixin
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, with_loader_criteria
 from datetime import datetime
+from live_events import queue_stage_event
+from metrics import STAGE_TRANSITIONS
 
 class Driver(db.Model):
     __tablename__ = "driver"
@@ -8,7 +12,7 @@ class Driver(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     full_name = db.Column(db.String(100), nullable=False)
     iqama_number = db.Column(db.String(20), unique=True, nullable=False)
-    iqama_expiry_date = db.Column(db.Date, nullable=True)
+    iqama_expiry_date = db.Column(db.Date, nullable=True, index=True)
     saudi_driving_license = db.Column(db.Boolean, default=False)
     nationality = db.Column(db.String(100), nullable=True)
     mobile_number = db.Column(db.String(15), nullable=True)
@@ -19,7 +23,7 @@ class Driver(db.Model):
     issued_mobile_number = db.Column(db.String(20), nullable=True)
     issued_device_id = db.Column(db.String(100), nullable=True)
     mobile_issued = db.Column(db.Boolean, default=False)
-    city = db.Column(db.String(100), nullable=True)
+    city = db.Column(db.String(100), nullable=True, default="")  # normalized, see normalize_city()
     car_details = db.Column(db.String(200), nullable=True)
     assignment_date = db.Column(db.Date, nullable=True)
     onboarding_stage = db.Column(db.String(50), default="Ops Manager", nullable=False)
@@ -43,6 +47,23 @@ class Driver(db.Model):
     transfer_fee_receipt = db.Column(db.String(200), nullable=True)
     sponsorship_transfer_proof = db.Column(db.String(200))  
 
+    # Bumped on every update; drives GET /api/changes
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Work claiming (lease) and optimistic locking
+    claimed_by_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=True)
+    claimed_until = db.Column(db.DateTime, nullable=True)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+
+    # Soft delete: hidden from ORM queries, purged by `flask uploads purge`
+    deleted_at = db.Column(db.DateTime, nullable=True)
+
+    __mapper_args__ = {"version_id_col": version}
+    __table_args__ = (
+        db.Index("ix_driver_updated_at_id", "updated_at", "id"),
+        db.Index("ix_driver_city_stage", "city", "onboarding_stage"),
+    )
+
     # ✅ Correct relationship
     offboarding_records = db.relationship("Offboarding", backref="driver", lazy=True)
 
@@ -69,6 +90,13 @@ class Driver(db.Model):
         self.finance_approved_at = datetime.utcnow()
         self.onboarding_stage = "Completed"
 
+    def mark_deleted(self):
+        """Soft-delete the driver and its offboarding records."""
+        now = datetime.utcnow()
+        for offboarding in self.offboarding_records:
+            offboarding.deleted_at = now
+        self.deleted_at = now
+
     def __repr__(self):
         return f"<Driver {self.full_name} - Stage: {self.onboarding_stage}>"
 
@@ -128,12 +156,32 @@ class Offboarding(db.Model):
     tamm_revoked = db.Column(db.Boolean, default=False)
     tamm_revoked_at = db.Column(db.DateTime)
 
+    # Clearance certificate under UPLOAD_FOLDER, written by clearance.py (name embeds updated_at)
+    clearance_pdf = db.Column(db.String(200))
+
     company_contract_cancelled = db.Column(db.Boolean, default=False)
     qiwa_contract_cancelled = db.Column(db.Boolean, default=False)
     salary_paid = db.Column(db.Boolean, default=False)
 
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Copy of driver.city (branch scoping / partition key), kept in sync by the listeners below
+    city = db.Column(db.String(100), nullable=True, default="")
+
+    # Work claiming (lease) and optimistic locking
+    claimed_by_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=True)
+    claimed_until = db.Column(db.DateTime, nullable=True)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+
+    # Set together with the driver's (Driver.mark_deleted)
+    deleted_at = db.Column(db.DateTime, nullable=True)
+
+    __mapper_args__ = {"version_id_col": version}
+    __table_args__ = (
+        db.Index("ix_offboarding_updated_at_id", "updated_at", "id"),
+        db.Index("ix_offboarding_city_status", "city", "status"),
+    )
     #offboarding_records = db.relationship('Offboarding', backref='driver', lazy=True)
     #offboarding_records = db.relationship('Offboarding', backref='driver', lazy=True)
 
@@ -169,5 +217,191 @@ class Offboarding(db.Model):
         self.hr_note = note
         self.status = "Completed"
 
-        # driver.py
 
+@event.listens_for(Driver.onboarding_stage, "set")
+@event.listens_for(Offboarding.status, "set")
+def _release_claim_on_transition(target, value, oldvalue, initiator):
+    """A lease only covers the stage it was taken in; moving on frees the record."""
+    if value != oldvalue:
+        target.claimed_by_id = None
+        target.claimed_until = None
+
+
+def normalize_city(value):
+    """Canonical city spelling ("  riyadh " -> "Riyadh"); blank means unassigned ("")."""
+    return " ".join(str(value or "").split()).title()
+
+
+@event.listens_for(Driver.city, "set", retval=True)
+def _normalize_driver_city(target, value, oldvalue, initiator):
+    value = normalize_city(value)
+    if value != oldvalue:
+        for offboarding in target.offboarding_records:
+            offboarding.city = value
+    return value
+
+
+@event.listens_for(User.branch_city, "set", retval=True)
+def _normalize_branch_city(target, value, oldvalue, initiator):
+    return normalize_city(value)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _hide_soft_deleted(state):
+    """Leave soft-deleted drivers/offboardings out of ORM queries and relationship loads.
+
+    Opt out with ``.execution_options(include_deleted=True)``. Refreshes of
+    already-loaded objects (column loads) are not filtered.
+    """
+    if not state.is_select or state.is_column_load or state.execution_options.get("include_deleted"):
+        return
+    state.statement = state.statement.options(
+        with_loader_criteria(Driver, lambda cls: cls.deleted_at.is_(None), include_aliases=True),
+        with_loader_criteria(Offboarding, lambda cls: cls.deleted_at.is_(None), include_aliases=True),
+    )
+
+
+@event.listens_for(Offboarding, "before_insert")
+def _copy_driver_city(mapper, connection, target):
+    if not target.city:
+        target.city = connection.scalar(select(Driver.city).where(Driver.id == target.driver_id)) or ""
+
+
+class StageEvent(db.Model):
+    """Append-only log of onboarding/offboarding stage transitions.
+
+    Rows are only ever inserted (never updated), and ``created_at`` leads the
+    time index so the table can be range-partitioned by month on PostgreSQL
+    (see ``flask stage-events partition``).
+    """
+    __tablename__ = "stage_event"
+
+    id = db.Column(db.Integer, primary_key=True)
+    entity_type = db.Column(db.String(20), nullable=False)  # "driver" or "offboarding"
+    entity_id = db.Column(db.Integer, nullable=False)
+    from_stage = db.Column(db.String(50), nullable=True)
+    to_stage = db.Column(db.String(50), nullable=False)
+    actor_id = db.Column(db.Integer, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    payload = db.Column(db.JSON, nullable=True)
+
+    __table_args__ = (
+        db.Index("ix_stage_event_entity", "entity_type", "entity_id", "created_at"),
+        db.Index("ix_stage_event_created_at", "created_at"),
+    )
+
+    @classmethod
+    def record(cls, entity, from_stage, to_stage, actor_id=None, **payload):
+        """Add a transition event for a Driver/Offboarding to the current session.
+
+        The event is committed together with the transition itself and pushed
+        to live dashboards once that commit succeeds.
+        """
+        if entity.id is None:
+            db.session.flush()
+        payload = {k: v for k, v in payload.items() if v is not None}
+        event = cls(
+            entity_type=entity.__tablename__,
+            entity_id=entity.id,
+            from_stage=from_stage,
+            to_stage=to_stage,
+            actor_id=actor_id,
+            created_at=datetime.utcnow(),
+            payload=payload or None,
+        )
+        db.session.add(event)
+        # Counted once committed, like the live event below
+        db.session().info.setdefault(_TRANSITIONS_KEY, []).append((event.entity_type, to_stage))
+        queue_stage_event(db.session(), entity, from_stage, to_stage)
+        return event
+
+    def __repr__(self):
+        return f"<StageEvent {self.entity_type}:{self.entity_id} {self.from_stage} -> {self.to_stage}>"
+
+
+_TRANSITIONS_KEY = "stage_transitions_pending"
+
+
+@event.listens_for(Session, "after_commit")
+def _count_transitions(session):
+    for entity_type, to_stage in session.info.pop(_TRANSITIONS_KEY, []):
+        STAGE_TRANSITIONS.inc(entity=entity_type, to_stage=to_stage)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_transitions(session):
+    session.info.pop(_TRANSITIONS_KEY, None)
+
+
+
+
+class PendingFileDeletion(db.Model):
+    """Upload file (name under UPLOAD_FOLDER) queued for removal by ``flask uploads purge``."""
+    __tablename__ = "pending_file_deletion"
+
+    id = db.Column(db.Integer, primary_key=True)
+    filename = db.Column(db.String(200), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    attempts = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    last_error = db.Column(db.Text, nullable=True)
+
+
+class IdempotencyKey(db.Model):
+    """Outcome of a request submitted with an idempotency key (see idempotency.py)."""
+    __tablename__ = "idempotency_key"
+
+    key = db.Column(db.String(100), primary_key=True)
+    scope = db.Column(db.String(50), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+    completed_at = db.Column(db.DateTime, nullable=True)
+    result = db.Column(db.JSON, nullable=True)
+
+
+class FinanceDailyRollup(db.Model):
+    """Per day/city/platform money totals, kept current by the clearance views (see rollups.py).
+
+    Blank city/platform are stored as "" so every row has a full primary key.
+    """
+    __tablename__ = "finance_daily_rollup"
+
+    day = db.Column(db.Date, primary_key=True)
+    city = db.Column(db.String(100), primary_key=True, default="")
+    platform = db.Column(db.String(100), primary_key=True, default="")
+
+    # Driver onboarding: finance approvals and the transfer fees they carried
+    transfer_fee_total = db.Column(db.Float, nullable=False, default=0, server_default="0")
+    transfer_fee_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+
+    # Offboarding: fleet clearances (damage costs) and finance clearances (adjustments)
+    fleet_damage_cost_total = db.Column(db.Float, nullable=False, default=0, server_default="0")
+    fleet_cleared_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    finance_adjustments_total = db.Column(db.Float, nullable=False, default=0, server_default="0")
+    finance_cleared_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+# -------------------------
+# Cold storage for finished records (see jobs/archival.py)
+# -------------------------
+def _archive_table(source, name, indexed=()):
+    """Append-only copy of ``source``'s columns plus ``archived_at``.
+
+    No foreign keys (archived rows must not block deleting users) and no
+    unique constraints (an iqama can be archived more than once). On
+    PostgreSQL the table is range-partitioned by ``archived_at``; yearly
+    partitions are created by the archival job.
+    """
+    columns = [db.Column(c.name, c.type, nullable=c.nullable and not c.primary_key) for c in source.columns]
+    return db.Table(
+        name, db.metadata,
+        *columns,
+        db.Column("archived_at", db.DateTime, nullable=False),
+        db.PrimaryKeyConstraint("id", "archived_at"),
+        *(db.Index(f"ix_{name}_{col}", col) for col in indexed),
+        postgresql_partition_by="RANGE (archived_at)",
+    )
+
+
+driver_archive = _archive_table(Driver.__table__, "driver_archive", indexed=("iqama_number", "full_name"))
+offboarding_archive = _archive_table(Offboarding.__table__, "offboarding_archive", indexed=("driver_id",))
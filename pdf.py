@@ -0,0 +1,95 @@
+"""Minimal text-only PDF writer (standard library only).
+
+Enough for printable summaries: a title and sections of "label: value"
+lines in Helvetica on A4 pages, wrapped and paginated. Text is encoded as
+WinAnsi (cp1252), the encoding the built-in PDF fonts support, so characters
+outside it (e.g. Arabic) print as "?".
+
+Kept free of app imports so process-pool workers can load it cheaply.
+"""
+import os
+import textwrap
+import zlib
+
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842  # A4 in points
+MARGIN = 56
+LINE_HEIGHT = 15
+WRAP_AT = 90
+LINES_PER_PAGE = (PAGE_HEIGHT - 2 * MARGIN) // LINE_HEIGHT
+
+
+def _escape(value):
+    raw = str(value).encode("cp1252", "replace")
+    return raw.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+def _layout(title, sections):
+    """Flatten the document into (font, size, text) lines."""
+    lines = [("F2", 16, title), ("F1", 10, "")]
+    for heading, rows in sections:
+        lines.append(("F2", 12, heading))
+        for label, value in rows:
+            text = f"{label}: {value if value not in (None, '') else '-'}"
+            for part in textwrap.wrap(text, WRAP_AT, subsequent_indent="    ") or [""]:
+                lines.append(("F1", 10, part))
+        lines.append(("F1", 10, ""))
+    return lines
+
+
+def _page_stream(lines):
+    out = [b"BT", f"{MARGIN} {PAGE_HEIGHT - MARGIN} Td".encode(), f"{LINE_HEIGHT} TL".encode()]
+    for font, size, text in lines:
+        out.append(f"/{font} {size} Tf".encode())
+        out.append(b"(" + _escape(text) + b") Tj T*")
+    out.append(b"ET")
+    return zlib.compress(b"\n".join(out))
+
+
+def render_pdf(title, sections):
+    """PDF bytes for ``title`` and ``sections`` = [(heading, [(label, value), ...]), ...]."""
+    lines = _layout(title, sections)
+    pages = [lines[i:i + LINES_PER_PAGE] for i in range(0, len(lines), LINES_PER_PAGE)]
+
+    # Object numbers: 1 catalog, 2 page tree, 3-4 fonts, then (page, content) pairs
+    objects = {
+        1: b"<< /Type /Catalog /Pages 2 0 R >>",
+        3: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+        4: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>",
+    }
+    kids = []
+    for n, page_lines in enumerate(pages):
+        page_id, content_id = 5 + 2 * n, 6 + 2 * n
+        kids.append(f"{page_id} 0 R")
+        objects[page_id] = (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] "
+            f"/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents {content_id} 0 R >>"
+        ).encode()
+        stream = _page_stream(page_lines)
+        objects[content_id] = (
+            f"<< /Length {len(stream)} /Filter /FlateDecode >>\nstream\n".encode() + stream + b"\nendstream"
+        )
+    objects[2] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(pages)} >>".encode()
+
+    out = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = {}
+    for num in sorted(objects):
+        offsets[num] = len(out)
+        out += f"{num} 0 obj\n".encode() + objects[num] + b"\nendobj\n"
+    xref = len(out)
+    count = max(objects) + 1
+    out += f"xref\n0 {count}\n0000000000 65535 f \n".encode()
+    for num in range(1, count):
+        out += f"{offsets[num]:010d} 00000 n \n".encode()
+    out += f"trailer\n<< /Size {count} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(out)
+
+
+def write_pdf(path, title, sections):
+    """Render to ``path`` atomically (temp file + rename); returns the size in bytes."""
+    data = render_pdf(title, sections)
+    folder, name = os.path.split(path)
+    tmp = os.path.join(folder, f".{name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as fh:
+        fh.write(data)
+    os.replace(tmp, path)
+    return len(data)
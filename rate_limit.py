@@ -0,0 +1,106 @@
+"""Token-bucket rate limiting for public endpoints.
+
+    @public_bp.route("/register", methods=["POST"])
+    @rate_limited("register")
+    def register(): ...
+
+Limits come from ``RATE_LIMITS`` (name -> "rate/period[;burst]", e.g.
+"10/minute;20"): each client IP gets a bucket of ``burst`` tokens refilled at
+``rate`` per period. The bucket store is pluggable through
+RATE_LIMIT_BACKEND (dotted path to a class with ``hit(key, rate, capacity)``);
+the default keeps buckets in process memory, so with several workers each
+enforces its own share of the limit.
+"""
+import threading
+import time
+from functools import wraps
+
+from flask import current_app, flash, jsonify, redirect, request
+from werkzeug.utils import import_string
+
+from metrics import RATE_LIMITED
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+def parse_limit(spec):
+    """Parse "10/minute;20" into (tokens per second, burst capacity); burst defaults to the count."""
+    rate_part, _, burst = spec.partition(";")
+    count, _, period = rate_part.partition("/")
+    count = float(count)
+    seconds = PERIODS[period.strip().rstrip("s") or "second"]
+    return count / seconds, float(burst) if burst else count
+
+
+class MemoryBackend:
+    """Per-process token buckets; idle buckets are pruned once there are ``max_keys``."""
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def hit(self, key, rate, capacity):
+        """Take one token; returns (allowed, seconds until the next token)."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - last) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._prune(now, rate, capacity)
+        return allowed, 0 if allowed else (1 - tokens) / rate
+
+    def _prune(self, now, rate, capacity):
+        # A bucket that has refilled completely is the same as no bucket
+        full_after = capacity / rate
+        for key, (_, last) in list(self._buckets.items()):
+            if now - last >= full_after:
+                del self._buckets[key]
+
+
+def client_ip():
+    """The caller's IP; with RATE_LIMIT_TRUSTED_PROXIES=n, the address n hops back in X-Forwarded-For."""
+    hops = current_app.config.get("RATE_LIMIT_TRUSTED_PROXIES", 0)
+    route = request.access_route if hops else []
+    if hops and len(route) > hops:
+        return route[-hops - 1]
+    return request.remote_addr or "unknown"
+
+
+def _backend():
+    backend = current_app.extensions.get("rate_limit_backend")
+    if backend is None:
+        cls = import_string(current_app.config.get("RATE_LIMIT_BACKEND", "rate_limit.MemoryBackend"))
+        backend = current_app.extensions["rate_limit_backend"] = cls()
+    return backend
+
+
+def rate_limited(name, message="Too many requests. Please wait a moment and try again."):
+    """Limit a view per client IP using the ``RATE_LIMITS[name]`` setting (no setting: unlimited)."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            spec = (current_app.config.get("RATE_LIMITS") or {}).get(name)
+            if not spec or not current_app.config.get("RATE_LIMIT_ENABLED", True):
+                return view(*args, **kwargs)
+
+            rate, capacity = parse_limit(spec)
+            allowed, retry_after = _backend().hit(f"{name}:{client_ip()}", rate, capacity)
+            if allowed:
+                return view(*args, **kwargs)
+
+            RATE_LIMITED.inc(limit=name)
+            if request.is_json:
+                response = jsonify({"success": False, "message": message})
+                response.status_code = 429
+            else:
+                flash(message, "danger")
+                response = redirect(request.referrer or "/")
+            response.headers["Retry-After"] = str(max(1, round(retry_after)))
+            return response
+        return wrapper
+    return decorator
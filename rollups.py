@@ -0,0 +1,213 @@
+"""Daily finance totals by city and platform (``finance_daily_rollup``).
+
+The clearance views update the rollup in the same transaction as the
+clearance itself:
+
+    before = rollups.contributions(driver)
+    ... change the driver ...
+    rollups.apply_change(before, driver)
+    db.session.commit()
+
+``contributions`` says what a record currently adds to which (day, city,
+platform) row, so re-approvals and corrected amounts move the difference
+instead of double counting. Reports then sum a few hundred rollup rows
+instead of scanning driver/offboarding; ``flask finance rebuild-rollups``
+recomputes the table from scratch.
+
+Totals cover live, soft-deleted and archived records. Purging soft-deleted
+records (``flask uploads purge``) takes their contributions out with
+``remove``, so both ways of maintaining the table agree.
+"""
+from sqlalchemy import and_, bindparam, delete, func, insert, literal, select, text, union_all
+from sqlalchemy.dialects import postgresql, sqlite
+
+from archive import records
+from extensions import db
+from models import Driver, FinanceDailyRollup, normalize_city
+
+MEASURES = (
+    "transfer_fee_total", "transfer_fee_count",
+    "fleet_damage_cost_total", "fleet_cleared_count",
+    "finance_adjustments_total", "finance_cleared_count",
+)
+PERIODS = ("day", "month", "quarter", "year")
+GROUP_DIMENSIONS = ("city", "platform")
+
+
+def _key(when, city, platform):
+    return when.date(), normalize_city(city) or "", (platform or "").strip()
+
+
+def contributions(entity):
+    """``{(day, city, platform): {measure: amount}}`` for a Driver or Offboarding as it is now."""
+    if isinstance(entity, Driver):
+        if entity.finance_approved_at is None:
+            return {}
+        key = _key(entity.finance_approved_at, entity.city, entity.platform)
+        return {key: {"transfer_fee_total": entity.transfer_fee_amount or 0, "transfer_fee_count": 1}}
+
+    platform = entity.driver.platform if entity.driver is not None else None
+    result = {}
+    if entity.fleet_cleared_at is not None:
+        measures = result.setdefault(_key(entity.fleet_cleared_at, entity.city, platform), {})
+        measures["fleet_damage_cost_total"] = entity.fleet_damage_cost or 0
+        measures["fleet_cleared_count"] = 1
+    if entity.finance_cleared_at is not None:
+        measures = result.setdefault(_key(entity.finance_cleared_at, entity.city, platform), {})
+        measures["finance_adjustments_total"] = entity.finance_adjustments or 0
+        measures["finance_cleared_count"] = 1
+    return result
+
+
+def apply_change(before, entity):
+    """Move the rollup from ``before`` (an earlier ``contributions``) to the entity's current values."""
+    after = contributions(entity)
+    for key in before.keys() | after.keys():
+        old, new = before.get(key, {}), after.get(key, {})
+        deltas = {m: new.get(m, 0) - old.get(m, 0) for m in MEASURES}
+        deltas = {m: v for m, v in deltas.items() if v}
+        if deltas:
+            add(*key, **deltas)
+
+
+def add(day, city, platform, **deltas):
+    """Add ``deltas`` to one rollup row, creating it if needed (part of the caller's transaction)."""
+    table = FinanceDailyRollup.__table__
+    dialect = db.engine.dialect.name
+    values = {"day": day, "city": city, "platform": platform, **{m: 0 for m in MEASURES}, **deltas}
+
+    if dialect in ("postgresql", "sqlite"):
+        stmt = (postgresql if dialect == "postgresql" else sqlite).insert(table).values(**values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["day", "city", "platform"],
+            set_={
+                **{m: table.c[m] + stmt.excluded[m] for m in deltas},
+                "updated_at": func.now(),
+            },
+        )
+        db.session.execute(stmt)
+        return
+
+    key = and_(table.c.day == day, table.c.city == city, table.c.platform == platform)
+    updated = db.session.execute(
+        table.update().where(key).values(**{m: table.c[m] + v for m, v in deltas.items()})
+    ).rowcount
+    if not updated:
+        db.session.execute(insert(table).values(**values))
+
+
+def _zeros(**measures):
+    return [measures.get(m, literal(0)).label(m) for m in MEASURES]
+
+
+def remove(entity):
+    """Take a record's contributions out of the rollup before it is hard-deleted (part of the caller's transaction)."""
+    for key, measures in contributions(entity).items():
+        deltas = {m: -v for m, v in measures.items() if v}
+        if deltas:
+            add(*key, **deltas)
+
+
+def rebuild():
+    """Recompute the whole rollup from driver/offboarding history; returns the number of rows.
+
+    Reads live, soft-deleted and archived rows; purged records are gone and
+    were already taken out by ``remove``.
+
+    Rows are grouped under each record's current city and platform, whereas
+    the incremental updates use the values at clearance time; a rebuild
+    therefore also re-files totals of drivers who have since changed city.
+    """
+    drivers = records(
+        "driver", ["id", "city", "platform", "transfer_fee_amount", "finance_approved_at"], include_deleted=True,
+    )
+    offboardings = records(
+        "offboarding",
+        ["driver_id", "city", "fleet_cleared_at", "fleet_damage_cost", "finance_cleared_at", "finance_adjustments"],
+        include_deleted=True,
+    )
+    joined = offboardings.outerjoin(drivers, drivers.c.id == offboardings.c.driver_id)
+
+    def dims(city, platform):
+        return [func.coalesce(city, "").label("city"), func.coalesce(platform, "").label("platform")]
+
+    events = union_all(
+        select(func.date(drivers.c.finance_approved_at).label("day"), *dims(drivers.c.city, drivers.c.platform),
+               *_zeros(transfer_fee_total=func.coalesce(drivers.c.transfer_fee_amount, 0),
+                       transfer_fee_count=literal(1)))
+        .where(drivers.c.finance_approved_at.is_not(None)),
+        select(func.date(offboardings.c.fleet_cleared_at).label("day"),
+               *dims(offboardings.c.city, drivers.c.platform),
+               *_zeros(fleet_damage_cost_total=func.coalesce(offboardings.c.fleet_damage_cost, 0),
+                       fleet_cleared_count=literal(1)))
+        .select_from(joined)
+        .where(offboardings.c.fleet_cleared_at.is_not(None)),
+        select(func.date(offboardings.c.finance_cleared_at).label("day"),
+               *dims(offboardings.c.city, drivers.c.platform),
+               *_zeros(finance_adjustments_total=func.coalesce(offboardings.c.finance_adjustments, 0),
+                       finance_cleared_count=literal(1)))
+        .select_from(joined)
+        .where(offboardings.c.finance_cleared_at.is_not(None)),
+    ).subquery("events")
+
+    grouped = select(
+        events.c.day, events.c.city, events.c.platform,
+        *(func.sum(events.c[m]) for m in MEASURES),
+    ).group_by(events.c.day, events.c.city, events.c.platform)
+
+    table = FinanceDailyRollup.__table__
+    db.session.execute(delete(table))
+    db.session.execute(insert(table).from_select(["day", "city", "platform", *MEASURES], grouped))
+    count = db.session.query(func.count()).select_from(table).scalar()
+    db.session.commit()
+    return count
+
+
+def _period_label(dialect, period):
+    """SQL expression naming the ``period`` a rollup day falls in: 2026-10-18, 2026-10, 2026-Q4, 2026."""
+    if dialect == "postgresql":
+        fmt = {"day": "YYYY-MM-DD", "month": "YYYY-MM", "quarter": 'YYYY-"Q"Q', "year": "YYYY"}[period]
+        return f"to_char(day, '{fmt}')"
+    if period == "quarter":
+        return "strftime('%Y', day) || '-Q' || ((CAST(strftime('%m', day) AS INTEGER) + 2) / 3)"
+    fmt = {"day": "%Y-%m-%d", "month": "%Y-%m", "year": "%Y"}[period]
+    return f"strftime('{fmt}', day)"
+
+
+def totals(period="month", start=None, end=None, group_by=(), branch=None):
+    """Summed measures per period (and ``group_by`` dimensions) for days in [start, end].
+
+    ``branch`` limits the rows to one city plus unassigned ones, like ``branches.in_branch``.
+    """
+    dims = [d for d in GROUP_DIMENSIONS if d in group_by]
+    label = _period_label(db.engine.dialect.name, period)
+    dim_cols = "".join(f", {d}" for d in dims)
+    sums = ", ".join(f"SUM({m}) AS {m}" for m in MEASURES)
+
+    where, params = [], {}
+    if start:
+        where.append("day >= :start")
+        params["start"] = start
+    if end:
+        where.append("day <= :end")
+        params["end"] = end
+    if branch is not None:
+        where.append("city IN (:branch, '')")
+        params["branch"] = branch
+
+    sql = (
+        f"SELECT {label} AS period{dim_cols}, {sums} FROM {FinanceDailyRollup.__tablename__}"
+        + (f" WHERE {' AND '.join(where)}" if where else "")
+        + f" GROUP BY {label}{dim_cols} ORDER BY {label}{dim_cols}"
+    )
+    query = text(sql).bindparams(*(bindparam(k, type_=db.Date) for k in ("start", "end") if k in params))
+    results = []
+    for row in db.session.execute(query, params).mappings():
+        item = {"period": row["period"]}
+        for d in dims:
+            item[d] = row[d] or "Unknown"
+        for m in MEASURES:
+            value = row[m] or 0
+            item[m] = int(value) if m.endswith("_count") else round(float(value), 2)
+        results.append(item)
+    return results
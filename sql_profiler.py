@@ -0,0 +1,144 @@
+"""Opt-in per-request SQL profiler (enable with SQL_PROFILER_ENABLED=1).
+
+Counts queries and DB time for every request, spots repeated statement
+shapes (typical N+1 lazy loads such as ``o.driver`` in the dashboards),
+logs a warning when a route crosses the configured thresholds, adds an
+``X-SQL-Profile`` header and keeps recent profiles for ``/_debug/sql_profile``.
+"""
+import re
+import threading
+import time
+from collections import Counter, deque
+
+from flask import Blueprint, current_app, g, has_request_context, jsonify, request
+from flask_login import current_user, login_required
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+sql_profiler_bp = Blueprint("sql_profiler", __name__)
+
+_recent = deque(maxlen=200)
+_recent_lock = threading.Lock()
+_listening = False
+
+_WHITESPACE = re.compile(r"\s+")
+_IN_LIST = re.compile(r"IN \((?:[^()]*)\)", re.IGNORECASE)
+_POSTCOMPILE = re.compile(r"\(__\[POSTCOMPILE_\w+\]\)")
+
+
+def statement_shape(statement):
+    """Normalize a statement so the same query with different parameters compares equal."""
+    shape = _WHITESPACE.sub(" ", statement).strip()
+    shape = _POSTCOMPILE.sub("(?)", shape)
+    return _IN_LIST.sub("IN (?)", shape)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and "sql_profile" in g:
+        conn.info.setdefault("sql_profile_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if not (has_request_context() and "sql_profile" in g):
+        return
+    starts = conn.info.get("sql_profile_start")
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    profile = g.sql_profile
+    profile["count"] += 1
+    profile["db_seconds"] += elapsed
+    profile["shapes"][statement_shape(statement)] += 1
+
+
+def _start_profile():
+    g.sql_profile = {"count": 0, "db_seconds": 0.0, "shapes": Counter(), "started": time.perf_counter()}
+
+
+def _finish_profile(response):
+    profile = g.pop("sql_profile", None)
+    if profile is None:
+        return response
+
+    cfg = current_app.config
+    repeat_threshold = cfg.get("SQL_PROFILER_REPEAT_THRESHOLD", 5)
+    repeated = [
+        {"statement": shape[:300], "count": n}
+        for shape, n in profile["shapes"].most_common()
+        if n >= repeat_threshold
+    ]
+    summary = {
+        "method": request.method,
+        "path": request.path,
+        "endpoint": request.endpoint,
+        "status": response.status_code,
+        "queries": profile["count"],
+        "db_ms": round(profile["db_seconds"] * 1000, 2),
+        "total_ms": round((time.perf_counter() - profile["started"]) * 1000, 2),
+        "distinct_statements": len(profile["shapes"]),
+        "repeated": repeated,
+        "at": time.time(),
+    }
+
+    if (
+        summary["queries"] > cfg.get("SQL_PROFILER_MAX_QUERIES", 30)
+        or summary["db_ms"] > cfg.get("SQL_PROFILER_MAX_DB_MS", 500)
+        or repeated
+    ):
+        current_app.logger.warning(
+            "[SQL_PROFILER] %s %s: %s queries, %.1f ms DB, %s repeated statement(s)%s",
+            request.method, request.path, summary["queries"], summary["db_ms"], len(repeated),
+            f" — e.g. x{repeated[0]['count']}: {repeated[0]['statement'][:120]}" if repeated else "",
+        )
+
+    if request.endpoint != "sql_profiler.sql_profile":
+        with _recent_lock:
+            _recent.append(summary)
+
+    response.headers["X-SQL-Profile"] = (
+        f"queries={summary['queries']}; db_ms={summary['db_ms']}; repeated={len(repeated)}"
+    )
+    return response
+
+
+@sql_profiler_bp.route("/_debug/sql_profile")
+@login_required
+def sql_profile():
+    """Recent request profiles plus per-endpoint aggregates."""
+    if current_user.role != "SuperAdmin":
+        return jsonify({"success": False, "message": "Access denied"}), 403
+
+    with _recent_lock:
+        recent = list(_recent)
+
+    by_endpoint = {}
+    for item in recent:
+        agg = by_endpoint.setdefault(item["endpoint"] or item["path"], {
+            "requests": 0, "queries": 0, "max_queries": 0, "db_ms": 0.0, "with_repeats": 0,
+        })
+        agg["requests"] += 1
+        agg["queries"] += item["queries"]
+        agg["max_queries"] = max(agg["max_queries"], item["queries"])
+        agg["db_ms"] = round(agg["db_ms"] + item["db_ms"], 2)
+        agg["with_repeats"] += 1 if item["repeated"] else 0
+    for agg in by_endpoint.values():
+        agg["avg_queries"] = round(agg["queries"] / agg["requests"], 1)
+
+    limit = request.args.get("limit", 50, type=int)
+    return jsonify({"success": True, "endpoints": by_endpoint, "recent": recent[-limit:][::-1]})
+
+
+def init_sql_profiler(app):
+    """Register the engine hooks and request handlers when SQL_PROFILER_ENABLED is set."""
+    global _listening
+    if not app.config.get("SQL_PROFILER_ENABLED"):
+        return
+
+    if not _listening:
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        _listening = True
+
+    app.before_request(_start_profile)
+    app.after_request(_finish_profile)
+    app.register_blueprint(sql_profiler_bp)
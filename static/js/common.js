@@ -0,0 +1,11 @@
+/* Helpers shared by the role dashboards. */
+
+// Onboarding / offboarding tab switcher used by the ops, ops supervisor and finance dashboards
+function showTab(tab, evt) {
+  document.getElementById("onboardingTab").style.display = tab === "onboarding" ? "block" : "none";
+  document.getElementById("offboardingTab").style.display = tab === "offboarding" ? "block" : "none";
+
+  document.querySelectorAll(".tab-button").forEach(btn => btn.classList.remove("active"));
+  const e = evt || window.event;
+  if (e && e.currentTarget) e.currentTarget.classList.add("active");
+}
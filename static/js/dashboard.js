@@ -0,0 +1,341 @@
+/* ----------------- Basic UI helpers ----------------- */
+function switchDriverTab(tab){
+  const tabs = ['pending','onboarded','pendingOffboarding','fullyOffboarded'];
+  const tabIds = ['pendingTab','onboardedTab','pendingOffboardingTab','fullyOffboardedTab'];
+  const btnIds = ['tabPendingBtn','tabOnboardedBtn','tabPendingOffboardingBtn','tabFullyOffboardedBtn'];
+
+  tabs.forEach((t,i)=>{
+    document.getElementById(tabIds[i]).style.display = (tab === t ? 'block' : 'none');
+    document.getElementById(btnIds[i]).classList.toggle('active', tab === t);
+  });
+}
+
+    function showSection(s){
+      // small placeholder for future multi-section switching (drivers/users/reports)
+      if(s === 'users') {
+        window.scrollTo({top: document.querySelector('.users-list').offsetTop - 120, behavior:'smooth'});
+        // open users panel by focusing search
+        document.getElementById('userSearch')?.focus();
+      } else if (s === 'reports') {
+        // jump to top or show a reports section if you add one
+        window.scrollTo({top:0, behavior:'smooth'});
+      } else {
+        window.scrollTo({top:0, behavior:'smooth'});
+      }
+    }
+
+    /* ----------------- modal open/close ----------------- */
+    function openViewModal(e, btn){
+      e.stopPropagation();
+      try{
+        const card = btn.closest('.driver-card');
+        const data = JSON.parse(card.dataset.driver);
+        renderViewModal(data);
+        document.getElementById('viewModal').classList.add('show');
+        document.getElementById('viewModal').focus();
+      }catch(err){
+        console.error('openViewModal error', err);
+        showToast('Unable to open driver details — check console.', 'error');
+      }
+    }
+
+    function renderViewModal(d){
+      let html = '<div style="display:flex;gap:16px;flex-direction:column;">';
+      html += '<div style="display:flex;gap:16px;flex-wrap:wrap;">';
+      html += `<div style="flex:1"><h3>${escapeHTML(d.full_name || '')}</h3>`;
+      html += `<p><strong>Iqama:</strong> ${escapeHTML(d.iqama_number || '')}</p>`;
+      html += `<p><strong>Iqama expiry:</strong> ${escapeHTML(d.iqama_expiry_date || '')}</p>`;
+      html += `<p><strong>Nationality:</strong> ${escapeHTML(d.nationality || '')}</p>`;
+      html += `<p><strong>Mobile:</strong> ${escapeHTML(d.mobile_number || '')}</p>`;
+      html += `<p><strong>Prev sponsor:</strong> ${escapeHTML(d.previous_sponsor_number || '')}</p>`;
+      html += `<p><strong>Platform:</strong> ${escapeHTML(d.platform || '')}</p>`;
+      html += `<p><strong>Platform ID:</strong> ${escapeHTML(d.platform_id || '')}</p>`;
+      html += `<p><strong>Issued Mobile:</strong> ${escapeHTML(d.issued_mobile_number || '')}</p>`;
+      html += `<p><strong>Issued Device ID:</strong> ${escapeHTML(d.issued_device_id || '')}</p>`;
+      html += `<p><strong>Mobile issued:</strong> ${d.mobile_issued ? '✅ Yes' : '❌ No'}</p>`;
+      html += `<p><strong>Car Details:</strong> ${escapeHTML(d.car_details || '')}</p>`;
+      html += `<p><strong>Assignment date:</strong> ${escapeHTML(d.assignment_date || '')}</p>`;
+      html += `<p><strong>TAMM authorized:</strong> ${d.tamm_authorized ? '✅ Yes' : '❌ No'}</p>`;
+      html += `</div></div>`;
+
+      // images
+      if(d.iqama_card_upload || d.tamm_authorization_ss || d.transfer_fee_receipt){
+        html += '<div class="image-row">';
+        if(d.iqama_card_upload){
+          html += `<div><label class="small">Iqama card</label><br><img src="/static/uploads/${encodeURIComponent(d.iqama_card_upload)}" alt="iqama"></div>`;
+        }
+        if(d.tamm_authorization_ss){
+          html += `<div><label class="small">TAMM screenshot</label><br><img src="/static/uploads/${encodeURIComponent(d.tamm_authorization_ss)}" alt="tamm"></div>`;
+        }
+        if(d.transfer_fee_receipt){
+          html += `<div><label class="small">Transfer proof</label><br><a href="/static/uploads/${encodeURIComponent(d.transfer_fee_receipt)}" target="_blank"><img src="/static/uploads/${encodeURIComponent(d.transfer_fee_receipt)}" alt="receipt"></a></div>`;
+        }
+        html += '</div>';
+      }
+
+      // approvals & transfer fee
+      html += '<hr>';
+      html += '<div class="grid-2">';
+      html += `<div><p><strong>Ops manager approved:</strong> ${escapeHTML(d.ops_manager_approved_at || 'Pending')}</p>
+                    <p><strong>HR approved:</strong> ${escapeHTML(d.hr_approved_at || 'Pending')}</p>
+                    <p><strong>Ops supervisor approved:</strong> ${escapeHTML(d.ops_supervisor_approved_at || 'Pending')}</p></div>`;
+      html += `<div><p><strong>Fleet manager approved:</strong> ${escapeHTML(d.fleet_manager_approved_at || 'Pending')}</p>
+                    <p><strong>Finance approved:</strong> ${escapeHTML(d.finance_approved_at || 'Pending')}</p></div>`;
+      html += '</div>';
+
+      html += '<hr>';
+      html += `<p><strong>Transfer fee paid:</strong> ${d.transfer_fee_paid ? '✅ Yes' : '❌ No'}</p>`;
+      html += `<p><strong>Amount:</strong> ${escapeHTML(d.transfer_fee_amount || '')}</p>`;
+      html += `<p><strong>Paid at:</strong> ${escapeHTML(d.transfer_fee_paid_at || '')}</p>`;
+
+      html += '</div>';
+      document.getElementById('viewContent').innerHTML = html;
+    }
+
+    function openEditModal(e, btn){
+      e.stopPropagation();
+      try{
+        const card = btn.closest('.driver-card');
+        const d = JSON.parse(card.dataset.driver);
+        populateEditForm(d);
+        document.getElementById('editModal').classList.add('show');
+      }catch(err){
+        console.error('openEditModal', err);
+        showToast('Unable to open edit form — check console.', 'error');
+      }
+    }
+
+    function populateEditForm(d){
+      document.getElementById('edit_driver_id').value = d.id || '';
+      document.getElementById('edit_full_name').value = d.full_name || '';
+      document.getElementById('edit_iqama_number').value = d.iqama_number || '';
+      if(d.iqama_expiry_date) document.getElementById('edit_iqama_expiry').value = d.iqama_expiry_date;
+      document.getElementById('edit_nationality').value = d.nationality || '';
+      document.getElementById('edit_mobile_number').value = d.mobile_number || '';
+      document.getElementById('edit_previous_sponsor_number').value = d.previous_sponsor_number || '';
+      document.getElementById('edit_saudi_driving_license').value = d.saudi_driving_license ? 'true' : 'false';
+      document.getElementById('edit_platform').value = d.platform || '';
+      document.getElementById('edit_platform_id').value = d.platform_id || '';
+      document.getElementById('edit_issued_mobile_number').value = d.issued_mobile_number || '';
+      document.getElementById('edit_issued_device_id').value = d.issued_device_id || '';
+      document.getElementById('edit_mobile_issued').value = d.mobile_issued ? 'true' : 'false';
+      document.getElementById('edit_car_details').value = d.car_details || '';
+      if(d.assignment_date) document.getElementById('edit_assignment_date').value = d.assignment_date;
+      document.getElementById('edit_tamm_authorized').value = d.tamm_authorized ? 'true' : 'false';
+      document.getElementById('edit_transfer_fee_paid').value = d.transfer_fee_paid ? 'true' : 'false';
+      document.getElementById('edit_transfer_fee_amount').value = d.transfer_fee_amount || '';
+      if(d.transfer_fee_paid_at) document.getElementById('edit_transfer_fee_paid_at').value = d.transfer_fee_paid_at;
+      document.getElementById('edit_onboarding_stage').value = d.onboarding_stage || '';
+
+      // set form action dynamically: update endpoint
+      document.getElementById('editForm').action = `/dashboard/driver/${d.id}/update`;
+      document.getElementById('edit_version').value = d.version ?? '';
+    }
+
+    function openAddDriverModal(){ document.getElementById('addModal').classList.add('show'); }
+    function openAddUserModal(){ document.getElementById('addUserModal').classList.add('show'); }
+    function openChangePasswordModal(){ document.getElementById('changePasswordModal').classList.add('show'); }
+
+    function closeModal(id){
+      const el = document.getElementById(id);
+      if(el) el.classList.remove('show');
+    }
+
+    // close on click outside content
+    window.addEventListener('click', function(e){
+      if(e.target.classList && e.target.classList.contains('modal')){
+        e.target.classList.remove('show');
+      }
+    });
+
+    // close on escape
+    window.addEventListener('keydown', function(e){
+      if(e.key === 'Escape'){
+        document.querySelectorAll('.modal.show').forEach(m => m.classList.remove('show'));
+      }
+    });
+
+    /* ----------------- USERS: edit modal population and submit ----------------- */
+    function openUserEditModalFromRow(e, btn){
+      e.stopPropagation();
+      const row = btn.closest('.user-row');
+      const u = JSON.parse(row.dataset.user);
+      openUserEditModal(u);
+    }
+    function openUserEditModal(u){
+      document.getElementById('edit_user_id').value = u.id || '';
+      document.getElementById('edit_user_username').value = u.username || '';
+      document.getElementById('edit_user_name').value = u.name || '';
+      document.getElementById('edit_user_role').value = u.role || '';
+      // action endpoint
+      document.getElementById('editUserForm').action = `/dashboard/edit_user/${u.id}`;
+      document.getElementById('editUserModal').classList.add('show');
+    }
+
+    // Edit user AJAX
+    document.getElementById('editUserForm').addEventListener('submit', async function(ev){
+      ev.preventDefault();
+      const form = ev.target;
+      const fd = new FormData(form);
+      try {
+        const res = await fetch(form.action, { method:'POST', body: fd });
+        if(res.ok){
+          showToast('✅ User updated');
+          setTimeout(()=>location.reload(),800);
+        } else {
+          showToast('❌ Failed to update user', 'error');
+        }
+      } catch(e){
+        console.error(e);
+        showToast('⚠️ Network error while updating user', 'error');
+      }
+    });
+
+    // Add user uses regular POST (server redirects). You can convert to AJAX if you want.
+
+    /* ----------------- EDIT DRIVER submit (AJAX) ----------------- */
+    document.getElementById('editForm').addEventListener('submit', async function(ev){
+      ev.preventDefault();
+      const form = ev.target;
+      if(!form.action) { showToast('No endpoint for update!', 'error'); return; }
+      const fd = new FormData(form);
+      try{
+        const res = await fetch(form.action, { method:'POST', headers: { 'X-Requested-With': 'XMLHttpRequest' }, body: fd });
+        if(res.ok){
+          showToast('✅ Driver updated');
+          setTimeout(()=>location.reload(),900);
+        } else {
+          let txt = await res.text();
+          try { txt = JSON.parse(txt).message || txt; } catch(e) {}
+          showToast('❌ Failed to save driver: '+ (txt || res.status), 'error');
+        }
+      }catch(err){
+        console.error(err);
+        showToast('⚠️ Network error while updating driver', 'error');
+      }
+    });
+
+    /* ----------------- AJAX DELETE for drivers & users (progressive) ----------------- */
+    // Drivers delete forms
+    document.querySelectorAll("form[action*='delete_driver']").forEach(form => {
+      form.addEventListener("submit", async e => {
+        e.preventDefault();
+        if(!confirm("Are you sure you want to delete this driver?")) return;
+        try {
+          const res = await fetch(form.action, { method: "POST" });
+          if(res.ok){
+            const card = form.closest('.driver-card');
+            if(card) card.remove();
+            showToast('🗑 Driver deleted');
+          } else {
+            showToast('❌ Could not delete driver', 'error');
+          }
+        } catch(err){
+          console.error(err);
+          showToast('⚠️ Network error while deleting driver', 'error');
+        }
+      });
+    });
+
+    // Users delete forms
+    document.querySelectorAll("form[action*='delete_user']").forEach(form => {
+      form.addEventListener("submit", async e => {
+        e.preventDefault();
+        if(!confirm("Are you sure you want to delete this user?")) return;
+        try {
+          const res = await fetch(form.action, { method: "POST" });
+          if(res.ok){
+            const row = form.closest('.user-row');
+            if(row) row.remove();
+            showToast('🗑 User deleted');
+          } else {
+            showToast('❌ Could not delete user', 'error');
+          }
+        } catch(err){
+          console.error(err);
+          showToast('⚠️ Network error while deleting user', 'error');
+        }
+      });
+    });
+
+    /* ----------------- search / filter helpers ----------------- */
+    function globalSearchFilter(){
+      const q = (document.getElementById('globalSearch').value || '').toLowerCase().trim();
+      document.querySelectorAll('.driver-card').forEach(card => {
+        const json = card.dataset.driver || '{}';
+        try{
+          const d = JSON.parse(json);
+          const hay = `${d.full_name||''} ${d.iqama_number||''} ${d.platform||''}`.toLowerCase();
+          card.style.display = hay.includes(q) ? '' : 'none';
+        }catch(e){ card.style.display = ''; }
+      });
+    }
+
+    function filterUsers(){
+      const q = (document.getElementById('userSearch').value || '').toLowerCase().trim();
+      document.querySelectorAll('.user-row').forEach(row=>{
+        const u = JSON.parse(row.dataset.user || '{}');
+        const hay = `${u.name||''} ${u.username||''} ${u.email||''}`.toLowerCase();
+        row.style.display = hay.includes(q) ? '' : 'none';
+      });
+    }
+
+    /* ----------------- small utilities ----------------- */
+    function escapeHTML(s){
+      if(s === undefined || s === null) return '';
+      return String(s).replace(/&/g,'&amp;').replace(/</g,'&lt;').replace(/>/g,'&gt;')
+        .replace(/"/g,'&quot;').replace(/'/g,'&#39;');
+    }
+
+    // Open view by id (optional programmatic)
+    function openViewById(id){
+      const card = Array.from(document.querySelectorAll('.driver-card')).find(c => {
+        try{ return JSON.parse(c.dataset.driver).id == id; }catch(e){return false;}
+      });
+      if(card) openViewModal({stopPropagation:()=>{}}, card.querySelector('.view') || card);
+    }
+
+    /* ----------------- toast helper & flash messages ----------------- */
+    function showToast(message, type="success") {
+      const container = document.getElementById("toastContainer");
+      const toast = document.createElement("div");
+      toast.className = "toast " + (type === "error" ? "error" : (type === "info" ? "info": ""));
+      toast.innerText = message;
+      container.appendChild(toast);
+      setTimeout(() => toast.classList.add("show"), 50);
+      setTimeout(() => {
+        toast.classList.remove("show");
+        setTimeout(() => toast.remove(), 400);
+      }, 3500);
+    }
+
+    // show flashed messages from Flask (if any)
+    (function () {
+      // Flashed messages are embedded as JSON in #flashedMessages
+      let flashed = [];
+      try {
+        flashed = JSON.parse(document.getElementById('flashedMessages').textContent || '[]');
+      } catch (err) {
+        console.warn("Could not parse flashed messages:", err);
+        flashed = [];
+      }
+
+      if (Array.isArray(flashed) && flashed.length) {
+        flashed.forEach(function (item) {
+          const category = Array.isArray(item) ? item[0] : "info";
+          const message = Array.isArray(item) ? item[1] : String(item);
+          const type =
+            category === "success"
+              ? "success"
+              : category === "danger" || category === "error"
+              ? "error"
+              : "info";
+
+          if (typeof showToast === "function") {
+            showToast(message, type);
+          } else {
+            console.log("[FLASH]", type, message);
+          }
+        });
+      }
+    })();
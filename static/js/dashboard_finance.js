@@ -0,0 +1,158 @@
+function openModal(card, readOnly=false) {
+  const d = JSON.parse(card.dataset.driver);
+  document.getElementById("driverName").innerText = d.full_name || "Driver Details";
+
+  let html = "";
+  function row(label, value) {
+    return `<div><label>${label}</label><div class="value">${value || "—"}</div></div>`;
+  }
+
+  html += row("Full name", d.full_name);
+  html += row("Iqama No.", d.iqama_number);
+  html += row("Iqama Expiry", d.iqama_expiry_date);
+  html += row("Nationality", d.nationality);
+  html += row("Mobile", d.mobile_number);
+  html += row("Previous Sponsor", d.previous_sponsor_number);
+  html += row("Driving License", d.saudi_driving_license ? "✅ Yes" : "❌ No");
+  html += row("Platform", d.platform);
+  html += row("Platform ID", d.platform_id);
+  html += row("Issued Mobile", d.issued_mobile_number);
+  html += row("Issued Device ID", d.issued_device_id);
+  html += row("Car", d.car_details || "N/A");
+  html += row("Assignment Date", d.assignment_date);
+  html += row("TAMM Authorized", d.tamm_authorized ? "✅ Yes" : "❌ No");
+  html += row("Ops Manager Approved", d.ops_manager_approved_at);
+  html += row("HR Approved", d.hr_approved_at);
+  html += row("Ops Supervisor Approved", d.ops_supervisor_approved_at);
+  html += row("Fleet Manager Approved", d.fleet_manager_approved_at);
+  html += row("Finance Approved", d.finance_approved_at);
+  html += row("Transfer Fee Paid", d.transfer_fee_paid ? "✅ Yes" : "❌ No");
+  html += row("Transfer Fee Amount", d.transfer_fee_amount);
+  html += row("Transfer Fee Paid At", d.transfer_fee_paid_at);
+
+  if (d.iqama_card_upload || d.tamm_authorization_ss || d.transfer_fee_receipt) {
+    html += `<div class="image-row">`;
+    if (d.iqama_card_upload) {
+      html += `<div><label>Iqama Card</label><img src="/static/uploads/${d.iqama_card_upload}" class="receipt-thumb"></div>`;
+    }
+    if (d.tamm_authorization_ss) {
+      html += `<div><label>Tamm Authorization</label><img src="/static/uploads/${d.tamm_authorization_ss}" class="receipt-thumb"></div>`;
+    }
+    if (d.transfer_fee_receipt) {
+      html += `<div><label>Transfer Proof</label><a href="/static/uploads/${d.transfer_fee_receipt}" target="_blank"><img src="/static/uploads/${d.transfer_fee_receipt}" class="receipt-thumb"></a></div>`;
+    }
+    html += `</div>`;
+  }
+
+  document.getElementById("driverDetails").innerHTML = html;
+  document.getElementById("financeForm").action = `/dashboard/finance/approve_driver/${d.id}`;
+  document.getElementById("financeVersion").value = d.version ?? "";
+  document.getElementById("financeForm").style.display = readOnly ? "none" : "block";
+  document.getElementById("driverModal").classList.add("show");
+}
+
+function closeModal() { document.getElementById("driverModal").classList.remove("show"); }
+function openPasswordModal() { document.getElementById("passwordModal").classList.add("show"); }
+function closePasswordModal() { document.getElementById("passwordModal").classList.remove("show"); }
+
+function filterDrivers(section) {
+  let input = section === 'pending' ? document.getElementById("pendingSearch").value.toLowerCase() : document.getElementById("completedSearch").value.toLowerCase();
+  let container = section === 'pending' ? document.getElementById("pendingDrivers") : document.getElementById("completedDrivers");
+  if (!container) return;
+  let cards = Array.from(container.querySelectorAll(".driver-card"));
+  cards.forEach(card => {
+    const name = (card.querySelector(".driver-name")?.innerText || "").toLowerCase();
+    const iqama = (card.querySelector(".driver-iqama")?.innerText || "").toLowerCase();
+    card.classList.toggle("hidden", !(name.includes(input) || iqama.includes(input)));
+  });
+}
+
+window.addEventListener("click", function(e) {
+  if (e.target.classList.contains("modal")) closeModal();
+  if (e.target.id === "passwordModal") closePasswordModal();
+});
+
+window.addEventListener("keydown", function(e) {
+  if (e.key === "Escape") {
+    closeModal();
+    closePasswordModal();
+  }
+});
+
+const financeForm = document.getElementById("financeOffboardingForm");
+const submitBtn = document.getElementById("financeOffboardingSubmit");
+
+financeForm.addEventListener("input", () => {
+  // Enable button if adjustments input is filled
+  const adjustments = financeForm.querySelector('input[name="finance_adjustments"]').value;
+  submitBtn.disabled = !adjustments; // or add other conditions if needed
+});
+function openFinanceOffboardingModal(card) {
+  const id = card.dataset.id;
+  const name = card.dataset.name;
+  const report = card.dataset.fleetReport;
+  const cost = card.dataset.fleetCost;
+
+  // Set modal title
+  document.getElementById("financeOffboardingTitle").innerText =
+    "Finance Offboarding for: " + name;
+
+  // Fill fleet read-only fields
+  document.getElementById("fleet_damage_report").value = report || "N/A";
+  document.getElementById("fleet_damage_cost").value = cost || 0;
+
+  // Set form action and store id in data attribute
+  const form = document.getElementById("financeOffboardingForm");
+  form.action = `/dashboard/finance/offboarding/clear/${id}`;
+  form.dataset.id = id;
+  document.getElementById("financeOffboardingVersion").value = card.dataset.version || "";
+
+  // Show modal
+  document.getElementById("financeOffboardingModal").classList.add("show");
+}
+
+function closeFinanceOffboardingModal() {
+  document.getElementById("financeOffboardingModal").classList.remove("show");
+}
+
+// Close modal on outside click
+window.addEventListener("click", function(e) {
+  if (e.target.classList.contains("modal")) {
+    closeFinanceOffboardingModal();
+  }
+});
+
+// Close modal on Escape
+window.addEventListener("keydown", function(e) {
+  if (e.key === "Escape") {
+    closeFinanceOffboardingModal();
+  }
+});
+
+// Handle form submit
+document.getElementById("financeOffboardingForm").addEventListener("submit", async function(e) {
+  e.preventDefault();
+
+  const url = this.action; // <- use action directly
+  const formData = new FormData(this);
+
+  try {
+    const res = await fetch(url, {
+      method: "POST",
+      headers: { "X-Requested-With": "XMLHttpRequest" },
+      body: formData
+    });
+
+    const data = await res.json?.() || {};
+    if (res.ok) {
+      alert(`✅ Offboarding cleared!`);
+      closeFinanceOffboardingModal();
+      LiveUpdates.removeCard("offboarding", this.dataset.id);
+    } else {
+      alert("❌ " + (data.message || "Error processing offboarding"));
+    }
+  } catch (err) {
+    console.error(err);
+    alert("❌ Network or server error");
+  }
+});
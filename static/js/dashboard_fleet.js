@@ -0,0 +1,113 @@
+// ================= MAIN TAB SWITCH =================
+function showMainTab(tab) {
+  document.getElementById("onboardingTab").style.display = tab === "onboarding" ? "block" : "none";
+  document.getElementById("offboardingTab").style.display = tab === "offboarding" ? "block" : "none";
+  document.querySelectorAll(".tab-container > .tab-button").forEach(btn => btn.classList.remove("active"));
+  event.target.classList.add("active");
+}
+
+// ================= OFFBOARDING SUBTAB SWITCH =================
+function showOffboardingTab(tab) {
+  document.getElementById("fleetOffboardingTab").style.display = tab === "fleet" ? "block" : "none";
+  document.getElementById("tammOffboardingTab").style.display = tab === "tamm" ? "block" : "none";
+  const buttons = document.querySelectorAll("#offboardingTab .tab-button");
+  buttons.forEach(b => b.classList.remove("active"));
+  event.target.classList.add("active");
+}
+
+// ================= ONBOARDING MODAL =================
+function openOnboardingModal(card) {
+  const d = JSON.parse(card.dataset.driver);
+  document.getElementById("driverName").innerText = "Assign Vehicle for: " + d.full_name;
+
+  let html = `
+    <div class="approval-info"><strong>Ops Manager Approved:</strong> ${d.ops_manager_approved_at || "❌ Not Approved"}</div>
+    <div class="approval-info"><strong>HR Approved:</strong> ${d.hr_approved_at || "❌ Not Approved"}</div>
+    <div class="approval-info"><strong>Ops Supervisor Approved:</strong> ${d.ops_supervisor_approved_at || "❌ Not Approved"}</div>
+    <p><strong>Iqama:</strong> ${d.iqama_number}</p>
+    <p><strong>City:</strong> ${d.city || "N/A"}</p>
+    <p><strong>Issued Mobile:</strong> ${d.issued_mobile_number || "N/A"}</p>
+    <p><strong>Platform:</strong> ${d.platform || "N/A"} (${d.platform_id || "N/A"})</p>`;
+  if (d.iqama_card_upload) {
+    html += `<p><img src="/static/uploads/${d.iqama_card_upload}" width="300"></p>`;
+  }
+  document.getElementById("driverDetails").innerHTML = html;
+
+  document.getElementById("fleetOnboardingForm").action = `/dashboard/fleet/assign_vehicle/${d.id}`;
+  document.getElementById("fleetOnboardingVersion").value = d.version ?? "";
+  document.getElementById("driverModal").classList.add("show");
+}
+function closeOnboardingModal() { document.getElementById("driverModal").classList.remove("show"); }
+
+// ================= FLEET MODAL =================
+let currentFleetId = null;
+function openFleetModal(card) {
+  currentFleetId = card.dataset.offboardingId;
+  document.getElementById("fleetOffboardingId").value = currentFleetId;
+  document.getElementById("fleetVersion").value = card.dataset.version || "";
+  document.getElementById("fleetModal").classList.add("show");
+}
+function closeFleetModal() { document.getElementById("fleetModal").classList.remove("show"); currentFleetId=null; }
+
+document.getElementById("fleetForm").addEventListener("submit", async function(e){
+  e.preventDefault();
+  if(!confirm("Confirm fleet clearance?")) return;
+  const payload = {
+    car_returned: document.getElementById("carReturned").checked,
+    fleet_damage_report: document.getElementById("fleetDamageReport").value,
+    fleet_damage_cost: document.getElementById("fleetDamageCost").value,
+    version: document.getElementById("fleetVersion").value
+  };
+  try{
+    const res = await fetch(`/dashboard/fleet/api/clear_offboarding/${currentFleetId}`,{
+      method:"POST",
+      headers: {"Content-Type":"application/json"},
+      body: JSON.stringify(payload)
+    });
+    const data = await res.json();
+    if(data.success){ alert("Fleet clearance submitted ✅"); LiveUpdates.removeCard("offboarding", currentFleetId); closeFleetModal(); }
+    else alert(data.message || "Failed");
+  }catch(err){ console.error(err); alert("Server error"); }
+});
+
+// ================= TAMM MODAL =================
+let currentTammId = null;
+function openTammModal(card){
+  currentTammId = card.dataset.offboardingId;
+  document.getElementById("tammOffboardingId").value = currentTammId;
+  document.getElementById("tammVersion").value = card.dataset.version || "";
+  document.getElementById("tammModal").classList.add("show");
+}
+function closeTammModal(){ document.getElementById("tammModal").classList.remove("show"); currentTammId=null; }
+
+document.getElementById("tammForm").addEventListener("submit", async function(e){
+  e.preventDefault();
+  if(!confirm("Confirm TAMM revocation & full offboarding?")) return;
+  const payload = {
+    tamm_revoked: document.getElementById("tammRevoked").checked,
+    version: document.getElementById("tammVersion").value
+  };
+  try{
+    const res = await fetch(`/dashboard/fleet/api/revoke_tamm/${currentTammId}`,{
+      method:"POST",
+      headers: {"Content-Type":"application/json"},
+      body: JSON.stringify(payload)
+    });
+    const data = await res.json();
+    if(data.success){ alert("Driver fully offboarded ✅"); LiveUpdates.removeCard("offboarding", currentTammId); closeTammModal(); }
+    else alert(data.message || "Failed");
+  }catch(err){ console.error(err); alert("Server error"); }
+});
+
+// ================= PASSWORD MODAL =================
+function openPasswordModal() { document.getElementById("passwordModal").classList.add("show"); }
+function closePasswordModal() { document.getElementById("passwordModal").classList.remove("show"); }
+
+window.onclick = function(event){
+  if(event.target.classList.contains("modal")){
+    closeOnboardingModal();
+    closeFleetModal();
+    closeTammModal();
+    closePasswordModal();
+  }
+}
@@ -0,0 +1,404 @@
+function sendToFleet() {
+    const form = document.getElementById('offboardingForm');
+    const offboardingId = document.getElementById('offboardingId').value;
+    const version = document.getElementById('offboardingVersion').value;
+    const company = document.getElementById('companyContractCancelled').checked ? 'yes' : 'no';
+    const qiwa = document.getElementById('qiwaContractCancelled').checked ? 'yes' : 'no';
+    const salary = document.getElementById('salaryPaid').checked ? 'yes' : 'no';
+    const hrNote = document.getElementById('hrNote').value;
+
+    fetch(document.getElementById('hrClearBtn').dataset.url, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({
+            offboarding_id: offboardingId,
+            company_contract_cancelled: company,
+            qiwa_contract_cancelled: qiwa,
+            salary_paid: salary,
+            hr_note: hrNote,
+            version: version
+        })
+    })
+    .then(res => res.json())
+    .then(data => {
+        alert(data.message);
+        if(data.success) {
+            LiveUpdates.removeCard("offboarding", offboardingId);
+            bootstrap.Modal.getInstance(document.getElementById('offboardingModal'))?.hide();
+        }
+    })
+    .catch(err => console.error(err));
+}
+
+// Re-read on use: live_updates.js refreshes the block when offboardings arrive
+function offboardingData() {
+    return JSON.parse(document.getElementById('offboardingData').textContent || '[]');
+}
+
+function validateHrForm() {
+    const companyCancelled = document.getElementById("companyContractCancelled").checked;
+    const qiwaCancelled = document.getElementById("qiwaContractCancelled").checked;
+    const salaryPaid = document.getElementById("salaryPaid").checked;
+
+    const allYes = companyCancelled && qiwaCancelled && salaryPaid;
+
+    document.getElementById("hrSaveBtn").disabled = !allYes;
+    document.getElementById("hrClearBtn").disabled = !allYes;
+
+    return allYes;
+}
+
+// Attach event listeners
+["companyContractCancelled", "qiwaContractCancelled", "salaryPaid"].forEach(id => {
+  document.getElementById(id).addEventListener("change", validateHrForm);
+});
+
+// Prevent form submit if not valid
+document.getElementById("offboardingForm").addEventListener("submit", function(e) {
+  if (!validateHrForm()) {
+    e.preventDefault();
+    alert("You cannot proceed until Company Contract, Qiwa Contract, and Salary Paid are all YES.");
+  }
+});
+
+function openOffboardingModal(cardEl) {
+    const driverId = Number(cardEl.dataset.driverId);
+    const offboarding = offboardingData().find(o => o.driver_id === driverId);
+    if (!offboarding) {
+        showToast('Offboarding data not found', 'error');
+        return;
+    }
+
+    // Populate modal fields
+    document.getElementById('driverName').innerText = offboarding.full_name;
+    document.getElementById('offboardingId').value = offboarding.offboarding_id;
+    document.getElementById('offboardingVersion').value = offboarding.version ?? "";
+    document.getElementById('companyContractCancelled').value = offboarding.company_contract_cancelled ? "yes" : "no";
+    document.getElementById('qiwaContractCancelled').value = offboarding.qiwa_contract_cancelled ? "yes" : "no";
+    document.getElementById('pendingSalary').value = offboarding.pending_salary || 0;
+    document.getElementById('hrNote').value = offboarding.hr_note || "";
+    document.getElementById('financeNote').value = offboarding.finance_note || "";
+    document.getElementById('fleetReport').value = offboarding.fleet_damage_report || "";
+    document.getElementById('fleetCost').value = offboarding.fleet_damage_cost || 0;
+    document.getElementById('salaryPaid').value = offboarding.salary_paid ? "yes" : "no";
+
+    const hrClearBtn = document.getElementById('hrClearBtn');
+
+    // Enable button only if all conditions met
+    const canClear = offboarding.company_contract_cancelled && offboarding.qiwa_contract_cancelled && offboarding.salary_paid;
+    hrClearBtn.disabled = !canClear;
+
+    // Show modal using Bootstrap API
+    const modal = new bootstrap.Modal(document.getElementById('offboardingModal'));
+    modal.show();
+}
+
+// Simple helpers
+    function switchTab(tabId) {
+      ['hrTab','finalTab','completedTab','offboardTab','offboardCompletedTab']
+        .forEach(id => document.getElementById(id).style.display = (id === tabId) ? 'block' : 'none');
+
+      document.querySelectorAll('.tab-btn').forEach(btn => btn.classList.remove('active'));
+      if(tabId === 'hrTab') document.getElementById('tabHr').classList.add('active');
+      if(tabId === 'finalTab') document.getElementById('tabFinal').classList.add('active');
+      if(tabId === 'completedTab') document.getElementById('tabCompleted').classList.add('active');
+      if(tabId === 'offboardTab') document.getElementById('tabOffboard').classList.add('active');
+      if(tabId === 'offboardCompletedTab') document.getElementById('tabOffboardCompleted').classList.add('active');
+    }
+    function openModal(id){ document.getElementById(id).classList.add('show'); }
+    function closeModal(id){ document.getElementById(id).classList.remove('show'); }
+
+    // Safely get driver object (accepts a button or card)
+    function readDriverFromElement(el){
+      let card = el;
+      if(!card) return null;
+      if(!card.dataset || !card.dataset.driver) {
+        card = el.closest && el.closest('.driver-card');
+      }
+      if(!card || !card.dataset || !card.dataset.driver) return null;
+      try { return JSON.parse(card.dataset.driver); } catch(e){ console.error('parse driver json', e); return null; }
+    }
+
+    /* -------------- HR modal (approve/send to Ops Supervisor) -------------- */
+    const hrForm = document.getElementById('hrForm');
+    const hrSubmit = document.getElementById('hrSubmit');
+    const companyInput = document.getElementById('company_contract_created');
+    const qiwaInput = document.getElementById('qiwa_contract_created');
+    const qiwaStatus = document.getElementById('qiwa_contract_status');
+
+    function validateHrForm() {
+      const ok = companyInput.checked && qiwaInput.checked && qiwaStatus.value === 'Approved';
+      hrSubmit.disabled = !ok;
+    }
+    companyInput && companyInput.addEventListener('change', validateHrForm);
+    qiwaInput && qiwaInput.addEventListener('change', validateHrForm);
+    qiwaStatus && qiwaStatus.addEventListener('change', validateHrForm);
+
+function openDriverModal(btn){
+    const d = readDriverFromElement(btn);
+    if(!d){ showToast('Driver data missing', 'error'); return; }
+
+    let html = '<div style="display:flex;gap:16px;flex-direction:column;">';
+
+    // Driver basic info
+    html += '<div style="display:flex;gap:16px;flex-wrap:wrap;">';
+    html += `<div style="flex:1">
+                <h3>${escapeHtml(d.full_name || '')}</h3>
+                <p><strong>Iqama:</strong> ${escapeHtml(d.iqama_number || '')}</p>
+                <p><strong>Iqama expiry:</strong> ${escapeHtml(d.iqama_expiry_date || '')}</p>
+                <p><strong>Nationality:</strong> ${escapeHtml(d.nationality || '')}</p>
+                <p><strong>Mobile:</strong> ${escapeHtml(d.mobile_number || '')}</p>
+                <p><strong>Previous Transfers:</strong> ${escapeHtml(d.previous_sponsor_number || '')}</p>
+                <p><strong>City:</strong> ${escapeHtml(d.city || '')}</p>
+                <p><strong>Platform:</strong> ${escapeHtml(d.platform || '')}</p>
+                <p><strong>Platform ID:</strong> ${escapeHtml(d.platform_id || '')}</p>
+                <p><strong>Car Details:</strong> ${escapeHtml(d.car_details || '')}</p>
+                <p><strong>TAMM authorized:</strong> ${d.tamm_authorized ? '✅ Yes' : '❌ No'}</p>
+              </div>`;
+    html += '</div>';
+
+    // Images
+    if(d.iqama_card_upload || d.tamm_authorization_ss || d.transfer_fee_receipt){
+      html += '<div class="image-row">';
+      if(d.iqama_card_upload){
+        html += `<div><label class="small">Iqama card</label><br><img src="/static/uploads/${encodeURIComponent(d.iqama_card_upload)}" alt="iqama"></div>`;
+      }
+      if(d.tamm_authorization_ss){
+        html += `<div><label class="small">TAMM Screenshot</label><br><img src="/static/uploads/${encodeURIComponent(d.tamm_authorization_ss)}" alt="tamm"></div>`;
+      }
+      if(d.transfer_fee_receipt){
+        html += `<div><label class="small">Transfer proof</label><br><a href="/static/uploads/${encodeURIComponent(d.transfer_fee_receipt)}" target="_blank"><img src="/static/uploads/${encodeURIComponent(d.transfer_fee_receipt)}" alt="receipt"></a></div>`;
+      }
+      html += '</div>';
+    }
+
+    // Approvals & transfers
+    html += '<hr><div class="grid-2">';
+    html += `<div>
+                <p><strong>Ops Manager Approved:</strong> ${escapeHtml(d.ops_manager_approved_at || 'Pending')}</p>
+                <p><strong>HR Approved:</strong> ${escapeHtml(d.hr_approved_at || 'Pending')}</p>
+                <p><strong>Ops Supervisor Approved:</strong> ${escapeHtml(d.ops_supervisor_approved_at || 'Pending')}</p>
+             </div>`;
+    html += `<div>
+                <p><strong>Fleet Manager Approved:</strong> ${escapeHtml(d.fleet_manager_approved_at || 'Pending')}</p>
+                <p><strong>Finance Approved:</strong> ${escapeHtml(d.finance_approved_at || 'Pending')}</p>
+             </div></div>`;
+
+    html += '<hr>';
+    html += `<p><strong>Transfer Fee Paid:</strong> ${d.transfer_fee_paid ? '✅ Yes' : '❌ No'}</p>`;
+    html += `<p><strong>Transfer Fee Amount:</strong> ${escapeHtml(d.transfer_fee_amount || '')}</p>`;
+    html += `<p><strong>Transfer Fee Paid At:</strong> ${escapeHtml(d.transfer_fee_paid_at || '')}</p>`;
+
+    // Inject into modal and open
+    document.getElementById('hrDetails').innerHTML = html;
+
+    // Prefill HR form (existing logic)
+    companyInput.checked = !!d.company_contract_created;
+    qiwaInput.checked = !!d.qiwa_contract_created;
+    qiwaStatus.value = d.qiwa_contract_status || 'Pending';
+
+    hrForm.action = `/dashboard/hr/approve_driver/${d.id}`;
+    document.getElementById('hrVersion').value = d.version ?? '';
+    validateHrForm();
+    openModal('hrModal');
+}
+
+    // Handle HR form submit (regular post, server will redirect)
+    // no special client AJAX here; let server handle.
+
+    /* -------------- Transfer modal (HR final stage) -------------- */
+    const transferForm = document.getElementById('transferForm');
+    const transferStatus = document.getElementById('transfer_status');
+    const transferProof = document.getElementById('transfer_proof');
+    const transferSubmit = document.getElementById('transferSubmit');
+
+    function validateTransfer() {
+      // require status 'Transferred' AND a file selected to enable submit (per request)
+      const ok = (transferStatus.value === 'Transferred') && (transferProof.files && transferProof.files.length > 0);
+      transferSubmit.disabled = !ok;
+    }
+    transferStatus && transferStatus.addEventListener('change', validateTransfer);
+    transferProof && transferProof.addEventListener('change', validateTransfer);
+
+    function openTransferModal(btn){
+      const d = readDriverFromElement(btn);
+      if(!d){ showToast('Driver data missing', 'error'); return; }
+      let html = `<p><strong>Name:</strong> ${escapeHtml(d.full_name)}</p>
+                  <p><strong>Iqama:</strong> ${escapeHtml(d.iqama_number || 'N/A')}</p>
+                  <p class="muted"><strong>Current transfer status:</strong> ${escapeHtml(d.sponsorship_transfer_status || 'Pending')}</p>
+                  <p class="muted"><strong>Transfer fee paid:</strong> ${d.transfer_fee_paid ? 'Yes' : 'No'}</p>
+                  <p class="muted"><strong>Transfer fee amount:</strong> ${escapeHtml(d.transfer_fee_amount || 'N/A')}</p>`;
+      document.getElementById('transferDetails').innerHTML = html;
+      transferStatus.value = d.sponsorship_transfer_status || 'Pending';
+      transferProof.value = '';
+      transferForm.action = `/dashboard/hr/complete_transfer/${d.id}`;
+      document.getElementById('transferVersion').value = d.version ?? '';
+      validateTransfer();
+      openModal('transferModal');
+    }
+
+    /* -------------- Completed driver modal -------------- */
+
+  function openCompletedModal(cardEl){
+  const d = readDriverFromElement(cardEl);
+  if(!d){ showToast('Driver data missing', 'error'); return; }
+
+  let html = '<div style="display:flex;gap:16px;flex-direction:column;">';
+  html += '<div style="display:flex;gap:16px;flex-wrap:wrap;">';
+  html += `<div style="flex:1"><h3>${escapeHtml(d.full_name || '')}</h3>`;
+  html += `<p><strong>Iqama:</strong> ${escapeHtml(d.iqama_number || '')}</p>`;
+  html += `<p><strong>Iqama expiry:</strong> ${escapeHtml(d.iqama_expiry_date || '')}</p>`;
+  html += `<p><strong>Nationality:</strong> ${escapeHtml(d.nationality || '')}</p>`;
+  html += `<p><strong>Mobile:</strong> ${escapeHtml(d.mobile_number || '')}</p>`;
+  html += `<p><strong>Prev sponsor:</strong> ${escapeHtml(d.previous_sponsor_number || '')}</p>`;
+  html += `<p><strong>Platform:</strong> ${escapeHtml(d.platform || '')}</p>`;
+  html += `<p><strong>Platform ID:</strong> ${escapeHtml(d.platform_id || '')}</p>`;
+  html += `<p><strong>Issued Mobile:</strong> ${escapeHtml(d.issued_mobile_number || '')}</p>`;
+  html += `<p><strong>Issued Device ID:</strong> ${escapeHtml(d.issued_device_id || '')}</p>`;
+  html += `<p><strong>Mobile issued:</strong> ${d.mobile_issued ? '✅ Yes' : '❌ No'}</p>`;
+  html += `<p><strong>Car Details:</strong> ${escapeHtml(d.car_details || '')}</p>`;
+  html += `<p><strong>Assignment date:</strong> ${escapeHtml(d.assignment_date || '')}</p>`;
+  html += `<p><strong>TAMM authorized:</strong> ${d.tamm_authorized ? '✅ Yes' : '❌ No'}</p>`;
+  html += `</div></div>`;
+
+  // images
+  if(d.iqama_card_upload || d.tamm_authorization_ss || d.transfer_fee_receipt){
+    html += '<div class="image-row">';
+    if(d.iqama_card_upload){
+      html += `<div><label class="small">Iqama card</label><br><img src="/static/uploads/${encodeURIComponent(d.iqama_card_upload)}" alt="iqama"></div>`;
+    }
+    if(d.tamm_authorization_ss){
+      html += `<div><label class="small">TAMM screenshot</label><br><img src="/static/uploads/${encodeURIComponent(d.tamm_authorization_ss)}" alt="tamm"></div>`;
+    }
+    if(d.transfer_fee_receipt){
+      html += `<div><label class="small">Transfer proof</label><br><a href="/static/uploads/${encodeURIComponent(d.transfer_fee_receipt)}" target="_blank"><img src="/static/uploads/${encodeURIComponent(d.transfer_fee_receipt)}" alt="receipt"></a></div>`;
+    }
+    if (d.sponsorship_transfer_proof) {
+      html += `<div><label class="small">Sponsorship Transfer Proof</label><br><a href="/static/uploads/${encodeURIComponent(d.sponsorship_transfer_proof)}" target="_blank"><img src="/static/uploads/${encodeURIComponent(d.sponsorship_transfer_proof)}" alt="transfer-proof"></a></div>`;
+    }
+    html += '</div>';
+  }
+
+  // approvals & transfer fee
+  html += '<hr>';
+  html += '<div class="grid-2">';
+  html += `<div><p><strong>Ops manager approved:</strong> ${escapeHtml(d.ops_manager_approved_at || 'Pending')}</p>
+                <p><strong>HR approved:</strong> ${escapeHtml(d.hr_approved_at || 'Pending')}</p>
+                <p><strong>Ops supervisor approved:</strong> ${escapeHtml(d.ops_supervisor_approved_at || 'Pending')}</p></div>`;
+  html += `<div><p><strong>Fleet manager approved:</strong> ${escapeHtml(d.fleet_manager_approved_at || 'Pending')}</p>
+                <p><strong>Finance approved:</strong> ${escapeHtml(d.finance_approved_at || 'Pending')}</p></div>`;
+  html += '</div>';
+
+  html += '<hr>';
+  html += `<p><strong>Transfer fee paid:</strong> ${d.transfer_fee_paid ? '✅ Yes' : '❌ No'}</p>`;
+  html += `<p><strong>Amount:</strong> ${escapeHtml(d.transfer_fee_amount || '')}</p>`;
+  html += `<p><strong>Paid at:</strong> ${escapeHtml(d.transfer_fee_paid_at || '')}</p>`;
+
+  html += '</div>';
+
+  // Put content into correct modal container
+  document.getElementById('completedDetails').innerHTML = html;
+  openModal('completedModal');  // <-- NOW THE MODAL WILL SHOW
+}
+
+
+
+
+  /* -------------- Completed search -------------- */
+    function filterCompleted(){
+      const q = (document.getElementById('completedSearch').value || '').toLowerCase().trim();
+      document.querySelectorAll('.completed-card').forEach(card => {
+        const text = card.innerText.toLowerCase();
+        card.style.display = text.includes(q) ? '' : 'none';
+      });
+    }
+
+    /* -------------- small utilities -------------- */
+    function escapeHtml(s){
+      if(s === null || s === undefined) return '';
+      return String(s).replace(/&/g,'&amp;').replace(/</g,'&lt;').replace(/>/g,'&gt;')
+                       .replace(/"/g,'&quot;').replace(/'/g,'&#39;');
+    }
+
+    // Generic click outside & escape handling to close modals
+    window.addEventListener('click', function(e){
+      if(e.target.classList && e.target.classList.contains('modal')) {
+        e.target.classList.remove('show');
+      }
+    });
+    window.addEventListener('keydown', function(e){
+      if(e.key === 'Escape') {
+        document.querySelectorAll('.modal.show').forEach(m => m.classList.remove('show'));
+      }
+    });
+
+    /* -------------- Toast + flash messages -------------- */
+    function showToast(msg, type='success'){
+      const container = document.getElementById('toastContainer');
+      const t = document.createElement('div');
+      t.className = 'toast ' + (type === 'error' ? 'error' : 'success');
+      t.innerText = msg;
+      container.appendChild(t);
+      setTimeout(()=> t.classList.add('show'), 20);
+      setTimeout(()=> { t.classList.remove('show'); setTimeout(()=> t.remove(), 400); }, 3500);
+    }
+    // Show flashed messages from server (injected as JSON in a hidden div)
+
+(function showFlashed() {
+      let flashed = [];
+      const el = document.getElementById('flashedData');
+      if (!el) return;
+
+      try {
+        flashed = JSON.parse(el.textContent || '[]');
+      } catch (err) {
+        console.warn('Could not parse flashed messages JSON:', err);
+        flashed = [];
+      }
+
+      if (!Array.isArray(flashed) || flashed.length === 0) return;
+
+      flashed.forEach(item => {
+        const category = Array.isArray(item) ? item[0] : 'info';
+        const message = Array.isArray(item) ? item[1] : String(item);
+        const type = (category === 'success') ? 'success'
+                    : (category === 'danger' || category === 'error') ? 'error'
+                    : 'info';
+        showToast(message, type);
+      });
+    })();
+
+  function openOffboardCompletedModal(cardEl) {
+  const d = JSON.parse(cardEl.dataset.driver || '{}');
+  if(!d){ showToast('Driver data missing', 'error'); return; }
+
+  let html = `<p><strong>Name:</strong> ${escapeHtml(d.full_name)}</p>
+              <p><strong>Iqama:</strong> ${escapeHtml(d.iqama_number)}</p>
+              <p><strong>Pending Salary:</strong> ${escapeHtml(d.pending_salary || 0)}</p>
+              <p><strong>HR Note:</strong> ${escapeHtml(d.hr_note || '')}</p>
+              <p><strong>Finance Info:</strong> ${escapeHtml(d.finance_note || '')}</p>
+              <p><strong>Fleet Report:</strong> ${escapeHtml(d.fleet_report || '')}</p>
+              <p><strong>Fleet Cost:</strong> ${escapeHtml(d.fleet_cost || 0)}</p>
+              <p><strong>Company Contract Cancelled:</strong> ${d.company_contract_cancelled ? '✅ Yes' : '❌ No'}</p>
+              <p><strong>Qiwa Contract Cancelled:</strong> ${d.qiwa_contract_cancelled ? '✅ Yes' : '❌ No'}</p>
+              <p><strong>Salary Paid:</strong> ${d.salary_paid ? '✅ Yes' : '❌ No'}</p>`;
+
+  if(d.tamm_authorization_ss){
+    html += `<div class="image-row"><div>
+               <label class="small">TAMM Screenshot</label><br>
+               <img src="/static/uploads/${encodeURIComponent(d.tamm_authorization_ss)}" alt="tamm">
+             </div></div>`;
+  }
+
+  document.getElementById('offboardCompletedDetails').innerHTML = html;
+  openModal('offboardCompletedModal');
+}
+
+// Filter search
+function filterOffboardCompleted() {
+  const q = (document.getElementById('offboardCompletedSearch').value || '').toLowerCase().trim();
+  document.querySelectorAll('#offboardCompletedList .completed-card').forEach(card => {
+    const text = card.innerText.toLowerCase();
+    card.style.display = text.includes(q) ? '' : 'none';
+  });
+}
@@ -0,0 +1,149 @@
+// Utility: safe JSON parse (handles undefined)
+function safeParse(s) {
+  try { return JSON.parse(s); } catch(e) { return {}; }
+}
+
+function openDriverModal(card) {
+  const d = safeParse(card.dataset.driver);
+  document.getElementById("modalTitle").innerText = d.full_name || "Driver details";
+  document.getElementById("d_full_name").innerText = d.full_name || "—";
+  document.getElementById("d_iqama").innerText = d.iqama_number || "—";
+  document.getElementById("d_iqama_expiry").innerText = d.iqama_expiry_date || "—";
+  document.getElementById("d_nationality").innerText = d.nationality || "—";
+  document.getElementById("d_mobile").innerText = d.mobile_number || "—";
+  document.getElementById("d_prev_sponsor").innerText = d.previous_sponsor_number || "—";
+  document.getElementById("d_license").innerText = d.saudi_driving_license ? "✅ Yes" : "❌ No";
+  document.getElementById("d_city").innerText = d.city || "—";
+  document.getElementById("d_platform").innerText = d.platform || "—";
+  document.getElementById("d_car").innerText = d.car_details || "—";
+  document.getElementById("d_assignment").innerText = d.assignment_date || "—";
+  document.getElementById("d_ops_at").innerText = d.ops_manager_approved_at || "—";
+  document.getElementById("d_stage").innerText = d.onboarding_stage || "—";
+
+  // set optional note
+  document.getElementById("d_ops_note").value = "";
+  // version the card was rendered at; the server rejects the approval if it moved on
+  document.getElementById("d_version").value = d.version ?? "";
+
+  // iqama image
+  const imgHolder = document.getElementById("d_iqama_img");
+  imgHolder.innerHTML = "";
+  if (d.iqama_card_upload) {
+    const img = document.createElement("img");
+    img.src = `/static/uploads/${d.iqama_card_upload}`;
+    img.className = "upload-thumb";
+    img.alt = "Iqama";
+    imgHolder.appendChild(img);
+  }
+
+  // set approve form action
+  const form = document.getElementById("approveForm");
+  // blueprint prefix is assumed to be /dashboard/ops (adjust if you registered differently)
+  form.action = `/dashboard/ops/approve_driver/${d.id}`;
+
+  // show modal
+  document.getElementById("driverModal").classList.add("show");
+}
+
+function closeDriverModal() {
+  document.getElementById("driverModal").classList.remove("show");
+}
+
+function openModalById(id) {
+  const el = document.getElementById(id);
+  if (!el) return;
+  if (el.classList.contains("show")) el.classList.remove("show");
+  else el.classList.add("show");
+}
+
+function confirmApprove() {
+  // basic confirm; the server also validates stage and prevents double approval
+  return confirm("Approve this driver and forward to HR? This action will set Ops Manager approval timestamp.");
+}
+
+// close modals by clicking on backdrop
+window.addEventListener("click", function(e) {
+  if (e.target.classList.contains("modal")) {
+    e.target.classList.remove("show");
+  }
+});
+
+// close with Escape
+window.addEventListener("keydown", function(e) {
+  if (e.key === "Escape") {
+    document.getElementById("driverModal").classList.remove("show");
+    document.getElementById("passwordModal").classList.remove("show");
+  }
+});
+
+function filterOffboardingDrivers() {
+  const query = (document.getElementById("offboardingSearch").value || "").toLowerCase();
+  document.querySelectorAll(".offboarding-card").forEach(card => {
+    const haystack = card.dataset.search;
+    card.style.display = haystack.includes(query) ? "" : "none";
+  });
+}
+
+async function requestOffboarding(driverId, btn) {
+  if (!confirm("Request offboarding for this driver?")) return;
+
+  btn.disabled = true;
+  btn.innerText = "Requesting...";
+
+  try {
+    const res = await fetch(`/dashboard/ops/api/request_offboarding/${driverId}`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json", "X-Requested-With": "XMLHttpRequest" },
+      body: JSON.stringify({ version: btn.dataset.driverVersion })
+    });
+
+    const data = await res.json();
+
+    if (data.success) {
+      // replace button with status text
+      const parent = btn.closest(".driver-card");
+      btn.remove();
+      const p = document.createElement("p");
+      p.className = "muted";
+      p.innerHTML = `<strong>Offboarding:</strong> Requested (${data.requested_at})`;
+      parent.appendChild(p);
+
+      const newBtn = document.createElement("button");
+      newBtn.className = "btn secondary";
+      newBtn.disabled = true;
+      newBtn.innerText = "Already Requested";
+      parent.appendChild(newBtn);
+    } else {
+      alert(data.message || "Failed to request offboarding.");
+      btn.disabled = false;
+      btn.innerText = "Request Offboarding";
+    }
+  } catch (err) {
+    console.error(err);
+    alert("Server error. Please try again.");
+    btn.disabled = false;
+    btn.innerText = "Request Offboarding";
+  }
+}
+
+document.addEventListener("DOMContentLoaded", function() {
+  document.querySelectorAll(".request-offboarding-btn").forEach(btn => {
+    btn.addEventListener("click", function() {
+      const driverId = this.dataset.driverId;
+      const driverName = this.dataset.driverName;
+      if (confirm(`Request offboarding for ${driverName}?`)) {
+        // Create a hidden form dynamically and submit
+        const form = document.createElement("form");
+        form.method = "POST";
+        form.action = `/dashboard/ops/request_offboarding/${driverId}`;
+        const version = document.createElement("input");
+        version.type = "hidden";
+        version.name = "version";
+        version.value = this.dataset.driverVersion || "";
+        form.appendChild(version);
+        document.body.appendChild(form);
+        form.submit();
+      }
+    });
+  });
+});
@@ -0,0 +1,110 @@
+function openModal(card) {
+  const d = JSON.parse(card.dataset.driver);
+  document.getElementById("driverName").innerText = "Processing: " + d.full_name;
+
+  let html = `
+    <div class="approval-info"><strong>Ops Manager Approved:</strong> ${d.ops_manager_approved_at || "❌ Not Approved"}</div>
+    <div class="approval-info"><strong>HR Approved:</strong> ${d.hr_approved_at || "❌ Not Approved"}</div>
+    <p><strong>Iqama Number:</strong> ${d.iqama_number}</p>
+    <p><strong>Iqama Expiry:</strong> ${d.iqama_expiry_date || "N/A"}</p>
+    <p><strong>Nationality:</strong> ${d.nationality || "N/A"}</p>
+    <p><strong>Previous Sponsor:</strong> ${d.previous_sponsor_number || "N/A"}</p>
+    <p><strong>Driver's Mobile:</strong> ${d.mobile_number || "N/A"}</p>
+    <p><strong>City:</strong> ${d.city || "N/A"}</p>`;
+  if (d.iqama_card_upload) {
+    html += `<p><img src="/static/uploads/${d.iqama_card_upload}" class="driver-iqama"></p>`;
+  }
+  document.getElementById("driverDetails").innerHTML = html;
+
+  // Prefill form fields
+  document.getElementById("opsForm").action = `/dashboard/ops_supervisor/approve_driver/${d.id}`;
+  document.getElementById("version").value = d.version ?? "";
+  document.getElementById("platform").value = d.platform || "";
+  document.getElementById("platform_id").value = d.platform_id || "";
+  document.getElementById("issued_mobile_number").value = d.issued_mobile_number || "";
+  document.getElementById("issued_device_id").value = d.issued_device_id || "";
+  document.getElementById("mobile_issued").checked = !!d.mobile_issued;
+
+  validateForm(); // run initial validation
+  document.getElementById("driverModal").classList.add("show");
+}
+
+function closeModal() { document.getElementById("driverModal").classList.remove("show"); }
+
+document.querySelectorAll("#platform, #platform_id, #issued_mobile_number, #issued_device_id, #mobile_issued")
+  .forEach(el => el.addEventListener("input", validateForm));
+
+function validateForm() {
+  const platform = document.getElementById("platform").value.trim();
+  const platformId = document.getElementById("platform_id").value.trim();
+  const issuedMobile = document.getElementById("issued_mobile_number").value.trim();
+  const issuedDevice = document.getElementById("issued_device_id").value.trim();
+  const mobileIssued = document.getElementById("mobile_issued").checked;
+  const approveBtn = document.getElementById("approveBtn");
+
+  if (platform && platformId && issuedMobile && issuedDevice && mobileIssued) {
+    approveBtn.disabled = false;
+    approveBtn.classList.add("enabled");
+  } else {
+    approveBtn.disabled = true;
+    approveBtn.classList.remove("enabled");
+  }
+}
+
+let currentOffboardingId = null;
+
+function openOffboardingModal(card) {
+  currentOffboardingId = card.dataset.offboardingId;
+  document.getElementById("m_version").value = card.dataset.version || "";
+  document.getElementById("modalTitle").innerText = "Offboarding — " + card.dataset.driverName;
+
+  document.getElementById("m_driver_name").innerText = card.dataset.driverName;
+  document.getElementById("m_iqama").innerText = card.dataset.iqama;
+  document.getElementById("m_requested").innerText = card.dataset.requested;
+  document.getElementById("m_platform").innerText = card.dataset.platform;
+  document.getElementById("m_platform_id").innerText = card.dataset.platformId;
+
+  document.getElementById("offboardingModal").classList.add("show");
+}
+
+function closeOffboardingModal() {
+  document.getElementById("offboardingModal").classList.remove("show");
+  currentOffboardingId = null;
+}
+
+document.getElementById("offboardingForm").addEventListener("submit", async function(e) {
+  e.preventDefault();
+
+  if (!confirm("Confirm clearance and send to Fleet Manager?")) return;
+
+  const formData = new FormData(this);
+  const payload = Object.fromEntries(formData.entries());
+  payload.company_mobile_returned = formData.has("company_mobile_returned");
+  payload.company_sim_returned = formData.has("company_sim_returned");
+  payload.platform_returned = formData.has("platform_returned");
+
+  try {
+    const res = await fetch(`/dashboard/ops_supervisor/api/clear_offboarding/${currentOffboardingId}`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify(payload)
+    });
+
+    const data = await res.json();
+    if (data.success) {
+      alert("Cleared and sent to Fleet ✅");
+      LiveUpdates.removeCard("offboarding", currentOffboardingId);
+      closeOffboardingModal();
+    } else {
+      alert(data.message || "Failed to clear offboarding.");
+    }
+  } catch (err) {
+    console.error(err);
+    alert("Server error. Please try again.");
+  }
+});
+
+// Close modal when clicking outside
+window.addEventListener("click", e => {
+  if (e.target.classList.contains("modal")) closeOffboardingModal();
+});
@@ -0,0 +1,9 @@
+// ✅ Auto-hide flash after 4 seconds
+setTimeout(() => {
+  const flash = document.getElementById("flash-messages");
+  if (flash) {
+    flash.style.transition = "opacity 0.5s ease";
+    flash.style.opacity = "0";
+    setTimeout(() => flash.remove(), 500);
+  }
+}, 4000);
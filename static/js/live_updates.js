@@ -0,0 +1,128 @@
+/* Live dashboard updates (Server-Sent Events).
+ *
+ * Include on a dashboard with:
+ *   <script src="{{ asset_url('js/live_updates.js') }}" data-stream-url="/dashboard/live/stream" defer></script>
+ *
+ * Cards carry data-live-key="driver-<id>" / "offboarding-<id>". When a record
+ * leaves this role's stage its card is removed in place. For records that
+ * arrive (or move between two of this role's stages) the page is fetched again
+ * in the background and just their cards are copied in, next to the card they
+ * follow in the fresh render. Arrivals are batched with some jitter so a burst
+ * of transitions costs each open dashboard one fetch. Cards the fresh page
+ * does not contain (another tab, a search filter, ...) are announced in a small
+ * banner instead. <script type="application/json" data-live-refresh> blocks
+ * are refreshed from the same fetch so page scripts see the new records.
+ */
+(function () {
+  function removeCard(entity, id) {
+    document.querySelectorAll(`[data-live-key="${entity}-${id}"]`).forEach((card) => {
+      card.style.transition = "opacity .3s";
+      card.style.opacity = "0";
+      setTimeout(() => card.remove(), 300);
+    });
+  }
+
+  // Page scripts drop a card after their own action instead of reloading
+  window.LiveUpdates = { removeCard };
+
+  const script = document.currentScript;
+  const streamUrl = script && script.dataset.streamUrl;
+  if (!streamUrl || !window.EventSource) return;
+
+  let arrivals = 0;
+  let banner = null;
+
+  function showBanner(text) {
+    if (!banner) {
+      banner = document.createElement("div");
+      banner.id = "liveUpdatesBanner";
+      banner.style.cssText =
+        "position:fixed;right:20px;bottom:20px;z-index:3000;background:#1f2937;color:#fff;" +
+        "padding:10px 14px;border-radius:8px;box-shadow:0 4px 12px rgba(0,0,0,.25);font-size:14px;cursor:pointer;";
+      banner.title = "Click to refresh";
+      banner.addEventListener("click", () => location.reload());
+      document.body.appendChild(banner);
+    }
+    banner.textContent = text;
+  }
+
+  function announce(data) {
+    arrivals += 1;
+    const label = data.name ? `${data.name} → ${data.to}` : `${data.entity} #${data.id} → ${data.to}`;
+    showBanner(`🔔 ${arrivals} update${arrivals > 1 ? "s" : ""} (latest: ${label}) — click to refresh`);
+  }
+
+  // Put ``fresh`` (a card from the refetched page) where it sits in that page
+  function placeCard(fresh) {
+    const key = fresh.dataset.liveKey;
+    const card = document.importNode(fresh, true);
+    // A "moved" card may now belong in another list (HR -> HR Final): drop it and place it afresh
+    document.querySelectorAll(`[data-live-key="${key}"]`).forEach((old) => old.remove());
+    for (let prev = fresh.previousElementSibling; prev; prev = prev.previousElementSibling) {
+      const anchor = prev.dataset.liveKey && document.querySelector(`[data-live-key="${prev.dataset.liveKey}"]`);
+      if (anchor) { anchor.after(card); return true; }
+    }
+    for (let next = fresh.nextElementSibling; next; next = next.nextElementSibling) {
+      const anchor = next.dataset.liveKey && document.querySelector(`[data-live-key="${next.dataset.liveKey}"]`);
+      if (anchor) { anchor.before(card); return true; }
+    }
+    const parent = fresh.parentElement;
+    const container = parent && parent.id && document.getElementById(parent.id);
+    if (container) { container.appendChild(card); return true; }
+    return false;
+  }
+
+  let pending = new Map();
+  let timer = null;
+
+  async function renderArrivals() {
+    const batch = pending;
+    pending = new Map();
+    timer = null;
+    let doc;
+    try {
+      const res = await fetch(location.href, { headers: { "X-Requested-With": "XMLHttpRequest" } });
+      if (!res.ok || res.redirected) throw new Error(`HTTP ${res.status}`);
+      doc = new DOMParser().parseFromString(await res.text(), "text/html");
+    } catch (err) {
+      console.error(err);
+      batch.forEach(announce);
+      return;
+    }
+    doc.querySelectorAll('script[type="application/json"][data-live-refresh][id]').forEach((block) => {
+      const mine = document.getElementById(block.id);
+      if (mine) mine.textContent = block.textContent;
+    });
+    batch.forEach((data, key) => {
+      const fresh = doc.querySelector(`[data-live-key="${key}"]`);
+      if (fresh && placeCard(fresh)) return;
+      // "moved" within a list we do not render anything for is not news
+      if (fresh || data.action === "entered") announce(data);
+    });
+  }
+
+  function onStage(evt) {
+    const data = JSON.parse(evt.data);
+    if (data.action === "left") {
+      removeCard(data.entity, data.id);
+      return;
+    }
+    pending.set(`${data.entity}-${data.id}`, data);
+    if (!timer) timer = setTimeout(renderArrivals, 1000 + Math.random() * 2000);
+  }
+
+  function connect() {
+    const source = new EventSource(streamUrl);
+    source.addEventListener("stage", onStage);
+    source.addEventListener("resync", () => showBanner("🔄 Dashboard out of date — click to refresh"));
+    source.addEventListener("error", () => {
+      // The browser retries dropped streams itself, but gives up on an error status
+      // (503 when the worker is at its stream limit): try again later with some jitter.
+      if (source.readyState === EventSource.CLOSED) {
+        setTimeout(connect, 30000 + Math.random() * 15000);
+      }
+    });
+  }
+
+  connect();
+})();
@@ -0,0 +1,99 @@
+"""Template rendering caches.
+
+* A persistent Jinja bytecode cache, so fresh workers (and gunicorn's
+  max_requests restarts) skip recompiling the large dashboard templates.
+* A ``{% cache %}`` fragment tag for per-record cards::
+
+      {% cache "ops-driver-card", driver.id, driver.version %}
+        <div class="driver-card">...</div>
+      {% endcache %}
+
+  The key is the template-chosen name plus every argument. Use the record's
+  ``version`` (bumped on every update) and anything else the card shows that
+  lives outside the record, so a cached card can never be stale; old versions
+  simply age out of the LRU.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+from jinja2 import FileSystemBytecodeCache, nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+
+from metrics import FRAGMENT_CACHE
+
+
+class FragmentStore:
+    """Thread-safe LRU of rendered fragments (per process)."""
+
+    def __init__(self, max_entries=20000):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class FragmentCacheExtension(Extension):
+    tags = {"cache"}
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        environment.extend(fragment_cache=FragmentStore(), fragment_cache_enabled=True)
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        key_parts = [parser.parse_expression()]
+        while parser.stream.skip_if("comma"):
+            key_parts.append(parser.parse_expression())
+        body = parser.parse_statements(("name:endcache",), drop_needle=True)
+        return nodes.CallBlock(
+            self.call_method("_render_cached", [nodes.List(key_parts)]), [], [], body,
+        ).set_lineno(lineno)
+
+    def _render_cached(self, key_parts, caller):
+        env = self.environment
+        # auto_reload is on in debug mode, where template edits must show up immediately
+        if not env.fragment_cache_enabled or env.auto_reload:
+            return caller()
+        key = tuple(key_parts)
+        cached = env.fragment_cache.get(key)
+        if cached is not None:
+            FRAGMENT_CACHE.inc(result="hit")
+            return cached
+        FRAGMENT_CACHE.inc(result="miss")
+        rendered = Markup(caller())
+        env.fragment_cache.set(key, rendered)
+        return rendered
+
+
+def init_template_cache(app):
+    """Install the bytecode cache and the ``{% cache %}`` tag on ``app.jinja_env``."""
+    cache_dir = app.config.get("JINJA_BYTECODE_CACHE_DIR")
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(cache_dir)
+
+    app.jinja_env.add_extension(FragmentCacheExtension)
+    app.jinja_env.fragment_cache.max_entries = app.config.get("FRAGMENT_CACHE_MAX_ENTRIES", 20000)
+    app.jinja_env.fragment_cache_enabled = app.config.get("FRAGMENT_CACHE_ENABLED", True)
@@ -0,0 +1,229 @@
+import hashlib
+import os
+import time
+from array import array
+from bisect import bisect_left
+from collections import Counter
+
+from sqlalchemy import delete, select, union_all
+
+from extensions import db
+from metrics import UPLOAD_FILES_REMOVED, UPLOAD_SAVE_DURATION, UPLOAD_SIZE
+
+# Columns holding file names under UPLOAD_FOLDER, per table
+UPLOAD_COLUMNS = {
+    "driver": ("iqama_card_upload", "tamm_authorization_ss", "transfer_fee_receipt", "sponsorship_transfer_proof"),
+    "offboarding": ("finance_invoice_file", "clearance_pdf"),
+}
+
+
+def save_upload(file, path, field):
+    """Save a werkzeug FileStorage to ``path`` and record its size and save time.
+
+    ``field`` names the upload column (e.g. "iqama_card_upload") for metrics.
+    """
+    start = time.perf_counter()
+    file.save(path)
+    UPLOAD_SAVE_DURATION.observe(time.perf_counter() - start, field=field)
+    try:
+        UPLOAD_SIZE.observe(os.path.getsize(path), field=field)
+    except OSError:
+        pass
+
+
+# -------------------------
+# Deleting files of deleted records
+# -------------------------
+def queue_upload_deletion(driver):
+    """Queue the files of ``driver`` and its offboardings for ``flask uploads purge``.
+
+    Only adds rows to the session; they commit with the caller's transaction.
+    """
+    from models import PendingFileDeletion
+
+    names = {getattr(driver, col) for col in UPLOAD_COLUMNS["driver"]}
+    for offboarding in driver.offboarding_records:
+        names.update(getattr(offboarding, col) for col in UPLOAD_COLUMNS["offboarding"])
+    for name in sorted(n for n in names if n):
+        db.session.add(PendingFileDeletion(filename=name))
+    return len(names)
+
+
+def _upload_path(upload_folder, name):
+    """Absolute path of an upload, or None for names that could escape the folder."""
+    if not name or name in (".", "..") or os.path.basename(name) != name:
+        return None
+    return os.path.join(upload_folder, name)
+
+
+def _still_referenced(names):
+    """Subset of ``names`` used by a live (not soft-deleted) or archived record."""
+    from models import Driver, Offboarding, driver_archive, offboarding_archive
+
+    used = set()
+    for model, archive in ((Driver, driver_archive), (Offboarding, offboarding_archive)):
+        for col in UPLOAD_COLUMNS[model.__tablename__]:
+            column = getattr(model, col)
+            used.update(db.session.execute(select(column).where(column.in_(names))).scalars())
+            used.update(db.session.execute(select(archive.c[col]).where(archive.c[col].in_(names))).scalars())
+    return used
+
+
+def remove_queued_files(upload_folder, batch_size=200, max_attempts=5):
+    """Delete one batch of queued files; returns a Counter of outcomes (empty when idle).
+
+    A file still referenced by another record (names derive from driver
+    names, so they can be shared) is kept; only the queue entry is dropped.
+    """
+    from models import PendingFileDeletion
+
+    rows = (
+        PendingFileDeletion.query
+        .filter(PendingFileDeletion.attempts < max_attempts)
+        .order_by(PendingFileDeletion.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    outcomes = Counter()
+    if not rows:
+        return outcomes
+
+    still_used = _still_referenced({row.filename for row in rows})
+    for row in rows:
+        path = _upload_path(upload_folder, row.filename)
+        if row.filename in still_used:
+            result = "kept"
+        elif path is None:
+            result = "invalid"
+        else:
+            try:
+                os.remove(path)
+                result = "removed"
+            except FileNotFoundError:
+                result = "missing"
+            except OSError as exc:
+                row.attempts += 1
+                row.last_error = str(exc)
+                outcomes["failed"] += 1
+                UPLOAD_FILES_REMOVED.inc(result="failed")
+                continue
+        db.session.delete(row)
+        outcomes[result] += 1
+        UPLOAD_FILES_REMOVED.inc(result=result)
+    db.session.commit()
+    return outcomes
+
+
+def purge_deleted_records(deleted_before, batch_size=500):
+    """Hard-delete one batch of drivers soft-deleted before ``deleted_before``, with their offboardings.
+
+    Their finance rollup contributions are removed in the same transaction.
+    Returns the number of drivers purged.
+    """
+    import rollups
+    from models import Driver, Offboarding
+
+    drivers = Driver.query.filter(Driver.deleted_at < deleted_before).limit(batch_size) \
+        .execution_options(include_deleted=True).all()
+    ids = [d.id for d in drivers]
+    if ids:
+        # Drivers are in the identity map now, so offboarding.driver needs no (filtered) lazy load
+        offboardings = Offboarding.query.filter(Offboarding.driver_id.in_(ids)) \
+            .execution_options(include_deleted=True).all()
+        for record in [*drivers, *offboardings]:
+            rollups.remove(record)
+        db.session.execute(delete(Offboarding.__table__).where(Offboarding.driver_id.in_(ids)))
+        db.session.execute(delete(Driver.__table__).where(Driver.id.in_(ids)))
+    db.session.commit()
+    return len(ids)
+
+
+# -------------------------
+# Orphaned file GC
+# -------------------------
+def _name_key(name):
+    return int.from_bytes(hashlib.blake2b(name.encode(), digest_size=8).digest(), "big")
+
+
+def referenced_keys(batch_size=10000):
+    """Sorted 64-bit hashes of every file name referenced by any upload column.
+
+    One streamed UNION ALL over driver, offboarding and their archives
+    (soft-deleted rows included; ``flask uploads purge`` owns those files).
+    At 8 bytes per name millions of references stay small, and a hash
+    collision can only make the GC keep a file, never delete one.
+    """
+    from models import Driver, Offboarding, driver_archive, offboarding_archive
+
+    selects = [
+        select(table.c[col].label("name")).where(table.c[col].isnot(None))
+        for table, kind in (
+            (Driver.__table__, "driver"), (driver_archive, "driver"),
+            (Offboarding.__table__, "offboarding"), (offboarding_archive, "offboarding"),
+        )
+        for col in UPLOAD_COLUMNS[kind]
+    ]
+    keys = array("Q")
+    result = db.session.execute(union_all(*selects).execution_options(yield_per=batch_size))
+    for name in result.scalars():
+        keys.append(_name_key(name))
+    return array("Q", sorted(keys))
+
+
+def _is_referenced(keys, name):
+    key = _name_key(name)
+    i = bisect_left(keys, key)
+    return i < len(keys) and keys[i] == key
+
+
+def iter_upload_files(root):
+    """Every regular file under ``root`` (os.scandir, iterative, no symlinks followed)."""
+    stack = [root]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False) and not entry.name.startswith("."):
+                        yield entry
+        except FileNotFoundError:
+            continue
+
+
+def collect_orphans(upload_folder, grace_seconds, delete=False, on_orphan=None):
+    """Find (and with ``delete`` remove) files no record references, older than the grace period.
+
+    Files younger than ``grace_seconds`` are skipped: uploads are written
+    before the row referencing them commits. Returns a Counter of stats.
+    """
+    keys = referenced_keys()
+    cutoff = time.time() - grace_seconds
+    stats = Counter(references=len(keys))
+    for entry in iter_upload_files(upload_folder):
+        stats["scanned"] += 1
+        name = os.path.relpath(entry.path, upload_folder).replace(os.sep, "/")
+        if _is_referenced(keys, name):
+            continue
+        try:
+            st = entry.stat(follow_symlinks=False)
+        except FileNotFoundError:
+            continue
+        if st.st_mtime > cutoff:
+            stats["recent"] += 1
+            continue
+        stats["orphaned"] += 1
+        stats["orphaned_bytes"] += st.st_size
+        if on_orphan:
+            on_orphan(name, st)
+        if delete:
+            try:
+                os.remove(entry.path)
+                stats["removed"] += 1
+                UPLOAD_FILES_REMOVED.inc(result="orphan")
+            except FileNotFoundError:
+                pass
+            except OSError:
+                stats["failed"] += 1
+    return stats
@@ -0,0 +1,8 @@
+"""Production WSGI entry point.
+
+    flask --app wsgi assets build   # fingerprinted static bundles, once per release
+    gunicorn -c gunicorn.conf.py wsgi:app
+"""
+from app import create_app
+
+app = create_app()